@@ -0,0 +1,162 @@
+"""
+Queries behind the account management page.
+
+User accounts (superusers excluded) fall into three status buckets:
+pending (never activated), active, and deactivated. Counts for all buckets
+come from one grouped query; each bucket's list is keyset-paginated by
+(date_joined, id), newest first, so every page costs the same however many
+accounts there are. The optional search matches name, email and phone
+prefixes. On Postgres each of those has an expression index matching the
+SQL the search compiles to (see migration 0010); on SQLite the search
+filters the rows of the bucket's user_status_joined_idx scan.
+"""
+
+import re
+from datetime import datetime
+
+from django.contrib.auth import get_user_model
+from django.db.models import Case, CharField, Count, Q, Value, When
+from django.db.models.functions import Replace
+
+ACCOUNTS_PAGE_SIZE = 25
+
+PENDING = 'pending'
+ACTIVE = 'active'
+DEACTIVATED = 'deactivated'
+
+BUCKETS = (PENDING, ACTIVE, DEACTIVATED)
+
+# Booleans are compared with Value() so the SQL reads "is_active = true"
+# rather than a bare "is_active": SQLite only uses user_status_joined_idx
+# for the former
+BUCKET_FILTERS = {
+    PENDING: Q(is_active=Value(False), last_login__isnull=True),
+    ACTIVE: Q(is_active=Value(True)),
+    DEACTIVATED: Q(is_active=Value(False), last_login__isnull=False),
+}
+
+# Searched case-insensitively by prefix
+SEARCH_FIELDS = ('first_name', 'last_name', 'email')
+
+# Formatting stripped from stored phone numbers before matching digits
+PHONE_FORMATTING = ('(', ')', '-', ' ', '.', '+')
+
+# A search that is only a phone number, possibly typed with spaces
+PHONE_SEARCH_RE = re.compile(r'[\d\s().+-]*\d[\d\s().+-]*')
+
+
+def _accounts():
+    return get_user_model().objects.filter(is_superuser=Value(False))
+
+
+def _phone_digits():
+    """Expression giving a user's phone number without its formatting."""
+    digits = 'phone'
+    for char in PHONE_FORMATTING:
+        digits = Replace(digits, Value(char), Value(''))
+    return digits
+
+
+def _search(users, search):
+    """
+    Narrow users to those where every word of the search starts one of
+    their name, email or phone.
+
+    Names and email are matched case-insensitively. A word with digits
+    is also matched against the phone number's digits, so "555123" and
+    "(555) 123" both find "(555) 123-4567".
+    """
+    search = search.strip()
+    terms = [search] if PHONE_SEARCH_RE.fullmatch(search) else search.split()
+    if not terms:
+        return users
+
+    users = users.annotate(phone_digits=_phone_digits())
+    for term in terms:
+        matches = Q()
+        for field in SEARCH_FIELDS:
+            matches |= Q(**{f'{field}__istartswith': term})
+        digits = re.sub(r'\D', '', term)
+        if digits:
+            matches |= Q(phone_digits__startswith=digits)
+        users = users.filter(matches)
+    return users
+
+
+def status_bucket():
+    """Expression giving each account's status bucket."""
+    return Case(
+        *[When(BUCKET_FILTERS[bucket], then=Value(bucket)) for bucket in BUCKETS],
+        output_field=CharField(),
+    )
+
+
+def account_counts_query(search=''):
+    """Queryset of {'status', 'total'} rows, one per non-empty bucket."""
+    return (
+        _search(_accounts(), search)
+        .annotate(status=status_bucket())
+        .values('status')
+        .annotate(total=Count('pk'))
+        .order_by()
+    )
+
+
+def account_counts(search=''):
+    """
+    Count accounts per status bucket in a single grouped query.
+
+    Returns:
+        dict: bucket name -> number of accounts (matching the search)
+    """
+    rows = account_counts_query(search)
+    counts = dict.fromkeys(BUCKETS, 0)
+    counts.update({row['status']: row['total'] for row in rows if row['status']})
+    return counts
+
+
+def encode_account_cursor(user):
+    """Encode a user's (date_joined, id) sort key as a page cursor."""
+    return f"{user.date_joined.isoformat()}_{user.pk}"
+
+
+def decode_account_cursor(cursor):
+    """
+    Decode a page cursor produced by encode_account_cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    joined_str, id_str = cursor.rsplit('_', 1)
+    return datetime.fromisoformat(joined_str), int(id_str)
+
+
+def account_page_query(bucket, cursor=None, search=''):
+    """Queryset of one page of a bucket's accounts, plus one extra row."""
+    users = _search(_accounts().filter(BUCKET_FILTERS[bucket]), search)
+    if cursor:
+        joined, user_id = cursor
+        users = users.filter(Q(date_joined__lt=joined) | Q(date_joined=joined, pk__lt=user_id))
+    return users.order_by('-date_joined', '-pk')[:ACCOUNTS_PAGE_SIZE + 1]
+
+
+def account_page(bucket, cursor=None, search=''):
+    """
+    Get one page of a status bucket's accounts, newest first.
+
+    Args:
+        bucket: One of BUCKETS
+        cursor: Decoded cursor (date_joined, id) of the last account on the
+            previous page, or None for the first page
+        search: Optional search words
+
+    Returns:
+        tuple: (list of users, encoded cursor for the next page or None)
+    """
+    # Fetch one extra row to find out whether another page exists
+    users = list(account_page_query(bucket, cursor, search))
+    has_more = len(users) > ACCOUNTS_PAGE_SIZE
+    users = users[:ACCOUNTS_PAGE_SIZE]
+
+    next_cursor = encode_account_cursor(users[-1]) if has_more else None
+    return users, next_cursor
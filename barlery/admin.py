@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as DjangoUserAdmin
-from .models import User, MenuItem, Event, EventRequest, WeeklyHours
+from django.utils import timezone
+from .models import User, MenuItem, Event, EventImageRendition, EventRequest, NewsletterIssue, OutboundEmail, Subscriber, WeeklyHours
 
 
 class SuperuserOnlyAdminSite(admin.AdminSite):
@@ -52,13 +53,30 @@ class ItemAdmin(admin.ModelAdmin):
     ordering = ("name",)
     readonly_fields = ("last_updated",)
 
+    def save_model(self, request, obj, form, change):
+        # last_updated isn't auto_now; the menu views set it the same way
+        obj.last_updated = timezone.now()
+        super().save_model(request, obj, form, change)
+
+class EventImageRenditionInline(admin.TabularInline):
+    model = EventImageRendition
+    extra = 0
+    can_delete = False
+    fields = ("kind", "format", "image", "width", "height", "size")
+    readonly_fields = fields
+
+    def has_add_permission(self, request, obj=None):
+        # Renditions are generated from the event image, never added by hand
+        return False
+
 @admin.register(Event)
 class EventAdmin(admin.ModelAdmin):
+    inlines = (EventImageRenditionInline,)
     list_display = ("title", "date", "start_time", "end_time")
     list_filter = ("date",)
     search_fields = ("title", "description")
     ordering = ("date", "start_time")
-    readonly_fields = ("last_updated",)
+    readonly_fields = ("last_updated", "image_exists", "image_width", "image_height", "image_size", "image_hash")
 
 @admin.register(EventRequest)
 class EventRequestAdmin(admin.ModelAdmin):
@@ -78,4 +96,26 @@ class EventRequestAdmin(admin.ModelAdmin):
 class WeeklyHoursAdmin(admin.ModelAdmin):
     def has_add_permission(self, request):
         # Prevent “Add” if it already exists
-        return not WeeklyHours.objects.filter(id=1).exists()
\ No newline at end of file
+        return not WeeklyHours.objects.filter(id=1).exists()
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ("subject", "kind", "status", "attempts", "created_at", "sent_at")
+    list_filter = ("status", "kind")
+    search_fields = ("subject", "body")
+    ordering = ("-created_at",)
+    readonly_fields = ("created_at", "sent_at", "attempts", "last_error")
+
+@admin.register(Subscriber)
+class SubscriberAdmin(admin.ModelAdmin):
+    list_display = ("email", "is_subscribed", "subscribed_at", "unsubscribed_at")
+    list_filter = ("is_subscribed",)
+    search_fields = ("email",)
+    ordering = ("-subscribed_at",)
+    readonly_fields = ("unsubscribed_at",)
+
+@admin.register(NewsletterIssue)
+class NewsletterIssueAdmin(admin.ModelAdmin):
+    list_display = ("subject", "created_at", "completed_at", "sent_count", "failed_count")
+    ordering = ("-created_at",)
+    readonly_fields = ("created_at", "completed_at", "last_subscriber_id", "sent_count", "failed_count")
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class BarleryConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'barlery'
+
+    def ready(self):
+        # Connect the cache invalidation signal handlers
+        from . import signals  # noqa: F401
+
+        # Register the system checks
+        from . import checks  # noqa: F401
@@ -0,0 +1,113 @@
+"""
+Async versions of Barlery's public read-only pages.
+
+Under ASGI (see barlery_project/asgi.py) these replace index, menu,
+calendar and event_details from views.py, so a worker process can keep
+many slow clients waiting on the event loop instead of holding a thread
+for each one. The pages, caching and conditional GET behave exactly like
+the sync views, which build the same template context.
+
+Independent lookups are started together with asyncio.gather. Cache reads
+run without blocking the event loop, and database queries use the async
+ORM. Templates are rendered in a worker thread because they read the
+fragment cache and build storage URLs, which block.
+"""
+
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.shortcuts import aget_object_or_404, render
+from django.utils import timezone
+from django.views.decorators.vary import vary_on_headers
+
+from .conditional import (
+    async_condition,
+    calendar_etag,
+    event_details_etag,
+    index_etag,
+    menu_etag,
+    public_cache_control,
+)
+from .models import Event
+from .snapshots import (
+    ahours_snapshot,
+    aindex_events,
+    amenu_snapshot,
+    amonth_grid,
+    aupcoming_events_page,
+    decode_event_cursor,
+)
+from .views import (
+    calendar_context,
+    event_details_context,
+    index_context,
+    menu_context,
+    requested_month,
+    upcoming_events_json_response,
+)
+
+arender = sync_to_async(render)
+
+
+@public_cache_control
+@async_condition(etag_func=index_etag)
+async def index(request):
+    upcoming_events, hours = await asyncio.gather(
+        aindex_events(timezone.localdate()),
+        ahours_snapshot(),
+    )
+    return await arender(request, 'barlery/index.html', index_context(upcoming_events, hours))
+
+
+@public_cache_control
+@async_condition(etag_func=menu_etag)
+async def menu(request):
+    # Menu items grouped by category (cached until the menu changes)
+    return await arender(request, "barlery/menu.html", menu_context(await amenu_snapshot()))
+
+
+async def _upcoming_events_json(request):
+    """
+    Return the next page of upcoming event cards for calendar_pagination.js.
+    """
+    try:
+        cursor = decode_event_cursor(request.GET['page'])
+    except ValueError:
+        return JsonResponse({'error': 'Invalid page'}, status=400)
+
+    events, next_cursor = await aupcoming_events_page(timezone.localdate(), cursor)
+    return await sync_to_async(upcoming_events_json_response)(request, events, next_cursor)
+
+
+@public_cache_control
+@vary_on_headers('X-Requested-With')
+@async_condition(etag_func=calendar_etag)
+async def calendar(request):
+    """
+    Display events in a monthly calendar view with navigation.
+    AJAX requests with a 'page' cursor get the next page of upcoming events as JSON.
+    """
+    if request.headers.get('x-requested-with') == 'XMLHttpRequest' and request.GET.get('page'):
+        return await _upcoming_events_json(request)
+
+    year, month = requested_month(request)
+    today = timezone.localdate()
+
+    # The month grid and the first page of upcoming events are independent
+    grid, (upcoming_events, next_page) = await asyncio.gather(
+        amonth_grid(year, month, today),
+        aupcoming_events_page(today),
+    )
+    context = calendar_context(year, month, today, grid, upcoming_events, next_page)
+    return await arender(request, 'barlery/calendar.html', context)
+
+
+@public_cache_control
+@async_condition(etag_func=event_details_etag)
+async def event_details(request, event_id):
+    """
+    Display detailed information about a specific event.
+    """
+    event = await aget_object_or_404(Event.objects.prefetch_related('renditions'), id=event_id)
+    return await arender(request, 'barlery/event_details.html', event_details_context(request, event))
@@ -0,0 +1,136 @@
+"""
+Per-page CSS and JS bundles.
+
+BUNDLES lists the stylesheets and scripts of each bundle, in order. A page
+bundle only holds the files of its own page and names the shared bundle
+it builds on ("base"); the styles and scripts every page uses are built
+once into the shared bundles, so browsers cache them once for the whole
+site instead of downloading them again inside every page's bundle:
+
+    base    icons and site styles, navigation scripts (every page)
+    public  staff_ui.js, on top of base (pages extending public_base.html)
+    form    csrf_on_demand.js, on top of public (public pages with a form)
+
+The build_bundles command concatenates and minifies each bundle into
+static/bundles/ (one .css and one .js file per bundle) and writes
+bundles.json, which records the built file names and each bundle's
+critical CSS. Templates link a page's bundle with the {% bundle_css %}
+and {% bundle_js %} tags, which link the shared bundles it builds on
+first. They use the built files when they exist and list the individual
+source files otherwise (so development needs no build step).
+
+Critical CSS is the part of a page's stylesheet needed to draw the top of
+the page: base element styles, the header and navigation, flash messages
+and the hero. It is inlined into the page, and the full bundle loads
+without blocking the first paint.
+"""
+
+import functools
+import json
+import re
+from pathlib import Path
+
+from django.conf import settings
+
+BUNDLES_DIR = Path(__file__).resolve().parent / "static" / "bundles"
+MANIFEST_PATH = BUNDLES_DIR / "bundles.json"
+
+# Bundle name -> source files (relative to static/) in load order, and the
+# shared bundle loaded before them
+BUNDLES = {
+    # Shared bundles
+    "base": {"css": ["css/icons.css", "css/site.css"], "js": ["js/menu_toggle.js", "js/logout.js"]},  # icons.css is generated by build_icons
+    "public": {"base": "base", "js": ["js/staff_ui.js"]},
+    "form": {"base": "public", "js": ["js/csrf_on_demand.js"]},
+
+    # Page bundles
+    "about": {"base": "public", "css": ["css/about.css"]},
+    "account_management": {"base": "base", "css": ["css/account_management.css"], "js": ["js/account_management.js"]},
+    "calendar": {"base": "public", "css": ["css/calendar.css"], "js": ["js/calendar_pagination.js"]},
+    "contact": {"base": "form", "css": ["css/contact.css"]},
+    "event_details": {"base": "public", "css": ["css/event_details.css"]},
+    "event_form": {"base": "base", "css": ["css/event_create.css"], "js": ["js/event_time_choice.js"]},
+    "hours_edit": {"base": "base", "css": ["css/hours_edit.css"], "js": ["js/hours_edit.js"]},
+    "index": {"base": "public", "css": ["css/index.css"]},
+    "login": {"base": "base", "css": ["css/login.css"]},
+    "menu": {"base": "public", "css": ["css/menu.css"]},
+    "menu_item_form": {"base": "base", "css": ["css/menu_item_create.css"]},
+    "success": {"base": "base", "css": ["css/success.css"]},
+    "user_create": {"base": "form", "css": ["css/user_create.css"]},
+    "user_edit": {"base": "base", "css": ["css/user_edit.css"]},
+    "venue": {"base": "form", "css": ["css/venue.css"], "js": ["js/time_choice.js"]},
+}
+
+# Rules whose selector starts with one of these are inlined as critical CSS
+CRITICAL_SELECTOR_RE = re.compile(
+    r"^(?::root|\*|html|body|main|h[1-6]|p|a|strong|header|nav"
+    r"|\.sticky-top-container|\.logo[\w-]*|\.nav-toggle|\.message-[\w-]+"
+    r"|\.hero[\w-]*|\.container[\w-]*)(?![\w-])"
+)
+
+
+def bundle_chain(name):
+    """
+    Names of the bundles a page loads for the given bundle, shared ones first.
+
+    Example:
+        bundle_chain("contact") -> ["base", "public", "form", "contact"]
+    """
+    chain = []
+    while name:
+        chain.insert(0, name)
+        name = BUNDLES[name].get("base")
+    return chain
+
+
+def split_rules(css):
+    """Split a minified stylesheet into its top-level rules and at-rules."""
+    rules = []
+    depth = 0
+    start = 0
+    for i, char in enumerate(css):
+        if char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                rules.append(css[start:i + 1])
+                start = i + 1
+        elif char == ";" and depth == 0:
+            rules.append(css[start:i + 1])
+            start = i + 1
+    return rules
+
+
+def critical_css(css):
+    """
+    Pick the rules of a minified stylesheet that style the top of the page.
+
+    A rule is kept when any of its selectors matches CRITICAL_SELECTOR_RE.
+    @media blocks are filtered the same way; other at-rules (@keyframes,
+    @font-face) are left to the full stylesheet.
+    """
+    keep = []
+    for rule in split_rules(css):
+        prelude, _, block = rule.partition("{")
+        if prelude.startswith("@media"):
+            inner = critical_css(block[:-1])
+            if inner:
+                keep.append(f"{prelude}{{{inner}}}")
+        elif not prelude.startswith("@"):
+            if any(CRITICAL_SELECTOR_RE.match(selector.strip()) for selector in prelude.split(",")):
+                keep.append(rule)
+    return "".join(keep)
+
+
+@functools.cache
+def load_manifest():
+    """
+    Read bundles.json as written by build_bundles ({} when not built).
+
+    Bundles are never used with DEBUG on, so edits to the source files
+    show up without rebuilding.
+    """
+    if settings.DEBUG or not MANIFEST_PATH.exists():
+        return {}
+    return json.loads(MANIFEST_PATH.read_text())
@@ -0,0 +1,211 @@
+"""
+Two-tier cache backend for Barlery.
+
+TieredCache keeps a small in-process cache (L1) in front of a cache shared
+by every worker (L2, another alias in CACHES: the file-based or database
+cache, neither of which needs an outside service). Reads are served from
+L1 when they can be, which saves the file read and unpickling of an L2
+hit; writes go to both tiers.
+
+L1 is bounded two ways:
+    L1_MAX_ENTRIES  Least recently used entries are evicted beyond this.
+    L1_TIMEOUT      Seconds an entry is served from L1 before L2 is asked
+                    again (and never longer than its own timeout).
+
+Other workers' writes only show up once the L1 copy expires, so keys that
+must be seen quickly everywhere get a shorter L1 lifetime through
+L1_KEY_TIMEOUTS ({glob pattern: seconds}, 0 to bypass L1). The version keys
+in caching.py are the ones that matter, along with the snapshot entries of
+single_flight.py, which are replaced in place when rebuilt. Keys that
+include the version never change, so they can stay in L1 for the full
+L1_TIMEOUT.
+
+Hits and misses are counted per tier. Each process adds its counts to
+totals in L2 every STATS_FLUSH_INTERVAL seconds; see the cache_stats
+command.
+"""
+
+import pickle
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from fnmatch import translate
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+STATS = ("l1_hits", "l2_hits", "misses")
+STATS_KEY_PREFIX = "barlery:cache-stats"
+STATS_FLUSH_INTERVAL = 30
+
+# Django creates a backend instance per thread, so the L1 stores (and their
+# counters) live at module level, one per LOCATION, like LocMemCache's
+_stores = {}
+_locks = {}
+_counts = {}
+_last_flush = {}
+
+_MISSING = object()
+
+
+def stats_key(name, stat):
+    return f"{STATS_KEY_PREFIX}:{name}:{stat}"
+
+
+class TieredCache(BaseCache):
+    """
+    In-process LRU cache in front of a shared cache.
+
+    CACHES = {
+        "default": {
+            "BACKEND": "barlery.cache_backends.TieredCache",
+            "LOCATION": "barlery",
+            "OPTIONS": {"L2": "shared", "L1_MAX_ENTRIES": 1000, "L1_TIMEOUT": 30},
+        },
+        "shared": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", ...},
+    }
+    """
+
+    def __init__(self, name, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self._name = name
+        self._l2_alias = options.get("L2", "shared")
+        self._l1_max_entries = options.get("L1_MAX_ENTRIES", 1000)
+        self._l1_timeout = options.get("L1_TIMEOUT", 30)
+        self._l1_key_timeouts = [
+            (re.compile(translate(pattern)), seconds)
+            for pattern, seconds in options.get("L1_KEY_TIMEOUTS", {}).items()
+        ]
+
+        self._l1 = _stores.setdefault(name, OrderedDict())
+        self._lock = _locks.setdefault(name, threading.Lock())
+        self._counts = _counts.setdefault(name, Counter())
+        _last_flush.setdefault(name, time.monotonic())
+
+    @property
+    def l2(self):
+        return caches[self._l2_alias]
+
+    def get(self, key, default=None, version=None):
+        l1_key = self.make_and_validate_key(key, version=version)
+        with self._lock:
+            entry = self._l1.get(l1_key)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self._l1[l1_key]
+                entry = None
+            if entry is not None:
+                self._l1.move_to_end(l1_key)
+        if entry is not None:
+            self._count("l1_hits")
+            return pickle.loads(entry[1])
+
+        value = self.l2.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            self._count("misses")
+            return default
+
+        self._count("l2_hits")
+        self._l1_set(l1_key, key, value)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        l1_key = self.make_and_validate_key(key, version=version)
+        self.l2.set(key, value, timeout, version=version)
+        self._l1_set(l1_key, key, value, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        l1_key = self.make_and_validate_key(key, version=version)
+        added = self.l2.add(key, value, timeout, version=version)
+        if added:
+            self._l1_set(l1_key, key, value, timeout)
+        return added
+
+    def incr(self, key, delta=1, version=None):
+        l1_key = self.make_and_validate_key(key, version=version)
+        value = self.l2.incr(key, delta, version=version)
+        self._l1_set(l1_key, key, value)
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self._l1_delete(self.make_and_validate_key(key, version=version))
+        return self.l2.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        self._l1_delete(self.make_and_validate_key(key, version=version))
+        return self.l2.delete(key, version=version)
+
+    def has_key(self, key, version=None):
+        return self.get(key, _MISSING, version=version) is not _MISSING
+
+    def clear(self):
+        with self._lock:
+            self._l1.clear()
+        self.l2.clear()
+
+    def stats(self):
+        """Counts of this process since it started, plus the current L1 size."""
+        with self._lock:
+            return {**{stat: self._counts[f"total_{stat}"] for stat in STATS}, "l1_entries": len(self._l1)}
+
+    def _l1_timeout_for(self, key, timeout=DEFAULT_TIMEOUT):
+        seconds = self._l1_timeout
+        for pattern, key_seconds in self._l1_key_timeouts:
+            if pattern.match(key):
+                seconds = key_seconds
+                break
+
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.l2.default_timeout
+        if timeout is not None:
+            seconds = min(seconds, timeout)
+        return seconds
+
+    def _l1_set(self, l1_key, key, value, timeout=DEFAULT_TIMEOUT):
+        seconds = self._l1_timeout_for(key, timeout)
+        if seconds <= 0:
+            self._l1_delete(l1_key)
+            return
+
+        # Pickled like LocMemCache, so callers can't change each other's copies
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._l1[l1_key] = (time.monotonic() + seconds, pickled)
+            self._l1.move_to_end(l1_key)
+            while len(self._l1) > self._l1_max_entries:
+                self._l1.popitem(last=False)
+
+    def _l1_delete(self, l1_key):
+        with self._lock:
+            self._l1.pop(l1_key, None)
+
+    def _count(self, stat):
+        now = time.monotonic()
+        with self._lock:
+            self._counts[stat] += 1
+            self._counts[f"total_{stat}"] += 1
+            if now - _last_flush[self._name] < STATS_FLUSH_INTERVAL:
+                return
+            _last_flush[self._name] = now
+            pending = {stat: self._counts.pop(stat, 0) for stat in STATS}
+
+        self._flush_stats(pending)
+
+    def _flush_stats(self, pending):
+        """
+        Add this process's counts to the totals in L2.
+
+        incr isn't atomic on every backend, so the totals are approximate
+        when processes flush at the same moment.
+        """
+        l2 = self.l2
+        for stat, count in pending.items():
+            if not count:
+                continue
+            key = stats_key(self._name, stat)
+            l2.add(key, 0, timeout=None)
+            try:
+                l2.incr(key, count)
+            except ValueError:
+                l2.set(key, count, timeout=None)
@@ -0,0 +1,104 @@
+"""
+Versioned cache keys for Barlery.
+
+Each kind of public data (menu, events, hours) has a version number stored
+in the cache. Cached snapshots are keyed by that version, so bumping the
+version is all it takes to invalidate every snapshot built from the old data.
+Versions are bumped by the model signal handlers in signals.py. The cache
+must be shared by every worker process for a bump to reach them all;
+the barlery.W001 system check (checks.py) warns when it isn't.
+
+The default cache is tiered (see cache_backends.py): snapshots are served
+from process memory once read, and version keys are re-read from the
+shared cache every second, so a bump reaches every worker within a second.
+
+The a-prefixed functions are the async versions used by async_views.py.
+"""
+
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+MENU = "menu"
+EVENTS = "events"
+HOURS = "hours"
+
+KEY_PREFIX = "barlery"
+
+
+def _version_key(namespace):
+    return f"{KEY_PREFIX}:{namespace}:version"
+
+
+def get_version(namespace):
+    """
+    Get the current version number for a namespace.
+
+    If the version was never set (or was evicted), it is seeded with the
+    current time in milliseconds so it can never collide with a version
+    that an older snapshot was stored under.
+
+    Args:
+        namespace (str): One of MENU, EVENTS or HOURS
+
+    Returns:
+        int: Current version number
+    """
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, int(time.time() * 1000), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+async def aget_version(namespace):
+    """Async version of get_version."""
+    key = _version_key(namespace)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, int(time.time() * 1000), timeout=None)
+        version = await cache.aget(key)
+    return version
+
+
+def bump_version(namespace):
+    """
+    Invalidate every snapshot stored under a namespace.
+
+    The bump is deferred until the current transaction commits, so other
+    workers never rebuild a snapshot from data that is about to roll back.
+
+    Args:
+        namespace (str): One of MENU, EVENTS or HOURS
+    """
+    def _bump():
+        key = _version_key(namespace)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Key missing or evicted: seed a fresh, never-before-used version
+            cache.set(key, int(time.time() * 1000), timeout=None)
+
+    transaction.on_commit(_bump)
+
+
+def versioned_key(namespace, *parts):
+    """
+    Build a cache key that is only valid for the namespace's current version.
+
+    Example:
+        versioned_key(MENU, "snapshot") -> "barlery:menu:v1700000000000:snapshot"
+    """
+    return _build_key(namespace, get_version(namespace), parts)
+
+
+async def aversioned_key(namespace, *parts):
+    """Async version of versioned_key."""
+    return _build_key(namespace, await aget_version(namespace), parts)
+
+
+def _build_key(namespace, version, parts):
+    suffix = ":".join(str(part) for part in parts)
+    return f"{KEY_PREFIX}:{namespace}:v{version}:{suffix}"
@@ -0,0 +1,46 @@
+"""
+System checks for Barlery's settings.
+
+Cached snapshots are invalidated by bumping version keys in the default
+cache (see caching.py). That only reaches every worker when the cache is
+shared between them; with a per-process cache a bump is seen by the one
+worker that made it, and the others keep serving their old snapshots.
+"""
+
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+# Backends that keep their entries in the process that wrote them
+PER_PROCESS_BACKENDS = {
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+}
+
+TIERED_BACKEND = "barlery.cache_backends.TieredCache"
+
+
+def _shared_backend(alias):
+    """Backend of the cache that holds the version keys for a cache alias."""
+    config = settings.CACHES.get(alias, {})
+    backend = config.get("BACKEND", "django.core.cache.backends.locmem.LocMemCache")
+    if backend == TIERED_BACKEND:
+        l2_alias = config.get("OPTIONS", {}).get("L2", "shared")
+        return l2_alias, settings.CACHES.get(l2_alias, {}).get("BACKEND", "django.core.cache.backends.locmem.LocMemCache")
+    return alias, backend
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    alias, backend = _shared_backend("default")
+    if backend in PER_PROCESS_BACKENDS:
+        return [
+            Warning(
+                f"Cache {alias!r} ({backend}) is not shared between worker processes.",
+                hint=(
+                    "Cache version bumps (barlery/caching.py) would only reach the "
+                    "worker that made them. Use a file-based or database cache."
+                ),
+                id="barlery.W001",
+            )
+        ]
+    return []
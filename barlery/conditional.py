@@ -0,0 +1,158 @@
+"""
+Validators for conditional GET on Barlery's public pages.
+
+These functions are passed to django.views.decorators.http.condition so a
+view can answer If-None-Match / If-Modified-Since with a 304 before it
+renders anything. ETags are built from the cache versions in caching.py,
+so computing one costs a few cache lookups and no database queries.
+
+Async views use async_condition instead, which runs the same validators
+in a worker thread.
+
+public_cache_control marks those pages as cacheable by shared caches,
+unless they were rendered from a stale snapshot (see single_flight.py).
+"""
+
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from . import caching
+from .single_flight import tracking_stale_reads
+
+
+def static_files_version():
+    """
+    Version of the static files the pages link to.
+
+    In production pages link to content-hashed file names, so the manifest
+    hash changes whenever any static file does. Development uses
+    STATIC_VERSION instead.
+    """
+    return getattr(staticfiles_storage, 'manifest_hash', '') or settings.STATIC_VERSION
+
+
+def _page_etag(*parts):
+    """
+    Build an ETag from the given parts.
+
+    Public pages render the same for every visitor (staff controls and
+    flash messages are loaded separately by staff_ui.js), so the ETag
+    doesn't depend on the user, and computing it never reads the session.
+    """
+    raw = ":".join(str(part) for part in (static_files_version(), *parts))
+    return hashlib.sha1(raw.encode(), usedforsecurity=False).hexdigest()
+
+
+def menu_etag(request):
+    # No Last-Modified: the newest last_updated goes back when that item is deleted
+    return _page_etag("menu", caching.get_version(caching.MENU))
+
+
+def index_etag(request):
+    # Upcoming events depend on the local date as well as on the events themselves
+    return _page_etag(
+        "index",
+        timezone.localdate(),
+        caching.get_version(caching.EVENTS),
+        caching.get_version(caching.HOURS),
+    )
+
+
+def calendar_etag(request):
+    return _page_etag(
+        "calendar",
+        timezone.localdate(),
+        caching.get_version(caching.EVENTS),
+        request.GET.urlencode(),
+        request.headers.get('x-requested-with', ''),
+    )
+
+
+def event_details_etag(request, event_id):
+    return _page_etag("event", event_id, caching.get_version(caching.EVENTS))
+
+
+def async_condition(etag_func=None, last_modified_func=None):
+    """
+    Async counterpart of django.views.decorators.http.condition.
+
+    Django's decorator accepts async views but calls the validators inside
+    the event loop, where the cache and database lookups they make would
+    block (or raise SynchronousOnlyOperation). Here they run in a worker
+    thread; the rest follows Django's decorator for GET and HEAD requests.
+    """
+    def _validators(request, *args, **kwargs):
+        etag = etag_func(request, *args, **kwargs) if etag_func else None
+        last_modified = last_modified_func(request, *args, **kwargs) if last_modified_func else None
+        return (
+            quote_etag(etag) if etag else None,
+            int(last_modified.timestamp()) if last_modified else None,
+        )
+
+    def decorator(view):
+        @wraps(view)
+        async def inner(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return await view(request, *args, **kwargs)
+
+            etag, last_modified = await sync_to_async(_validators)(request, *args, **kwargs)
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = await view(request, *args, **kwargs)
+
+            if last_modified and not response.has_header('Last-Modified'):
+                response.headers['Last-Modified'] = http_date(last_modified)
+            if etag:
+                response.headers.setdefault('ETag', etag)
+            return response
+
+        return inner
+
+    return decorator
+
+
+def public_cache_control(view):
+    """
+    Let shared caches (a CDN) keep a public page's GET responses.
+
+    Browsers revalidate with the ETag on every visit; shared caches may
+    serve the page for PUBLIC_PAGE_S_MAXAGE seconds. Form pages use it too,
+    so POST responses (form errors) are left alone, as is any response
+    that sets a cookie. Works on sync and async views.
+
+    A page rendered from a stale snapshot while another worker rebuilds it
+    doesn't match the ETag, which is built from the current versions, so
+    it is sent without validators and must not be cached.
+    """
+    def _mark_public(request, response, stale_reads):
+        if request.method not in ('GET', 'HEAD'):
+            return response
+        if stale_reads:
+            del response['ETag']
+            del response['Last-Modified']
+            patch_cache_control(response, no_cache=True, max_age=0)
+        elif not response.cookies:
+            patch_cache_control(response, public=True, max_age=0, s_maxage=settings.PUBLIC_PAGE_S_MAXAGE)
+        return response
+
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def inner(request, *args, **kwargs):
+            with tracking_stale_reads() as stale_reads:
+                response = await view(request, *args, **kwargs)
+            return _mark_public(request, response, stale_reads)
+    else:
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            with tracking_stale_reads() as stale_reads:
+                response = view(request, *args, **kwargs)
+            return _mark_public(request, response, stale_reads)
+
+    return inner
@@ -0,0 +1,19 @@
+from django.conf import settings
+
+from .conditional import static_files_version
+
+
+def static_version(request):
+    """
+    Expose STATIC_VERSION to templates for the ?v= cache-busting suffix.
+
+    It is only set in development. In production collectstatic gives every
+    file a content-hashed name, so {% static %} URLs change by themselves.
+
+    STATIC_FILES_VERSION changes whenever any static file does, in both
+    cases. Cached template fragments that link static files vary on it.
+    """
+    return {
+        'STATIC_VERSION': settings.STATIC_VERSION,
+        'STATIC_FILES_VERSION': static_files_version(),
+    }
@@ -108,7 +108,8 @@ class BarleryUserCreationForm(UserCreationForm):
 class EventForm(forms.ModelForm):
     """
     Form for creating and editing events.
-    Automatically compresses uploaded images to improve performance.
+    Automatically compresses uploaded images and generates resized
+    renditions of them to improve performance.
     """
     class Meta:
         model = Event
@@ -145,6 +146,22 @@ class EventForm(forms.ModelForm):
                 raise forms.ValidationError("Event date must be today or a future date.")
         return date
     
+    def clean_image(self):
+        """
+        Reject images with too many pixels to be decoded safely.
+        """
+        from .utils import ImageTooLarge, check_image_pixels
+
+        image = self.cleaned_data.get('image')
+        # forms.ImageField attaches the (header-only) PIL image to new uploads
+        pil_image = getattr(image, 'image', None)
+        if pil_image is not None:
+            try:
+                check_image_pixels(pil_image)
+            except ImageTooLarge as e:
+                raise forms.ValidationError(str(e))
+        return image
+    
     def save(self, commit=True):
         """
         Save the form and compress the uploaded image if present.
@@ -166,10 +183,37 @@ class EventForm(forms.ModelForm):
                 logger.warning(f"Image compression failed: {e}. Saving original image.")
         
         if commit:
+            # Keep the uploaded file so renditions can be made without re-downloading it
+            new_image = instance.image.file if 'image' in self.changed_data and instance.image else None
+
             instance.save()
+
+            # Rebuild the resized renditions (card, detail, social) whenever the image changes
+            if 'image' in self.changed_data:
+                self._update_renditions(instance, new_image)
         
         return instance
 
+    def _update_renditions(self, instance, image_file):
+        """
+        Regenerate (or remove) the image renditions for a saved event.
+        """
+        if not instance.image:
+            instance.delete_renditions()
+            return
+
+        try:
+            if image_file is None or image_file.closed:
+                with instance.image.open('rb') as stored_file:
+                    instance.rebuild_renditions(stored_file)
+            else:
+                instance.rebuild_renditions(image_file)
+        except Exception as e:
+            # Pages fall back to the main image if renditions are missing
+            import logging
+            logger = logging.getLogger(__name__)
+            logger.warning(f"Image rendition generation failed: {e}")
+
 
 class MenuItemForm(forms.ModelForm):
     """
@@ -2,10 +2,15 @@
 Email sending functions for Barlery.
 
 This module contains all email logic separated from views for better organization.
+
+Emails are not sent from here: they are written to the outbox (see
+outbox.py) and delivered by the send_outbox management command, so a slow
+or unavailable mail server never holds up a request.
 """
 
-from django.core.mail import send_mail
 from django.conf import settings
+from .models import OutboundEmail
+from .outbox import enqueue
 import logging
 
 logger = logging.getLogger(__name__)
@@ -22,7 +27,7 @@ def send_contact_email(name, email, subject, message):
         message (str): Message content
     
     Returns:
-        bool: True if email sent successfully, False otherwise
+        bool: True if email queued successfully, False otherwise
     """
     email_subject = f"[Contact Form] {subject}"
     
@@ -47,28 +52,27 @@ This is an automated notification from the Barlery website.
 """
     
     try:
-        send_mail(
-            subject=email_subject,
-            message=email_body,
-            from_email=getattr(settings, "DEFAULT_FROM_EMAIL", None),
-            recipient_list=[settings.CONTACT_RECIPIENT_EMAIL],
-            fail_silently=False,
-        )
+        enqueue(OutboundEmail.KIND_CONTACT, email_subject, email_body, reply_to=email)
         return True
     except Exception as e:
-        logger.error(f"Failed to send contact email: {str(e)}", exc_info=True)
+        logger.error(f"Failed to queue contact email: {str(e)}", exc_info=True)
         return False
 
 
-def send_venue_request_email(event_request):
+def send_venue_request_email(event_request, urgent=None):
     """
     Send a venue rental request notification email to staff.
     
+    In digest mode (STAFF_EMAIL_DIGEST_MINUTES) the email is held for the
+    next staff digest, unless it is urgent.
+    
     Args:
         event_request (EventRequest): The EventRequest model instance
+        urgent (bool): Send right away, bypassing the digest. By default,
+            requests for dates within STAFF_EMAIL_URGENT_DAYS are urgent.
     
     Returns:
-        bool: True if email sent successfully, False otherwise
+        bool: True if email queued successfully, False otherwise
     """
     from .models import EventRequest
     from django.utils import timezone
@@ -77,6 +81,10 @@ def send_venue_request_email(event_request):
     local_tz = timezone.get_current_timezone()
     date_requested_local = timezone.localtime(event_request.date_requested, local_tz)
     
+    if urgent is None:
+        days_until = (event_request.date - timezone.localdate()).days
+        urgent = days_until <= getattr(settings, "STAFF_EMAIL_URGENT_DAYS", 0)
+    
     # Subject line
     subject = f"[Venue Request] {event_request.nature} on {event_request.date.strftime('%B %d, %Y')}"
     
@@ -117,28 +125,26 @@ This is an automated notification from the Barlery website.
 """
     
     try:
-        send_mail(
-            subject=subject,
-            message=message,
-            from_email=getattr(settings, "DEFAULT_FROM_EMAIL", None),
-            recipient_list=[settings.CONTACT_RECIPIENT_EMAIL],
-            fail_silently=False,
-        )
+        enqueue(OutboundEmail.KIND_VENUE_REQUEST, subject, message, digest=not urgent)
         return True
     except Exception as e:
-        logger.error(f"Failed to send venue request email: {str(e)}", exc_info=True)
+        logger.error(f"Failed to queue venue request email: {str(e)}", exc_info=True)
         return False
 
 
-def send_new_user_email(user):
+def send_new_user_email(user, urgent=False):
     """
     Send notification email to staff when a new user account is created.
     
+    In digest mode (STAFF_EMAIL_DIGEST_MINUTES) the email is held for the
+    next staff digest, unless it is urgent.
+    
     Args:
         user: User model instance (newly created, inactive)
+        urgent (bool): Send right away, bypassing the digest
     
     Returns:
-        bool: True if email sent successfully, False otherwise
+        bool: True if email queued successfully, False otherwise
     """
     from django.utils import timezone
     
@@ -170,16 +176,10 @@ This is an automated notification from the Barlery website.
 """
     
     try:
-        send_mail(
-            subject=subject,
-            message=message,
-            from_email=getattr(settings, "DEFAULT_FROM_EMAIL", None),
-            recipient_list=[settings.CONTACT_RECIPIENT_EMAIL],
-            fail_silently=False,
-        )
+        enqueue(OutboundEmail.KIND_NEW_USER, subject, message, digest=not urgent)
         return True
     except Exception as e:
-        logger.error(f"Failed to send new user email: {str(e)}", exc_info=True)
+        logger.error(f"Failed to queue new user email: {str(e)}", exc_info=True)
         return False
 
 
@@ -191,7 +191,7 @@ def send_user_activation_email(user):
         user: User model instance (newly activated)
     
     Returns:
-        bool: True if email sent successfully, False otherwise
+        bool: True if email queued successfully, False otherwise
     """
     from django.utils import timezone
     
@@ -221,14 +221,54 @@ This is an automated notification from the Barlery website.
 """
     
     try:
-        send_mail(
-            subject=subject,
-            message=message,
-            from_email=getattr(settings, "DEFAULT_FROM_EMAIL", None),
-            recipient_list=[settings.CONTACT_RECIPIENT_EMAIL],
-            fail_silently=False,
-        )
+        enqueue(OutboundEmail.KIND_USER_ACTIVATION, subject, message)
         return True
     except Exception as e:
-        logger.error(f"Failed to send user activation email: {str(e)}", exc_info=True)
-        return False
\ No newline at end of file
+        logger.error(f"Failed to queue user activation email: {str(e)}", exc_info=True)
+        return False
+
+
+def render_newsletter_body(events, unsubscribe_url):
+    """
+    Build the plain-text body of the upcoming events newsletter.
+    
+    The body is rendered once per issue; unsubscribe_url is normally a
+    placeholder that is replaced for each recipient when sending.
+    
+    Args:
+        events: Upcoming Event instances, in date order
+        unsubscribe_url (str): Link (or placeholder) for unsubscribing
+    
+    Returns:
+        str: Email body
+    """
+    from django.urls import reverse
+    
+    sections = []
+    for event in events:
+        if event.end_time:
+            times = f"{event.start_time.strftime('%I:%M %p')} - {event.end_time.strftime('%I:%M %p')} ET"
+        else:
+            times = f"{event.start_time.strftime('%I:%M %p')} ET"
+        
+        sections.append(f"""{event.title.upper()}
+{event.date.strftime('%A, %B %d, %Y')}, {times}
+
+{event.description.strip()}
+
+Details: {settings.SITE_URL}{reverse('barlery:event_details', args=[event.id])}
+""")
+    
+    events_text = "\n--------------------\n\n".join(sections)
+    
+    return f"""Upcoming Events at Barlery
+
+Here's what's coming up:
+
+{events_text}
+Full calendar: {settings.SITE_URL}{reverse('barlery:calendar')}
+
+---
+You're receiving this because you subscribed to Barlery event updates.
+Unsubscribe: {unsubscribe_url}
+"""
@@ -0,0 +1,110 @@
+"""
+Django Management Command: Benchmark Fragments
+
+Measures how long it takes to render event cards and menu items with and
+without their cached template fragments (see _event_card.html and
+_menu_item.html).
+
+"uncached" renders every fragment from scratch, as before fragment
+caching; "cached" renders from a warm fragment cache, as a busy site
+does. Times are the median over --rounds renders, per 100 objects.
+
+It renders in-process and writes nothing to the database. Events and menu
+items are taken from the database (repeated when there are fewer than
+--count), so seed some first:
+
+    python manage.py seed_events
+    python manage.py seed_menu
+    python manage.py benchmark_fragments
+
+Usage:
+    # 100 cards and 100 menu items, 20 rounds each
+    python manage.py benchmark_fragments
+
+    # More rounds for steadier numbers
+    python manage.py benchmark_fragments --rounds 100
+"""
+
+import itertools
+import statistics
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.template import engines
+from django.template.loader import get_template
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from barlery.models import Event, MenuItem
+
+# Fragments are read from the 'template_fragments' cache when one is defined
+UNCACHED = {
+    **settings.CACHES,
+    'template_fragments': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+}
+
+# menu.html includes items one by one between section headings
+MENU_ITEMS_TEMPLATE = '{% for item in items %}{% include "barlery/_menu_item.html" with item=item %}{% endfor %}'
+
+
+class Command(BaseCommand):
+    help = 'Benchmark rendering event cards and menu items with and without fragment caching'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--count',
+            type=int,
+            default=100,
+            help='Cards and menu items per render (default: 100)',
+        )
+        parser.add_argument(
+            '--rounds',
+            type=int,
+            default=20,
+            help='Renders per measurement (default: 20)',
+        )
+
+    def handle(self, *args, **options):
+        count = options['count']
+        rounds = options['rounds']
+
+        events = list(Event.objects.prefetch_related('renditions').order_by('date', 'start_time')[:count])
+        items = list(MenuItem.objects.order_by('name')[:count])
+        if not events or not items:
+            raise CommandError('Needs events and menu items; run seed_events and seed_menu first')
+
+        events = list(itertools.islice(itertools.cycle(events), count))
+        items = list(itertools.islice(itertools.cycle(items), count))
+        templates = [
+            ('event cards', get_template('barlery/_event_cards_list.html'), {'events': events}),
+            ('menu items', engines['django'].from_string(MENU_ITEMS_TEMPLATE), {'items': items}),
+        ]
+
+        # Cards and items render the same for every visitor
+        request = RequestFactory().get('/')
+
+        self.stdout.write(f'Median render time per 100 objects over {rounds} rounds:')
+        for label, template, context in templates:
+            with override_settings(CACHES=UNCACHED):
+                uncached = self.measure(template, context, request, rounds)
+
+            # Warm the fragment cache, then time renders served from it
+            template.render(context, request)
+            cached = self.measure(template, context, request, rounds)
+
+            scale = 100 / count
+            self.stdout.write(
+                f'  {label:<12} uncached {uncached * scale:7.2f} ms   '
+                f'cached {cached * scale:7.2f} ms   ({uncached / cached:.1f}x)'
+            )
+
+        caches.close_all()
+
+    def measure(self, template, context, request, rounds):
+        timings = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            template.render(context, request)
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
@@ -0,0 +1,182 @@
+"""
+Django Management Command: Benchmark Pages
+
+Load-tests a running server on the public pages and reports throughput and
+latency per page. Used to compare gunicorn worker classes (see
+gunicorn.conf.py); it only makes HTTP requests, so point it at a local or
+staging server, never at production.
+
+Normal clients send requests back to back over keep-alive connections.
+Slow clients (--slow-clients) send each request one header line at a time
+with a pause between lines, like phones on a poor connection; a threaded
+worker holds a thread for each of them until the request is complete.
+
+Usage:
+    # 20 clients for 15 seconds against a server on port 8000
+    python manage.py benchmark_pages
+
+    # 50 clients plus 200 slow ones, for 30 seconds
+    python manage.py benchmark_pages --concurrency 50 --slow-clients 200 --duration 30
+
+    # Only some pages, on another server
+    python manage.py benchmark_pages --base-url http://127.0.0.1:8080 --pages / /menu
+"""
+
+import http.client
+import socket
+import threading
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_PAGES = ['/', '/menu', '/calendar', '/about']
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * fraction))
+    return sorted_values[index]
+
+
+class Command(BaseCommand):
+    help = 'Load-test the public pages of a running server'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--base-url',
+            default='http://127.0.0.1:8000',
+            help='Server to test (default: http://127.0.0.1:8000)',
+        )
+        parser.add_argument(
+            '--pages',
+            nargs='+',
+            default=DEFAULT_PAGES,
+            help=f"Paths to request in turn (default: {' '.join(DEFAULT_PAGES)})",
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=20,
+            help='Clients sending requests back to back (default: 20)',
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=15,
+            help='Seconds to run for (default: 15)',
+        )
+        parser.add_argument(
+            '--slow-clients',
+            type=int,
+            default=0,
+            help='Additional clients that send their requests slowly (default: 0)',
+        )
+        parser.add_argument(
+            '--slow-send',
+            type=float,
+            default=0.5,
+            help='Seconds slow clients wait between request lines (default: 0.5)',
+        )
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['base_url'])
+        if url.scheme != 'http' or not url.hostname:
+            raise CommandError('--base-url must be a plain http:// URL')
+        self.host = url.hostname
+        self.port = url.port or 80
+        self.pages = options['pages']
+        self.deadline = time.monotonic() + options['duration']
+
+        self.lock = threading.Lock()
+        self.latencies = {page: [] for page in self.pages}
+        self.errors = {page: 0 for page in self.pages}
+        self.slow_completed = 0
+
+        clients = [
+            threading.Thread(target=self.run_client, args=(i,), daemon=True)
+            for i in range(options['concurrency'])
+        ] + [
+            threading.Thread(target=self.run_slow_client, args=(options['slow_send'],), daemon=True)
+            for _ in range(options['slow_clients'])
+        ]
+
+        self.stdout.write(
+            f"{options['concurrency']} clients + {options['slow_clients']} slow clients "
+            f"for {options['duration']:g}s against {options['base_url']}"
+        )
+        started = time.monotonic()
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+        elapsed = time.monotonic() - started
+
+        self.report(elapsed)
+
+    def run_client(self, offset):
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+        # Start each client on a different page so all pages are hit evenly
+        i = offset
+        while time.monotonic() < self.deadline:
+            page = self.pages[i % len(self.pages)]
+            i += 1
+            start = time.monotonic()
+            try:
+                conn.request('GET', page)
+                response = conn.getresponse()
+                response.read()
+                ok = response.status == 200
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                ok = False
+            latency = time.monotonic() - start
+
+            with self.lock:
+                if ok:
+                    self.latencies[page].append(latency)
+                else:
+                    self.errors[page] += 1
+        conn.close()
+
+    def run_slow_client(self, pause):
+        lines = [
+            f'GET {self.pages[0]} HTTP/1.1\r\n',
+            f'Host: {self.host}\r\n',
+            'User-Agent: benchmark_pages (slow client)\r\n',
+            'Accept: text/html\r\n',
+            'Connection: close\r\n',
+            '\r\n',
+        ]
+        while time.monotonic() < self.deadline:
+            try:
+                with socket.create_connection((self.host, self.port), timeout=30) as sock:
+                    for line in lines:
+                        sock.sendall(line.encode())
+                        time.sleep(pause)
+                    while sock.recv(65536):
+                        pass
+            except OSError:
+                time.sleep(pause)
+                continue
+            with self.lock:
+                self.slow_completed += 1
+
+    def report(self, elapsed):
+        total = sum(len(latencies) for latencies in self.latencies.values())
+        self.stdout.write('')
+        self.stdout.write(f"{'page':<20}{'requests':>10}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for page in self.pages:
+            latencies = sorted(self.latencies[page])
+            self.stdout.write(
+                f"{page:<20}{len(latencies):>10}{self.errors[page]:>8}"
+                f"{percentile(latencies, 0.50) * 1000:>10.1f}"
+                f"{percentile(latencies, 0.95) * 1000:>10.1f}"
+                f"{percentile(latencies, 0.99) * 1000:>10.1f}"
+            )
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} requests in {elapsed:.1f}s: {total / elapsed:.1f} requests/s"
+            f" ({sum(self.errors.values())} errors, {self.slow_completed} slow requests completed)"
+        ))
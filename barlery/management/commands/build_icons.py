@@ -0,0 +1,161 @@
+"""
+Django Management Command: Build Icons
+
+Scans the templates and scripts for the Font Awesome icons they use and
+writes barlery/static/css/icons.css with just those icons, so pages no
+longer load the whole Font Awesome stylesheet and web fonts from a CDN.
+
+Each icon is an inline SVG used as a CSS mask over currentColor, so the
+existing markup keeps working unchanged:
+
+    <i class="fas fa-edit"></i>   <i class="fab fa-instagram"></i>
+
+Icons take the text color and scale with font-size like the icon font
+did. The generated file is committed; rerun the command after adding an
+icon to a template. The icon SVGs are read from the Font Awesome Free
+metadata (icons.json), which the fontawesomefree package provides:
+
+    pip install fontawesomefree==6.5.1
+    python manage.py build_icons
+
+Usage:
+    # Use the icons.json of the installed fontawesomefree package
+    python manage.py build_icons
+
+    # Use a downloaded Font Awesome Free distribution
+    python manage.py build_icons --source ~/Downloads/fontawesome-free-6.5.1-web/metadata/icons.json
+"""
+
+import json
+import re
+from pathlib import Path
+from urllib.parse import quote
+
+from django.core.management.base import BaseCommand, CommandError
+
+APP_DIR = Path(__file__).resolve().parents[2]
+SCAN_DIRS = [APP_DIR / 'templates', APP_DIR / 'static' / 'js']
+OUTPUT_PATH = APP_DIR / 'static' / 'css' / 'icons.css'
+
+# Style class -> Font Awesome style
+STYLE_CLASSES = {
+    'fas': 'solid', 'fa-solid': 'solid',
+    'far': 'regular', 'fa-regular': 'regular',
+    'fab': 'brands', 'fa-brands': 'brands',
+    'fa': 'solid',
+}
+
+# Modifier classes and their CSS (only those in use are written)
+MODIFIERS = {
+    'fa-fw': 'width:1.25em',
+    'fa-xs': 'font-size:.75em',
+    'fa-sm': 'font-size:.875em',
+    'fa-lg': 'font-size:1.25em',
+    'fa-2x': 'font-size:2em',
+    'fa-3x': 'font-size:3em',
+    'fa-spin': 'animation:fa-spin 2s linear infinite',
+}
+
+CLASS_ATTR_RE = re.compile(r'''class=["']([^"']*)["']''')
+SVG_RE = re.compile(r'viewBox="0 0 (\d+) (\d+)"><path d="([^"]+)"/></svg>')
+
+
+class Command(BaseCommand):
+    help = 'Generate static/css/icons.css with the Font Awesome icons the templates use'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--source',
+            help='Path to Font Awesome Free metadata/icons.json (default: from the fontawesomefree package)',
+        )
+
+    def handle(self, *args, **options):
+        metadata = self.load_metadata(options['source'])
+        aliases = {
+            alias: name
+            for name, icon in metadata.items()
+            for alias in (icon.get('aliases') or {}).get('names', [])
+        }
+
+        icons, modifiers = self.scan()
+        if not icons:
+            raise CommandError('No Font Awesome icons found in the templates')
+
+        rules = []
+        for style, name in sorted(icons):
+            canonical = aliases.get(name, name)
+            svg = metadata.get(canonical, {}).get('svg', {}).get(style)
+            if svg is None:
+                raise CommandError(f'Font Awesome Free has no {style} icon named {name}')
+
+            match = SVG_RE.search(svg['raw'])
+            if not match:
+                raise CommandError(f'Unexpected SVG markup for {style} {name}')
+            width, height, path = match.groups()
+
+            style_selector = ','.join(f'.{cls}' for cls, s in STYLE_CLASSES.items() if s == style)
+            rules.append(
+                f':is({style_selector}).fa-{name}'
+                f'{{width:{int(width) / int(height):.4g}em;--fa-icon:url("{self.data_uri(width, height, path)}")}}'
+            )
+            self.stdout.write(f'  {style} {name}' + (f' ({canonical})' if canonical != name else ''))
+
+        base_selector = ','.join(f'.{cls}' for cls in STYLE_CLASSES)
+        css = [
+            '/* Generated by `python manage.py build_icons`; do not edit.',
+            '   Icons: Font Awesome Free by @fontawesome - https://fontawesome.com',
+            '   License - https://fontawesome.com/license/free (Icons: CC BY 4.0) */',
+            f'{base_selector}{{display:inline-block;width:1em;height:1em;vertical-align:-.125em;'
+            'background-color:currentColor;'
+            '-webkit-mask:var(--fa-icon) center/contain no-repeat;mask:var(--fa-icon) center/contain no-repeat}',
+            *rules,
+            # Qualified like the icon rules, which they follow, so they can override the width
+            *(f':is({base_selector}).{modifier}{{{MODIFIERS[modifier]}}}' for modifier in sorted(modifiers)),
+        ]
+        if 'fa-spin' in modifiers:
+            css.append('@keyframes fa-spin{to{transform:rotate(360deg)}}')
+
+        OUTPUT_PATH.write_text('\n'.join(css) + '\n', encoding='utf-8')
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {len(rules)} icons to {OUTPUT_PATH.relative_to(APP_DIR.parent)} '
+            f'({OUTPUT_PATH.stat().st_size / 1024:.1f} KB)'
+        ))
+
+    def load_metadata(self, source):
+        if source is None:
+            try:
+                import fontawesomefree
+            except ImportError:
+                raise CommandError('Install fontawesomefree or pass --source')
+            source = Path(fontawesomefree.__file__).parent / 'static' / 'fontawesomefree' / 'metadata' / 'icons.json'
+
+        try:
+            with open(source, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Could not read {source}: {e}')
+
+    def scan(self):
+        """Find the (style, name) icons and the modifier classes in use."""
+        icons = set()
+        modifiers = set()
+        for directory in SCAN_DIRS:
+            for path in sorted(directory.rglob('*')):
+                if path.suffix not in ('.html', '.js'):
+                    continue
+                for class_attr in CLASS_ATTR_RE.findall(path.read_text(encoding='utf-8')):
+                    classes = class_attr.split()
+                    styles = [STYLE_CLASSES[cls] for cls in classes if cls in STYLE_CLASSES]
+                    if not styles:
+                        continue
+                    for cls in classes:
+                        if cls in MODIFIERS:
+                            modifiers.add(cls)
+                        elif cls.startswith('fa-') and cls not in STYLE_CLASSES:
+                            icons.add((styles[0], cls[3:]))
+        return icons, modifiers
+
+    @staticmethod
+    def data_uri(width, height, path):
+        svg = f"<svg xmlns='http://www.w3.org/2000/svg' viewBox='0 0 {width} {height}'><path d='{path}'/></svg>"
+        return 'data:image/svg+xml,' + quote(svg, safe=" /:='.,-")
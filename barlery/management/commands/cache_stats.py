@@ -0,0 +1,66 @@
+"""
+Django Management Command: Cache Stats
+
+Shows how the tiered cache (barlery/cache_backends.py) is doing: how many
+lookups every worker served from its in-process L1, from the shared L2,
+and how many missed both. Workers add their counts to the totals every
+30 seconds, so recent traffic shows up with that delay.
+
+Usage:
+    # Show the totals
+    python manage.py cache_stats
+
+    # Start counting again from zero, e.g. before a load test
+    python manage.py cache_stats --reset
+"""
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from barlery.cache_backends import STATS, TieredCache, stats_key
+
+
+class Command(BaseCommand):
+    help = 'Show hit and miss counts of the tiered cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--alias',
+            default='default',
+            help='Cache alias to report on (default: default)',
+        )
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Reset the counts to zero',
+        )
+
+    def handle(self, *args, **options):
+        alias = options['alias']
+        if alias not in settings.CACHES:
+            raise CommandError(f'No cache named {alias!r}')
+        cache = caches[alias]
+        if not isinstance(cache, TieredCache):
+            raise CommandError(f'Cache {alias!r} is not a TieredCache')
+
+        name = settings.CACHES[alias].get('LOCATION', '')
+        keys = {stat: stats_key(name, stat) for stat in STATS}
+
+        if options['reset']:
+            cache.l2.delete_many(keys.values())
+            self.stdout.write(self.style.SUCCESS('Reset the cache counts'))
+            return
+
+        stored = cache.l2.get_many(keys.values())
+        counts = {stat: stored.get(key, 0) for stat, key in keys.items()}
+        lookups = sum(counts.values())
+        if not lookups:
+            self.stdout.write('No lookups counted yet')
+            return
+
+        hits = counts['l1_hits'] + counts['l2_hits']
+        self.stdout.write(f'Lookups:  {lookups}')
+        self.stdout.write(f"L1 hits:  {counts['l1_hits']} ({counts['l1_hits'] / lookups:.1%})")
+        self.stdout.write(f"L2 hits:  {counts['l2_hits']} ({counts['l2_hits'] / lookups:.1%})")
+        self.stdout.write(f"Misses:   {counts['misses']} ({counts['misses'] / lookups:.1%})")
+        self.stdout.write(self.style.SUCCESS(f'Hit rate: {hits / lookups:.1%}'))
@@ -2,7 +2,17 @@
 Django Management Command: Compress Existing Event Images
 
 This command compresses all existing event images that are already
-stored in your media/storage system.
+stored in your media/storage system, and (re)generates their resized
+WebP/JPEG renditions.
+
+Each image goes through three stages: fetch (download from storage),
+encode (decode, resize, compress, make renditions) and upload (save the
+results and update the event). With --workers N the stages run
+concurrently: encoding in N worker processes, storage I/O in a thread pool.
+
+Re-runs are resumable. The content hash of every finished image is kept in
+a ledger file, per compression setting, and events whose recorded image
+hash is already in the ledger are skipped without being downloaded.
 
 Usage:
     # Preview what will happen
@@ -19,14 +29,163 @@ Usage:
 
     # Preview aggressive
     python manage.py compress_existing_images --dry-run --aggressive
+
+    # 4 encoder processes, 8 storage threads
+    python manage.py compress_existing_images --workers 4 --io-threads 8
+
+    # Ignore the ledger and look at every image again
+    python manage.py compress_existing_images --no-ledger
 """
 
-from django.core.management.base import BaseCommand
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from io import BytesIO
+
+from django.conf import settings
 from django.core.files.base import ContentFile
-from barlery.models import Event
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
 from PIL import Image
-from io import BytesIO
-import sys
+
+from barlery import caching
+from barlery.models import Event
+from barlery.utils import encode_compressed_jpeg, make_renditions
+
+
+# JPEGs within the size limits and smaller than this are already optimized
+OPTIMIZED_SIZE_KB = 500
+
+DEFAULT_LEDGER = os.path.join(settings.BASE_DIR, '.compress_ledger.json')
+
+
+def process_image(data, max_width, max_height, quality, needs_renditions, dry_run):
+    """
+    Encode stage: inspect an image and, if needed, compress it and make its renditions.
+
+    Runs in a worker process, so it takes and returns only plain data.
+
+    Returns:
+        dict: 'hash', 'size', 'width', 'height' and 'compress' for the original, plus
+            'compressed' (dict from encode_compressed_jpeg, or None) and
+            'renditions' (list from make_renditions, or None)
+    """
+    with Image.open(BytesIO(data)) as img:
+        width, height = img.size
+        image_format = img.format
+
+    needs_compression = (
+        width > max_width or
+        height > max_height or
+        image_format != 'JPEG' or
+        len(data) / 1024 >= OPTIMIZED_SIZE_KB
+    )
+
+    result = {
+        'hash': hashlib.sha256(data).hexdigest(),
+        'size': len(data),
+        'width': width,
+        'height': height,
+        'compress': needs_compression,
+        'compressed': None,
+        'renditions': None,
+    }
+
+    if dry_run:
+        return result
+
+    if needs_compression:
+        result['compressed'] = encode_compressed_jpeg(BytesIO(data), max_width, max_height, quality)
+        result['renditions'] = make_renditions(BytesIO(result['compressed']['content']))
+    elif needs_renditions:
+        # Events uploaded before renditions existed still need them
+        result['renditions'] = make_renditions(BytesIO(data))
+
+    return result
+
+
+def fetch_image(event):
+    """Fetch stage: download an event image. Returns None if it is missing from storage."""
+    try:
+        with event.image.storage.open(event.image.name, 'rb') as image_file:
+            return image_file.read()
+    except FileNotFoundError:
+        return None
+
+
+def upload_result(event, result):
+    """
+    Upload stage: save the compressed image and renditions to storage.
+
+    Only storage is touched here; the database is updated afterwards from
+    the main thread (see Command.save_result).
+
+    Returns:
+        tuple: (name of the new image or None, list of unsaved EventImageRendition rows)
+    """
+    image_name = None
+    if result['compressed']:
+        base_name = os.path.basename(event.image.name).rsplit('.', 1)[0]
+        image_name = event.image.storage.save(
+            event.image.field.generate_filename(event, f'{base_name}.jpg'),
+            ContentFile(result['compressed']['content']),
+        )
+
+    renditions = event.upload_renditions(result['renditions'] or [])
+    return image_name, renditions
+
+
+class InlineExecutor:
+    """Executor that runs each task immediately, for the serial (--workers 1) mode."""
+
+    def submit(self, fn, *args):
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+class Ledger:
+    """
+    Content hashes of images already processed with given compression settings.
+
+    Stored as JSON: {"<max_width>x<max_height>q<quality>": [hash, ...]}.
+    Both the hash of a compressed result and of an image found to be
+    already optimized are recorded, so neither is downloaded again.
+    """
+
+    def __init__(self, path, max_width, max_height, quality):
+        self.path = path
+        self.key = f'{max_width}x{max_height}q{quality}'
+        self.data = {}
+        if path and os.path.exists(path):
+            with open(path) as ledger_file:
+                self.data = json.load(ledger_file)
+        self.hashes = set(self.data.get(self.key, []))
+
+    def __contains__(self, content_hash):
+        return bool(content_hash) and content_hash in self.hashes
+
+    def add(self, content_hash):
+        self.hashes.add(content_hash)
+
+    def save(self):
+        if not self.path:
+            return
+        self.data[self.key] = sorted(self.hashes)
+        # Write to a temporary file first so an interrupted run never leaves a broken ledger
+        temp_path = f'{self.path}.tmp'
+        with open(temp_path, 'w') as ledger_file:
+            json.dump(self.data, ledger_file)
+        os.replace(temp_path, self.path)
 
 
 class Command(BaseCommand):
@@ -48,12 +207,35 @@ class Command(BaseCommand):
             type=int,
             help='Compress only a specific event by ID',
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Encoder processes; 1 processes images one at a time (default: 1)',
+        )
+        parser.add_argument(
+            '--io-threads',
+            type=int,
+            help='Threads for storage downloads and uploads (default: 2 per worker)',
+        )
+        parser.add_argument(
+            '--ledger',
+            default=DEFAULT_LEDGER,
+            help=f'Ledger of processed image hashes (default: {DEFAULT_LEDGER})',
+        )
+        parser.add_argument(
+            '--no-ledger',
+            action='store_true',
+            help='Neither read nor write the ledger',
+        )
 
     def handle(self, *args, **options):
         dry_run = options['dry_run']
         aggressive = options['aggressive']
         specific_event_id = options.get('event_id')
-        
+        workers = max(1, options['workers'])
+        io_threads = options['io_threads'] or workers * 2
+
         # Set compression parameters
         if aggressive:
             max_width = 800
@@ -65,149 +247,249 @@ class Command(BaseCommand):
             max_height = 1200
             quality = 85
             self.stdout.write(self.style.SUCCESS('Using standard compression (1200px, 85% quality)'))
-        
+
         if dry_run:
             self.stdout.write(self.style.WARNING('DRY RUN MODE - No files will be modified'))
-        
+
+        ledger = Ledger(
+            None if options['no_ledger'] else options['ledger'],
+            max_width, max_height, quality,
+        )
+
         # Get events with images
+        events = Event.objects.filter(image__isnull=False).exclude(image='')
         if specific_event_id:
-            events = Event.objects.filter(id=specific_event_id, image__isnull=False).exclude(image='')
-            if not events.exists():
-                self.stdout.write(self.style.ERROR(f'Event with ID {specific_event_id} not found or has no image'))
-                return
-        else:
-            events = Event.objects.filter(image__isnull=False).exclude(image='')
-        
-        total_events = events.count()
-        
+            events = events.filter(id=specific_event_id)
+        events = list(events.annotate(rendition_count=Count('renditions')).order_by('id'))
+
+        total_events = len(events)
+
         if total_events == 0:
-            self.stdout.write(self.style.WARNING('No events with images found'))
+            if specific_event_id:
+                self.stdout.write(self.style.ERROR(f'Event with ID {specific_event_id} not found or has no image'))
+            else:
+                self.stdout.write(self.style.WARNING('No events with images found'))
             return
-        
+
         self.stdout.write(f'\nFound {total_events} event(s) with images\n')
-        
-        compressed_count = 0
-        skipped_count = 0
-        error_count = 0
-        total_original_size = 0
-        total_compressed_size = 0
-        
-        for index, event in enumerate(events, 1):
-            self.stdout.write(f'[{index}/{total_events}] Processing: {event.title}')
-            
-            try:
-                # Check if image file exists
-                if not event.image.storage.exists(event.image.name):
-                    self.stdout.write(self.style.ERROR(f'  ✗ Image file not found in storage'))
-                    skipped_count += 1
-                    continue
-                
-                # Get original size
-                original_size = event.image.size / 1024  # KB
-                total_original_size += original_size
-                
-                # Open the image
-                image_file = event.image.open('rb')
-                img = Image.open(image_file)
-                
-                # Get original dimensions
-                original_width, original_height = img.size
-                
-                # Check if compression is needed
-                needs_compression = (
-                    original_width > max_width or 
-                    original_height > max_height or
-                    img.format != 'JPEG'
-                )
-                
-                if not needs_compression and original_size < 500:  # Less than 500KB and already optimized
-                    self.stdout.write(self.style.SUCCESS(f'  ✓ Already optimized ({original_size:.1f}KB, {original_width}x{original_height})'))
-                    total_compressed_size += original_size
-                    skipped_count += 1
-                    image_file.close()
-                    continue
-                
-                if dry_run:
-                    self.stdout.write(self.style.WARNING(f'  → Would compress: {original_size:.1f}KB ({original_width}x{original_height})'))
-                    total_compressed_size += original_size * 0.3  # Estimate 70% reduction
-                    compressed_count += 1
-                    image_file.close()
-                    continue
-                
-                # Convert RGBA to RGB if needed
-                if img.mode in ('RGBA', 'LA', 'P'):
-                    background = Image.new('RGB', img.size, (255, 255, 255))
-                    if img.mode == 'P':
-                        img = img.convert('RGBA')
-                    background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                    img = background
-                elif img.mode != 'RGB':
-                    img = img.convert('RGB')
-                
-                # Calculate new dimensions
-                width, height = img.size
-                if width > max_width or height > max_height:
-                    width_ratio = max_width / width
-                    height_ratio = max_height / height
-                    scale_factor = min(width_ratio, height_ratio)
-                    
-                    new_width = int(width * scale_factor)
-                    new_height = int(height * scale_factor)
-                    
-                    img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                
-                # Save compressed image
-                output = BytesIO()
-                img.save(output, format='JPEG', quality=quality, optimize=True)
-                output.seek(0)
-                
-                # Get compressed size
-                compressed_size = len(output.getvalue()) / 1024  # KB
-                total_compressed_size += compressed_size
-                
-                # Calculate reduction
-                reduction = ((original_size - compressed_size) / original_size) * 100 if original_size > 0 else 0
-                
-                # Get the filename
-                original_name = event.image.name
-                name_parts = original_name.rsplit('.', 1)
-                new_name = f"{name_parts[0]}.jpg"
-                
-                # Delete old file if it exists
-                if event.image.storage.exists(event.image.name):
-                    event.image.delete(save=False)
-                
-                # Save the compressed image
-                event.image.save(new_name, ContentFile(output.getvalue()), save=True)
-                
+
+        self.stats = {
+            'compressed': 0,
+            'skipped': 0,
+            'ledger_skipped': 0,
+            'errors': 0,
+            'original_kb': 0,
+            'compressed_kb': 0,
+            'downloaded_bytes': 0,
+            'uploaded_bytes': 0,
+        }
+
+        # Images finished in earlier runs are skipped without downloading them
+        pending = []
+        for event in events:
+            if event.image_hash in ledger:
+                self.stats['ledger_skipped'] += 1
+            else:
+                pending.append(event)
+
+        if self.stats['ledger_skipped']:
+            self.stdout.write(f"Skipping {self.stats['ledger_skipped']} image(s) already in the ledger")
+
+        if workers == 1:
+            io_pool = cpu_pool = InlineExecutor()
+        else:
+            io_pool = ThreadPoolExecutor(max_workers=io_threads)
+            cpu_pool = ProcessPoolExecutor(max_workers=workers)
+
+        started = time.perf_counter()
+        try:
+            self.run_pipeline(pending, io_pool, cpu_pool, ledger, max_width, max_height, quality, dry_run, workers)
+        finally:
+            io_pool.shutdown(wait=True, cancel_futures=True)
+            cpu_pool.shutdown(wait=True, cancel_futures=True)
+            if not dry_run:
+                ledger.save()
+        elapsed = time.perf_counter() - started
+
+        if not dry_run and self.stats['compressed']:
+            # Event images are repointed with update(), which sends no signals
+            caching.bump_version(caching.EVENTS)
+
+        self.print_summary(total_events, elapsed, dry_run)
+
+    def run_pipeline(self, pending, io_pool, cpu_pool, ledger, max_width, max_height, quality, dry_run, workers):
+        """
+        Push events through the fetch, encode and upload stages.
+
+        Stages overlap: as soon as one image is downloaded it is handed to the
+        encoders, and as soon as it is encoded its upload starts. Downloads are
+        limited so at most a few images per worker are held in memory.
+        """
+        max_in_flight = workers * 2
+        queue = iter(pending)
+        in_flight = {}  # future -> (stage, event, payload)
+
+        def start_fetches():
+            while sum(1 for stage, _, _ in in_flight.values() if stage != 'upload') < max_in_flight:
+                event = next(queue, None)
+                if event is None:
+                    return
+                in_flight[io_pool.submit(fetch_image, event)] = ('fetch', event, None)
+
+        start_fetches()
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, event, payload = in_flight.pop(future)
+                try:
+                    self.finish_stage(
+                        stage, event, payload, future.result(),
+                        io_pool, cpu_pool, in_flight, ledger,
+                        max_width, max_height, quality, dry_run,
+                    )
+                except Exception as e:
+                    self.stdout.write(self.style.ERROR(f'✗ {event.title}: {e}'))
+                    self.stats['errors'] += 1
+            start_fetches()
+
+    def finish_stage(self, stage, event, payload, value, io_pool, cpu_pool, in_flight, ledger,
+                     max_width, max_height, quality, dry_run):
+        """Handle a finished stage of one event and start its next stage."""
+        if stage == 'fetch':
+            data = value
+            if data is None:
+                self.stdout.write(self.style.ERROR(f'✗ {event.title}: Image file not found in storage'))
+                self.stats['skipped'] += 1
+                return
+
+            self.stats['downloaded_bytes'] += len(data)
+            needs_renditions = not event.rendition_count
+            future = cpu_pool.submit(process_image, data, max_width, max_height, quality, needs_renditions, dry_run)
+            in_flight[future] = ('encode', event, None)
+
+        elif stage == 'encode':
+            result = value
+            original_kb = result['size'] / 1024
+            self.stats['original_kb'] += original_kb
+
+            if not result['compress']:
                 self.stdout.write(self.style.SUCCESS(
-                    f'  ✓ Compressed: {original_size:.1f}KB → {compressed_size:.1f}KB '
-                    f'({reduction:.1f}% reduction, {img.size[0]}x{img.size[1]})'
+                    f"✓ {event.title}: Already optimized ({original_kb:.1f}KB, {result['width']}x{result['height']})"
+                ))
+                self.stats['compressed_kb'] += original_kb
+                self.stats['skipped'] += 1
+                if dry_run:
+                    return
+                self.record_metadata(event, result)
+                if result['renditions']:
+                    in_flight[io_pool.submit(upload_result, event, result)] = ('upload', event, result)
+                else:
+                    ledger.add(result['hash'])
+                return
+
+            if dry_run:
+                self.stdout.write(self.style.WARNING(
+                    f"→ {event.title}: Would compress {original_kb:.1f}KB ({result['width']}x{result['height']})"
                 ))
-                
-                compressed_count += 1
-                image_file.close()
-                
-            except Exception as e:
-                self.stdout.write(self.style.ERROR(f'  ✗ Error: {str(e)}'))
-                error_count += 1
-                continue
-        
-        # Summary
+                self.stats['compressed_kb'] += original_kb * 0.3  # Estimate 70% reduction
+                self.stats['compressed'] += 1
+                return
+
+            in_flight[io_pool.submit(upload_result, event, result)] = ('upload', event, result)
+
+        elif stage == 'upload':
+            result = payload
+            self.save_result(event, result, *value)
+            self.stats['uploaded_bytes'] += sum(len(r['content']) for r in result['renditions'] or [])
+
+            if not result['compressed']:
+                self.stdout.write(self.style.SUCCESS(f'✓ {event.title}: Generated renditions'))
+                ledger.add(result['hash'])
+                return
+
+            compressed = result['compressed']
+            original_kb = result['size'] / 1024
+            compressed_kb = len(compressed['content']) / 1024
+            reduction = ((original_kb - compressed_kb) / original_kb) * 100 if original_kb > 0 else 0
+            self.stats['compressed_kb'] += compressed_kb
+            self.stats['uploaded_bytes'] += len(compressed['content'])
+            self.stats['compressed'] += 1
+            ledger.add(event.image_hash)
+
+            self.stdout.write(self.style.SUCCESS(
+                f'✓ {event.title}: Compressed {original_kb:.1f}KB → {compressed_kb:.1f}KB '
+                f"({reduction:.1f}% reduction, {compressed['width']}x{compressed['height']})"
+            ))
+
+    def save_result(self, event, result, image_name, renditions):
+        """Point the event at its uploaded files and remove the files they replace."""
+        old_image_name = event.image.name
+
+        with transaction.atomic():
+            if image_name:
+                compressed_file = ContentFile(result['compressed']['content'])
+                event.set_image_metadata(compressed_file)
+                event.image.name = image_name
+                # update() skips Event.save, which would look up and delete the old image itself
+                Event.objects.filter(pk=event.pk).update(
+                    image=image_name,
+                    image_exists=True,
+                    image_width=event.image_width,
+                    image_height=event.image_height,
+                    image_size=event.image_size,
+                    image_hash=event.image_hash,
+                )
+
+            if renditions:
+                event.delete_renditions()
+                for rendition in renditions:
+                    rendition.save()
+
+        if image_name:
+            event.image.storage.delete(old_image_name)
+
+    def record_metadata(self, event, result):
+        """Record the metadata of an image that is kept as is, so later runs can skip it."""
+        if event.image_hash == result['hash']:
+            return
+        Event.objects.filter(pk=event.pk).update(
+            image_exists=True,
+            image_width=result['width'],
+            image_height=result['height'],
+            image_size=result['size'],
+            image_hash=result['hash'],
+        )
+
+    def print_summary(self, total_events, elapsed, dry_run):
+        stats = self.stats
+        processed = stats['compressed'] + stats['skipped']
+
         self.stdout.write('\n' + '='*60)
         self.stdout.write(self.style.SUCCESS('COMPRESSION SUMMARY'))
         self.stdout.write('='*60)
         self.stdout.write(f'Total events processed: {total_events}')
-        self.stdout.write(f'Successfully compressed: {compressed_count}')
-        self.stdout.write(f'Already optimized (skipped): {skipped_count}')
-        self.stdout.write(f'Errors: {error_count}')
-        
-        if not dry_run and (compressed_count > 0 or skipped_count > 0):
+        self.stdout.write(f"Successfully compressed: {stats['compressed']}")
+        self.stdout.write(f"Already optimized (skipped): {stats['skipped']}")
+        self.stdout.write(f"Already in ledger (not downloaded): {stats['ledger_skipped']}")
+        self.stdout.write(f"Errors: {stats['errors']}")
+
+        if not dry_run and processed > 0:
+            total_original_size = stats['original_kb']
+            total_compressed_size = stats['compressed_kb']
             total_reduction = ((total_original_size - total_compressed_size) / total_original_size) * 100 if total_original_size > 0 else 0
             self.stdout.write(f'\nTotal original size: {total_original_size:.1f}KB ({total_original_size/1024:.1f}MB)')
             self.stdout.write(f'Total compressed size: {total_compressed_size:.1f}KB ({total_compressed_size/1024:.1f}MB)')
             self.stdout.write(self.style.SUCCESS(f'Total reduction: {total_reduction:.1f}%'))
             self.stdout.write(self.style.SUCCESS(f'Space saved: {(total_original_size - total_compressed_size)/1024:.1f}MB'))
-        
+
+        # Throughput
+        downloaded_mb = stats['downloaded_bytes'] / (1024 * 1024)
+        uploaded_mb = stats['uploaded_bytes'] / (1024 * 1024)
+        self.stdout.write(f'\nElapsed: {elapsed:.2f}s')
+        if elapsed > 0:
+            self.stdout.write(f'Throughput: {processed / elapsed:.2f} images/s')
+            self.stdout.write(f'Downloaded: {downloaded_mb:.2f}MB ({downloaded_mb / elapsed:.2f} MB/s)')
+            self.stdout.write(f'Uploaded: {uploaded_mb:.2f}MB ({uploaded_mb / elapsed:.2f} MB/s)')
+
         if dry_run:
-            self.stdout.write(self.style.WARNING('\nThis was a dry run. Run without --dry-run to actually compress images.'))
\ No newline at end of file
+            self.stdout.write(self.style.WARNING('\nThis was a dry run. Run without --dry-run to actually compress images.'))
@@ -0,0 +1,99 @@
+"""
+Django Management Command: Explain Hot Queries
+
+Prints the database query plan of each query the busiest pages run, to
+confirm they use their indexes (an ordered index scan rather than a full
+table scan plus sort). Works on SQLite (EXPLAIN QUERY PLAN) and Postgres
+(EXPLAIN).
+
+What to look for:
+    SQLite:   "SEARCH ... USING INDEX <name>" with no "USE TEMP B-TREE FOR ORDER BY"
+    Postgres: "Index Scan using <name>" with no separate "Sort" node.
+              The account search shows a "BitmapOr" of the user_*_upper_idx
+              and user_phone_digits_idx scans.
+              On a nearly empty table Postgres may still prefer a sequential
+              scan; run against real data, or with --analyze for timings.
+
+Usage:
+    python manage.py explain_hot_queries
+
+    # Postgres: run the queries and include actual row counts and timings
+    python manage.py explain_hot_queries --analyze
+
+    # Also print the SQL of each query
+    python manage.py explain_hot_queries --sql
+"""
+
+import calendar
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+from barlery.accounts import ACTIVE, PENDING, account_counts_query, account_page_query
+from barlery.models import Event, EventRequest, MenuItem, OutboundEmail
+
+
+def hot_queries():
+    """(description, queryset) for each query worth keeping indexed."""
+    today = timezone.now().date()
+    month_start = today.replace(day=1)
+    month_end = today.replace(day=calendar.monthrange(today.year, today.month)[1])
+
+    return [
+        ("Home page: next 3 events",
+         Event.objects.filter(date__gte=today).order_by('date', 'start_time')[:3]),
+        ("Calendar: first page of upcoming events",
+         Event.objects.filter(date__gte=today).order_by('date', 'start_time', 'id')[:7]),
+        ("Calendar: events in the current month",
+         Event.objects.filter(date__gte=month_start, date__lte=month_end).order_by('date', 'start_time')),
+        ("Menu: all items by category",
+         MenuItem.objects.order_by('category', 'name')),
+        ("Account management: count per status",
+         account_counts_query()),
+        ("Account management: first page of active users",
+         account_page_query(ACTIVE)),
+        ("Account management: first page of pending users",
+         account_page_query(PENDING)),
+        ("Account management: search",
+         account_page_query(ACTIVE, search='jo')),
+        ("Admin: latest venue requests",
+         EventRequest.objects.order_by('-date_requested')[:100]),
+        ("Outbox: emails due to be sent",
+         OutboundEmail.objects.filter(
+             status=OutboundEmail.STATUS_PENDING, next_attempt_at__lte=timezone.now(),
+         ).order_by('next_attempt_at', 'id')[:100]),
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Print the query plans of the hot page queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--analyze',
+            action='store_true',
+            help='Postgres only: run the queries (EXPLAIN ANALYZE) to show actual timings',
+        )
+        parser.add_argument(
+            '--sql',
+            action='store_true',
+            help='Also print the SQL of each query',
+        )
+
+    def handle(self, *args, **options):
+        explain_options = {}
+        if options['analyze']:
+            if connection.vendor == 'postgresql':
+                explain_options = {'analyze': True, 'buffers': True}
+            else:
+                self.stdout.write(self.style.WARNING(f'--analyze is not supported on {connection.vendor}; ignoring it'))
+
+        self.stdout.write(f'Database: {connection.vendor}')
+
+        for description, queryset in hot_queries():
+            self.stdout.write('\n' + '='*60)
+            self.stdout.write(self.style.SUCCESS(description))
+            self.stdout.write('='*60)
+            if options['sql']:
+                self.stdout.write(str(queryset.query) + '\n')
+            self.stdout.write(queryset.explain(**explain_options))
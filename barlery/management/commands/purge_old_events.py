@@ -0,0 +1,88 @@
+"""
+Django Management Command: Purge Old Events
+
+Deletes events dated more than a week ago, along with their images.
+Rows are deleted in bulk and images are removed from storage with batched
+DeleteObjects requests (up to 1000 keys each on R2).
+
+This used to run inside every event creation request. Run it from a
+scheduled job instead, for example once a day:
+
+    0 4 * * * cd /app && python manage.py purge_old_events
+
+Usage:
+    # Preview what will be deleted
+    python manage.py purge_old_events --dry-run
+
+    # Purge events older than 7 days (default)
+    python manage.py purge_old_events
+
+    # Keep 30 days of past events
+    python manage.py purge_old_events --days 30
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from barlery.purge import DEFAULT_RETENTION_DAYS, purge_old_events
+
+
+class Command(BaseCommand):
+    help = 'Delete events older than the retention period, in bulk'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show what would be deleted without actually deleting anything',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=DEFAULT_RETENTION_DAYS,
+            help=f'Delete events dated more than this many days ago (default: {DEFAULT_RETENTION_DAYS})',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Events per DELETE statement and storage request (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING('DRY RUN MODE - Nothing will be deleted'))
+
+        started = time.perf_counter()
+        stats = purge_old_events(
+            days=options['days'],
+            dry_run=dry_run,
+            batch_size=options['batch_size'],
+        )
+        total_seconds = time.perf_counter() - started
+
+        self.stdout.write('\n' + '='*60)
+        self.stdout.write(self.style.SUCCESS('PURGE SUMMARY'))
+        self.stdout.write('='*60)
+        self.stdout.write(f"Cutoff date: events before {stats['cutoff_date']}")
+
+        if dry_run:
+            self.stdout.write(f"Events that would be deleted: {stats['events']}")
+            self.stdout.write(f"Images that would be deleted: {stats['images']}")
+        else:
+            self.stdout.write(f"Events deleted: {stats['events']}")
+            self.stdout.write(f"Images deleted: {stats['images']}")
+
+        self.stdout.write(f"\nSelect: {stats['select_seconds'] * 1000:.1f}ms")
+        if not dry_run:
+            self.stdout.write(f"Delete rows: {stats['delete_seconds'] * 1000:.1f}ms")
+            self.stdout.write(f"Delete images: {stats['storage_seconds'] * 1000:.1f}ms")
+        self.stdout.write(self.style.SUCCESS(f'Total: {total_seconds * 1000:.1f}ms'))
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING('\nThis was a dry run. Run without --dry-run to actually delete events.'))
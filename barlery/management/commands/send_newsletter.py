@@ -0,0 +1,136 @@
+"""
+Django Management Command: Send Newsletter
+
+Emails the upcoming events to all subscribers. The body is rendered once,
+then recipients are streamed in chunks over one SMTP connection at a
+limited rate. Progress is saved per chunk; if a mailing stops part-way,
+resume it with --resume.
+
+Usage:
+    # Preview the newsletter without sending it
+    python manage.py send_newsletter --dry-run
+
+    # Send the next 30 days of events
+    python manage.py send_newsletter
+
+    # Resume an interrupted mailing
+    python manage.py send_newsletter --resume 12
+
+    # Test against a local SMTP sink (prints every message it receives):
+    #   python -m smtpd -n -c DebuggingServer localhost:1025   (Python <= 3.11)
+    #   python -m aiosmtpd -n -l localhost:1025                (pip install aiosmtpd)
+    python manage.py send_newsletter --smtp-host localhost --smtp-port 1025
+"""
+
+import time
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand, CommandError
+from barlery.models import NewsletterIssue, Subscriber
+from barlery.mailers import render_newsletter_body
+from barlery.newsletter import UNSUBSCRIBE_PLACEHOLDER, create_issue, newsletter_events, send_issue
+
+
+class Command(BaseCommand):
+    help = 'Email the upcoming events newsletter to all subscribers'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--subject',
+            default='Upcoming Events at Barlery',
+            help='Subject line (default: "Upcoming Events at Barlery")',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=30,
+            help='Include events in the next this many days (default: 30)',
+        )
+        parser.add_argument(
+            '--resume',
+            type=int,
+            metavar='ISSUE_ID',
+            help='Continue sending an interrupted issue instead of creating a new one',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=100,
+            help='Subscribers fetched and checkpointed per batch (default: 100)',
+        )
+        parser.add_argument(
+            '--rate',
+            type=float,
+            default=10,
+            help='Maximum messages per second, 0 for no limit (default: 10)',
+        )
+        parser.add_argument(
+            '--smtp-host',
+            help='Send through this SMTP server instead of EMAIL_BACKEND (e.g. a local sink)',
+        )
+        parser.add_argument(
+            '--smtp-port',
+            type=int,
+            default=25,
+            help='Port for --smtp-host (default: 25)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Print the newsletter and the number of recipients without sending',
+        )
+
+    def handle(self, *args, **options):
+        recipients = Subscriber.objects.filter(is_subscribed=True).count()
+
+        if options['dry_run']:
+            events = newsletter_events(options['days'])
+            self.stdout.write(self.style.WARNING('DRY RUN MODE - Nothing will be sent'))
+            self.stdout.write(f"Subject: {options['subject']}\n")
+            self.stdout.write(render_newsletter_body(events, UNSUBSCRIBE_PLACEHOLDER))
+            self.stdout.write(f'Would send to {recipients} subscriber(s)')
+            return
+
+        if options['resume']:
+            try:
+                issue = NewsletterIssue.objects.get(pk=options['resume'])
+            except NewsletterIssue.DoesNotExist:
+                raise CommandError(f"Newsletter issue {options['resume']} does not exist")
+            if issue.completed_at:
+                raise CommandError(f'Newsletter issue {issue.pk} was already sent completely')
+            self.stdout.write(f'Resuming issue {issue.pk} after subscriber {issue.last_subscriber_id}')
+        else:
+            issue = create_issue(options['subject'], days=options['days'])
+            if issue is None:
+                self.stdout.write(self.style.WARNING('No upcoming events - nothing to send'))
+                return
+            self.stdout.write(f'Created issue {issue.pk}, sending to {recipients} subscriber(s)')
+
+        if options['smtp_host']:
+            connection = get_connection(
+                'django.core.mail.backends.smtp.EmailBackend',
+                host=options['smtp_host'],
+                port=options['smtp_port'],
+                username='',
+                password='',
+                use_tls=False,
+                use_ssl=False,
+                fail_silently=False,
+            )
+        else:
+            connection = get_connection(fail_silently=False)
+
+        started = time.perf_counter()
+        try:
+            send_issue(issue, connection, chunk_size=options['chunk_size'], rate=options['rate'])
+        except Exception as e:
+            raise CommandError(
+                f'Sending stopped after {issue.sent_count} message(s): {e}\n'
+                f'Run again with --resume {issue.pk} to continue.'
+            )
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Issue {issue.pk} sent: {issue.sent_count} delivered, {issue.failed_count} refused '
+            f'in {elapsed:.1f}s'
+        ))
@@ -0,0 +1,76 @@
+"""
+Django Management Command: Send Outbox
+
+Delivers the emails queued by the website (contact form, venue requests,
+account notifications) over a single reused SMTP connection. Failed sends
+are retried with exponential backoff. In digest mode
+(STAFF_EMAIL_DIGEST_MINUTES) held staff notifications go out as one email
+once the window of the oldest one has passed.
+
+Run it as a long-lived worker process:
+
+    python manage.py send_outbox --loop
+
+or from a scheduled job, for example every minute:
+
+    * * * * * cd /app && python manage.py send_outbox
+
+Usage:
+    # Send everything that is due, then exit
+    python manage.py send_outbox
+
+    # Keep running, checking for new emails every 10 seconds
+    python manage.py send_outbox --loop --interval 10
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from barlery.outbox import send_pending
+
+
+class Command(BaseCommand):
+    help = 'Send queued emails from the outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and send new emails as they are queued',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5,
+            help='Seconds between outbox checks with --loop (default: 5)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Emails claimed per database query (default: 100)',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                stats = send_pending(batch_size=options['batch_size'])
+            except Exception as e:
+                # Mail server unreachable: nothing was claimed, try again later
+                if not options['loop']:
+                    raise
+                self.stderr.write(self.style.ERROR(f'Could not send outbox: {e}'))
+            else:
+                if any(stats.values()):
+                    self.stdout.write(
+                        f"Sent: {stats['sent']} ({stats['digests']} digest(s)), "
+                        f"retrying later: {stats['retried']}, failed: {stats['failed']}"
+                    )
+
+            if not options['loop']:
+                break
+
+            # Don't hold a database connection across the idle wait
+            close_old_connections()
+            time.sleep(options['interval'])
@@ -0,0 +1,104 @@
+"""
+Django Management Command: Verify Event Images
+
+This command checks every event image against storage (local or R2) and
+refreshes the image metadata stored on the Event row: whether the file
+exists, its dimensions, its size in bytes and its SHA-256 hash.
+
+Templates rely on that metadata instead of asking storage on every render,
+so run this after migrating, after restoring a bucket, or whenever files
+may have been changed outside the site.
+
+Usage:
+    # Preview what would change
+    python manage.py verify_event_images --dry-run
+
+    # Refresh metadata for all events with images
+    python manage.py verify_event_images
+
+    # Single event
+    python manage.py verify_event_images --event-id 5
+"""
+
+from django.core.management.base import BaseCommand
+from barlery import caching
+from barlery.models import Event
+
+
+class Command(BaseCommand):
+    help = 'Check event images in storage and refresh their recorded metadata'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show what would be updated without saving anything',
+        )
+        parser.add_argument(
+            '--event-id',
+            type=int,
+            help='Verify only a specific event by ID',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        specific_event_id = options.get('event_id')
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING('DRY RUN MODE - No metadata will be saved'))
+
+        events = Event.objects.all()
+        if specific_event_id:
+            events = events.filter(id=specific_event_id)
+
+        verified_count = 0
+        missing_count = 0
+        cleared_count = 0
+        error_count = 0
+        metadata_fields = ['image_exists', 'image_width', 'image_height', 'image_size', 'image_hash']
+
+        for event in events.iterator():
+            before = [getattr(event, field) for field in metadata_fields]
+
+            if not event.image:
+                event.clear_image_metadata()
+                if [getattr(event, field) for field in metadata_fields] != before:
+                    cleared_count += 1
+                    self.stdout.write(f'  - Cleared stale metadata: {event.title}')
+            else:
+                try:
+                    event.read_stored_image_metadata()
+                    if event.image_exists:
+                        verified_count += 1
+                        self.stdout.write(self.style.SUCCESS(
+                            f'  ✓ {event.title}: {event.image_width}x{event.image_height}, '
+                            f'{event.image_size / 1024:.1f}KB'
+                        ))
+                    else:
+                        missing_count += 1
+                        self.stdout.write(self.style.ERROR(f'  ✗ {event.title}: image file not found in storage'))
+                except Exception as e:
+                    error_count += 1
+                    self.stdout.write(self.style.ERROR(f'  ✗ {event.title}: {str(e)}'))
+                    continue
+
+            if not dry_run and [getattr(event, field) for field in metadata_fields] != before:
+                # update() skips Event.save() so last_updated and old images are untouched
+                Event.objects.filter(pk=event.pk).update(
+                    **{field: getattr(event, field) for field in metadata_fields}
+                )
+
+        # update() sends no signals, so invalidate cached event snapshots here
+        if not dry_run:
+            caching.bump_version(caching.EVENTS)
+
+        self.stdout.write('\n' + '='*60)
+        self.stdout.write(self.style.SUCCESS('VERIFICATION SUMMARY'))
+        self.stdout.write('='*60)
+        self.stdout.write(f'Images verified: {verified_count}')
+        self.stdout.write(f'Images missing from storage: {missing_count}')
+        self.stdout.write(f'Stale metadata cleared: {cleared_count}')
+        self.stdout.write(f'Errors: {error_count}')
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING('\nThis was a dry run. Run without --dry-run to save metadata.'))
@@ -0,0 +1,81 @@
+"""
+Middleware for Barlery.
+"""
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.utils.deprecation import MiddlewareMixin
+from whitenoise.middleware import WhiteNoiseMiddleware as BaseWhiteNoiseMiddleware
+
+# Readable by JavaScript (unlike the session cookie); see LoginHintMiddleware
+LOGIN_HINT_COOKIE = "barlery_logged_in"
+
+
+class WhiteNoiseMiddleware(BaseWhiteNoiseMiddleware):
+    """
+    WhiteNoise's middleware, able to run in async mode under ASGI.
+
+    WhiteNoise only ships a sync middleware. Under ASGI, Django would run it
+    in a thread and then block that thread on the async view behind it, so
+    every request would hold a thread anyway. In async mode this subclass
+    looks static files up in memory as usual, serves them from a worker
+    thread, and awaits everything else directly. Under WSGI it behaves
+    exactly like the original.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            # Opening and stat-ing the file is blocking I/O
+            return await sync_to_async(self.serve, thread_sensitive=False)(static_file, request)
+        return await self.get_response(request)
+
+
+class LoginHintMiddleware(MiddlewareMixin):
+    """
+    Keep the barlery_logged_in cookie in step with the login state.
+
+    Public pages never read the session, so they are the same for everyone
+    and can be cached by a CDN. static/js/staff_ui.js only asks the
+    staff_ui view for staff controls and flash messages when this cookie
+    is set, so anonymous visitors make no extra request.
+
+    The cookie is only a hint: it carries no credentials, and staff_ui
+    checks the session itself. It is set or removed on responses that
+    already loaded the session (logging in or out, any staff page), so
+    public pages still send no cookies.
+    """
+
+    def process_response(self, request, response):
+        session = getattr(request, "session", None)
+        if session is None or not session.accessed:
+            return response
+
+        logged_in = request.user.is_authenticated
+        if logged_in and LOGIN_HINT_COOKIE not in request.COOKIES:
+            response.set_cookie(
+                LOGIN_HINT_COOKIE,
+                "1",
+                max_age=None if settings.SESSION_EXPIRE_AT_BROWSER_CLOSE else settings.SESSION_COOKIE_AGE,
+                secure=settings.SESSION_COOKIE_SECURE,
+                samesite="Lax",
+            )
+        elif not logged_in and LOGIN_HINT_COOKIE in request.COOKIES:
+            response.delete_cookie(LOGIN_HINT_COOKIE, samesite="Lax")
+        return response
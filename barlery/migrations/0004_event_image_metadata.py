@@ -0,0 +1,47 @@
+# Generated by Django 5.2.9 on 2026-10-17 21:32
+
+from django.db import migrations, models
+
+
+def mark_existing_images(apps, schema_editor):
+    # Assume images already attached to events exist; run the
+    # verify_event_images command afterwards to check storage and
+    # record dimensions, size and hash.
+    Event = apps.get_model('barlery', 'Event')
+    Event.objects.filter(image__isnull=False).exclude(image='').update(image_exists=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('barlery', '0003_event_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='image_exists',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='image_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, verbose_name='Image SHA-256'),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='image_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='image_size',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Image size (bytes)'),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='image_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(mark_existing_images, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.9 on 2026-10-17 21:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('barlery', '0004_event_image_metadata'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventImageRendition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('card', 'Card thumbnail'), ('detail', 'Detail page'), ('og', 'Social sharing (Open Graph)')], max_length=10)),
+                ('format', models.CharField(choices=[('webp', 'WebP'), ('jpeg', 'JPEG')], max_length=10)),
+                ('image', models.ImageField(upload_to='events/renditions/')),
+                ('width', models.PositiveIntegerField()),
+                ('height', models.PositiveIntegerField()),
+                ('size', models.PositiveIntegerField(verbose_name='Size (bytes)')),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='renditions', to='barlery.event')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('event', 'kind', 'format'), name='unique_event_rendition')],
+            },
+        ),
+    ]
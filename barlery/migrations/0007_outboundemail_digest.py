@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-17 21:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('barlery', '0006_outboundemail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboundemail',
+            name='digest',
+            field=models.BooleanField(default=False, help_text='Held to be sent as part of the staff digest'),
+        ),
+    ]
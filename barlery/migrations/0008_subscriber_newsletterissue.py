@@ -0,0 +1,37 @@
+# Generated by Django 5.2.9 on 2026-10-17 21:45
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('barlery', '0007_outboundemail_digest'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NewsletterIssue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(max_length=255)),
+                ('body', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('last_subscriber_id', models.BigIntegerField(default=0)),
+                ('sent_count', models.PositiveIntegerField(default=0)),
+                ('failed_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Subscriber',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.EmailField(max_length=254, unique=True)),
+                ('is_subscribed', models.BooleanField(default=True)),
+                ('subscribed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('unsubscribed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.9 on 2026-10-17 21:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('barlery', '0008_subscriber_newsletterissue'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['date', 'start_time', 'id'], name='event_date_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventrequest',
+            index=models.Index(fields=['-date_requested'], name='eventrequest_requested_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menuitem',
+            index=models.Index(fields=['category', 'name'], name='menuitem_category_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['is_active', 'is_superuser', '-date_joined'], name='user_status_joined_idx'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.9 on 2026-10-17 21:48
+
+from django.db import migrations, models
+
+# Account search (barlery/accounts.py) on Postgres compiles istartswith to
+# UPPER(col) LIKE UPPER('term%') and matches phone digits with a REPLACE()
+# chain, so these expression indexes match the query exactly. The
+# text_pattern_ops operator class lets a prefix LIKE use them whatever the
+# database collation. SQLite can't use an index for these LIKEs, so the
+# indexes are only created on Postgres (and aren't part of the model state).
+SEARCH_INDEXES = [
+    ("user_first_name_upper_idx", 'UPPER("first_name")'),
+    ("user_last_name_upper_idx", 'UPPER("last_name")'),
+    ("user_email_upper_idx", 'UPPER("email")'),
+    # Must match accounts._phone_digits()
+    ("user_phone_digits_idx",
+     """REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE("phone", '(', ''), ')', ''), '-', ''), ' ', ''), '.', ''), '+', '')"""),
+]
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, expression in SEARCH_INDEXES:
+        schema_editor.execute(f'CREATE INDEX "{name}" ON "barlery_user" (({expression}) text_pattern_ops)')
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, _ in SEARCH_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('barlery', '0009_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='user',
+            name='user_status_joined_idx',
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['is_active', 'is_superuser', '-date_joined', '-id'], name='user_status_joined_idx'),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -1,6 +1,7 @@
 from django.contrib.auth.base_user import AbstractBaseUser, BaseUserManager
 from django.contrib.auth.models import PermissionsMixin
 from datetime import datetime, time, timedelta
+from django.core import signing
 from django.db import models
 from django.utils import timezone
 from django.forms import ValidationError
@@ -58,6 +59,13 @@ class User(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ["first_name", "last_name", "phone"]
 
+    class Meta:
+        indexes = [
+            # account_management: users by status, newest first. The search's
+            # expression indexes are Postgres-only and live in migration 0010.
+            models.Index(fields=["is_active", "is_superuser", "-date_joined", "-id"], name="user_status_joined_idx"),
+        ]
+
     def __str__(self):
         return f"{self.first_name} {self.last_name} <{self.email}>"
     
@@ -136,6 +144,10 @@ class MenuItem(models.Model):
 
     class Meta:
         ordering = ["name"]
+        indexes = [
+            # Menu page: items grouped by category, alphabetical
+            models.Index(fields=["category", "name"], name="menuitem_category_name_idx"),
+        ]
 
     def __str__(self):
         return self.name
@@ -152,10 +164,22 @@ class Event(models.Model):
         blank=True,
         help_text='Event promotional image'
     )
+    # Image metadata, recorded when the image is saved so that rendering
+    # never has to ask storage (R2) whether the file exists.
+    # Refreshed from storage by the verify_event_images command.
+    image_exists = models.BooleanField(default=False, editable=False)
+    image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_size = models.PositiveIntegerField("Image size (bytes)", null=True, blank=True, editable=False)
+    image_hash = models.CharField("Image SHA-256", max_length=64, blank=True, editable=False)
     last_updated = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["date", "start_time"]
+        indexes = [
+            # Home page and calendar: upcoming events in (date, start_time, id) order
+            models.Index(fields=["date", "start_time", "id"], name="event_date_start_idx"),
+        ]
 
     def clean(self):
         if self.end_time and self.end_time <= self.start_time:
@@ -164,85 +188,273 @@ class Event(models.Model):
     def has_valid_image(self):
         """
         Check if event has a valid image file in storage.
+
+        Uses the recorded image metadata, so no storage request is made.
         
         Returns:
             bool: True if image exists in storage, False otherwise
         """
-        if not self.image:
-            return False
-        
-        try:
-            # Check if the file exists in storage (works for both local and R2)
-            return self.image.storage.exists(self.image.name)
-        except Exception:
-            # If there's any error checking (permissions, network, etc.), assume it doesn't exist
-            return False
+        return bool(self.image) and self.image_exists
+
+    def set_image_metadata(self, image_file):
+        """
+        Record existence, dimensions, size and hash of the event image.
+
+        Args:
+            image_file: File object with the image contents (left rewound)
+        """
+        from .utils import read_image_metadata
+
+        metadata = read_image_metadata(image_file)
+        self.image_exists = True
+        self.image_width = metadata['width']
+        self.image_height = metadata['height']
+        self.image_size = metadata['size']
+        self.image_hash = metadata['hash']
+
+    def read_stored_image_metadata(self):
+        """Record the image metadata from the file in storage (cleared if it's missing)."""
+        storage = self.image.storage
+        if not storage.exists(self.image.name):
+            self.clear_image_metadata()
+            return
+        with storage.open(self.image.name, 'rb') as image_file:
+            self.set_image_metadata(image_file)
+
+    def clear_image_metadata(self):
+        """Reset the image metadata (no image, or image missing from storage)."""
+        self.image_exists = False
+        self.image_width = None
+        self.image_height = None
+        self.image_size = None
+        self.image_hash = ''
 
     @classmethod
-    def cleanup_old_events(cls):
+    def cleanup_old_events(cls, days=7):
         """
         Delete events that are more than 1 week old.
         
-        This method is automatically called when a new event is created.
         Events are considered "old" if their date is more than 7 days in the past.
+        This is no longer called when an event is created; run the
+        purge_old_events management command from a scheduled job instead.
         
         Returns:
             int: Number of events deleted
         """
-        from django.utils import timezone
-        from datetime import timedelta
-        
-        # Calculate cutoff date (1 week ago)
-        cutoff_date = timezone.now().date() - timedelta(days=7)
-        
-        # Find and delete old events
-        old_events = cls.objects.filter(date__lt=cutoff_date)
-        count = old_events.count()
-        
-        if count > 0:
-            # Delete each event individually to trigger the delete() method
-            # (which handles image cleanup)
-            for event in old_events:
-                event.delete()
-        
-        return count
+        from .purge import purge_old_events
+
+        return purge_old_events(days=days)['events']
 
     def save(self, *args, **kwargs):
-        """Override save to delete old image when updating and cleanup old events."""
-        # Check if this is a new event (before saving)
-        is_new_event = self.pk is None
-        
+        """Override save to delete old image when updating."""
         # Handle image updates
+        old_image_name = None
         if self.pk:  # Only for existing objects (updates)
             try:
                 old_event = Event.objects.get(pk=self.pk)
+                old_image_name = old_event.image.name
                 # If image has changed and there was an old image, delete it
+                # (deleting a file that is already gone is a no-op)
                 if old_event.image and old_event.image != self.image:
-                    if old_event.image.storage.exists(old_event.image.name):
-                        old_event.image.storage.delete(old_event.image.name)
+                    old_event.image.storage.delete(old_event.image.name)
             except Event.DoesNotExist:
                 pass  # New object, nothing to delete
+
+        # Record metadata whenever the image changed: a new upload is read
+        # while still in memory, an image already saved to storage (e.g. with
+        # event.image.save(name, content, save=False)) is read back from it
+        if not self.image:
+            self.clear_image_metadata()
+        elif not self.image._committed:
+            self.set_image_metadata(self.image)
+        elif self.image.name != old_image_name:
+            self.read_stored_image_metadata()
         
         # Save the event
         super().save(*args, **kwargs)
-        
-        # Cleanup old events after creating a new event
-        if is_new_event:
-            Event.cleanup_old_events()
 
     def delete(self, *args, **kwargs):
-        """Override delete to remove image from storage."""
-        # Delete the image file before deleting the database record
+        """Override delete to remove image and its renditions from storage."""
+        # Delete the image files before deleting the database record
+        # (deleting a file that is already gone is a no-op)
         if self.image:
-            if self.image.storage.exists(self.image.name):
-                self.image.storage.delete(self.image.name)
+            self.image.storage.delete(self.image.name)
+        self.delete_renditions()
         
         super().delete(*args, **kwargs)
 
+    def rebuild_renditions(self, image_file):
+        """
+        Replace this event's image renditions with new ones made from image_file.
+
+        Args:
+            image_file: File object with the (compressed) event image
+        """
+        from .utils import make_renditions
+
+        self.store_renditions(make_renditions(image_file))
+
+    def store_renditions(self, renditions):
+        """
+        Replace this event's image renditions with already encoded ones.
+
+        Args:
+            renditions: List of dicts as returned by utils.make_renditions
+        """
+        self.delete_renditions()
+
+        for rendition in self.upload_renditions(renditions):
+            rendition.save()
+
+        # Drop any prefetched renditions so the new ones are picked up
+        getattr(self, '_prefetched_objects_cache', {}).pop('renditions', None)
+
+    def upload_renditions(self, renditions):
+        """
+        Save encoded renditions to storage without touching the database.
+
+        Args:
+            renditions: List of dicts as returned by utils.make_renditions
+        
+        Returns:
+            list[EventImageRendition]: Unsaved rendition rows for the uploaded files
+        """
+        from django.core.files.base import ContentFile
+
+        base_name = self.image.name.rsplit('/', 1)[-1].rsplit('.', 1)[0]
+        rows = []
+        for rendition in renditions:
+            extension = 'jpg' if rendition['format'] == EventImageRendition.FORMAT_JPEG else rendition['format']
+            row = EventImageRendition(
+                event=self,
+                kind=rendition['kind'],
+                format=rendition['format'],
+                width=rendition['width'],
+                height=rendition['height'],
+                size=len(rendition['content']),
+            )
+            row.image.save(
+                f"{base_name}_{rendition['kind']}.{extension}",
+                ContentFile(rendition['content']),
+                save=False,
+            )
+            rows.append(row)
+        return rows
+
+    def delete_renditions(self):
+        """Delete all image renditions of this event (files and rows)."""
+        from .utils import delete_storage_files
+
+        if not self.pk:
+            return
+        renditions = EventImageRendition.objects.filter(event=self)
+        names = list(renditions.values_list('image', flat=True))
+        if names:
+            delete_storage_files(EventImageRendition._meta.get_field('image').storage, names)
+            renditions.delete()
+        getattr(self, '_prefetched_objects_cache', {}).pop('renditions', None)
+
+    @property
+    def card_fragment_version(self):
+        """
+        Version of everything an event card shows, for its cached fragment.
+
+        last_updated covers edits made through save(). The image fields and
+        rendition ids are included because the image maintenance commands
+        repoint images and add renditions with update() and bulk saves,
+        which leave last_updated alone.
+        """
+        rendition_ids = sorted(rendition.pk for rendition in self._renditions())
+        return f"{self.last_updated.isoformat()}:{self.image_hash}:{self.image_exists}:{rendition_ids}"
+
+    def _renditions(self, kind=None, format=None):
+        # Uses prefetch_related('renditions') results when available
+        return [
+            rendition for rendition in self.renditions.all()
+            if (kind is None or rendition.kind == kind)
+            and (format is None or rendition.format == format)
+        ]
+
+    def _srcset(self, format):
+        renditions = self._renditions(format=format)
+        renditions = [r for r in renditions if r.kind != EventImageRendition.KIND_OG]
+        return ", ".join(f"{r.image.url} {r.width}w" for r in sorted(renditions, key=lambda r: r.width))
+
+    @property
+    def webp_srcset(self):
+        """srcset value listing the WebP card and detail renditions."""
+        return self._srcset(EventImageRendition.FORMAT_WEBP)
+
+    @property
+    def jpeg_srcset(self):
+        """srcset value listing the JPEG card and detail renditions."""
+        return self._srcset(EventImageRendition.FORMAT_JPEG)
+
+    @property
+    def card_rendition(self):
+        """JPEG card rendition (fallback src for cards), or None."""
+        renditions = self._renditions(EventImageRendition.KIND_CARD, EventImageRendition.FORMAT_JPEG)
+        return renditions[0] if renditions else None
+
+    @property
+    def detail_rendition(self):
+        """JPEG detail rendition (fallback src for the details page), or None."""
+        renditions = self._renditions(EventImageRendition.KIND_DETAIL, EventImageRendition.FORMAT_JPEG)
+        return renditions[0] if renditions else None
+
+    @property
+    def og_rendition(self):
+        """JPEG social sharing (Open Graph) rendition, or None."""
+        renditions = self._renditions(EventImageRendition.KIND_OG, EventImageRendition.FORMAT_JPEG)
+        return renditions[0] if renditions else None
+
     def __str__(self):
         return f"{self.title} ({self.date})"
 
 
+class EventImageRendition(models.Model):
+    """
+    A resized copy of an event image in one format.
+
+    Renditions are generated when the event image is uploaded or
+    recompressed and are served through srcset so browsers only download
+    the size they display.
+    """
+    KIND_CARD = 'card'
+    KIND_DETAIL = 'detail'
+    KIND_OG = 'og'
+
+    KIND_CHOICES = [
+        (KIND_CARD, 'Card thumbnail'),
+        (KIND_DETAIL, 'Detail page'),
+        (KIND_OG, 'Social sharing (Open Graph)'),
+    ]
+
+    FORMAT_WEBP = 'webp'
+    FORMAT_JPEG = 'jpeg'
+
+    FORMAT_CHOICES = [
+        (FORMAT_WEBP, 'WebP'),
+        (FORMAT_JPEG, 'JPEG'),
+    ]
+
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='renditions')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES)
+    image = models.ImageField(upload_to='events/renditions/')
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    size = models.PositiveIntegerField("Size (bytes)")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'kind', 'format'], name='unique_event_rendition'),
+        ]
+
+    def __str__(self):
+        return f"{self.event.title} – {self.kind} ({self.format}, {self.width}x{self.height})"
+
+
 class EventRequest(models.Model):
     CONTACT_EMAIL = "email"
     CONTACT_PHONE = "phone"
@@ -278,6 +490,12 @@ class EventRequest(models.Model):
 
     date_requested = models.DateTimeField("Request Submitted On",auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Admin list: most recent request first
+            models.Index(fields=["-date_requested"], name="eventrequest_requested_idx"),
+        ]
+
     def clean(self):
         super().clean()
 
@@ -323,4 +541,116 @@ class EventRequest(models.Model):
             raise ValidationError(errors)
 
     def __str__(self):
-        return f"{self.first_name} {self.last_name} – {self.date}"
\ No newline at end of file
+        return f"{self.first_name} {self.last_name} – {self.date}"
+
+class OutboundEmail(models.Model):
+    """
+    An email waiting in (or sent from) the outbox.
+
+    The functions in mailers.py only write rows here, so requests never wait
+    on the mail server. The send_outbox command delivers them over a single
+    SMTP connection, retrying failures with exponential backoff.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    KIND_CONTACT = 'contact'
+    KIND_VENUE_REQUEST = 'venue_request'
+    KIND_NEW_USER = 'new_user'
+    KIND_USER_ACTIVATION = 'user_activation'
+
+    KIND_CHOICES = [
+        (KIND_CONTACT, 'Contact form'),
+        (KIND_VENUE_REQUEST, 'Venue request'),
+        (KIND_NEW_USER, 'New user'),
+        (KIND_USER_ACTIVATION, 'User activation'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254, blank=True)
+    to = models.JSONField("Recipients", default=list)
+    reply_to = models.CharField(max_length=254, blank=True)
+    digest = models.BooleanField(default=False, help_text="Held to be sent as part of the staff digest")
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # The worker's query: pending emails that are due
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} ({self.status})"
+
+
+class Subscriber(models.Model):
+    """
+    A newsletter subscriber.
+
+    Unsubscribe links carry a signed token with the subscriber's id, so
+    they work without logging in and no token has to be stored.
+    """
+    UNSUBSCRIBE_SALT = 'barlery.subscriber.unsubscribe'
+
+    email = models.EmailField(unique=True)
+    is_subscribed = models.BooleanField(default=True)
+    subscribed_at = models.DateTimeField(default=timezone.now)
+    unsubscribed_at = models.DateTimeField(null=True, blank=True)
+
+    @property
+    def unsubscribe_token(self):
+        return signing.dumps(self.pk, salt=self.UNSUBSCRIBE_SALT)
+
+    @classmethod
+    def from_unsubscribe_token(cls, token):
+        """Return the subscriber an unsubscribe token was made for, or None if it is invalid."""
+        try:
+            pk = signing.loads(token, salt=cls.UNSUBSCRIBE_SALT)
+        except signing.BadSignature:
+            return None
+        return cls.objects.filter(pk=pk).first()
+
+    def unsubscribe(self):
+        if self.is_subscribed:
+            self.is_subscribed = False
+            self.unsubscribed_at = timezone.now()
+            self.save(update_fields=['is_subscribed', 'unsubscribed_at'])
+
+    def __str__(self):
+        return self.email
+
+
+class NewsletterIssue(models.Model):
+    """
+    One newsletter mailing.
+
+    The body is rendered once when the issue is created. Sending walks the
+    subscribers in id order and records the last one handled, so an
+    interrupted mailing resumes where it stopped instead of starting over.
+    """
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    last_subscriber_id = models.BigIntegerField(default=0)
+    sent_count = models.PositiveIntegerField(default=0)
+    failed_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.subject} ({self.created_at:%Y-%m-%d})"
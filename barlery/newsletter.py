@@ -0,0 +1,132 @@
+"""
+Newsletter mailings to Barlery's subscribers.
+
+An issue's body is rendered once (see create_issue). send_issue then walks
+the active subscribers in chunks, in id order, over one SMTP connection and
+at a limited rate. Progress is saved after every chunk, so a mailing that
+stops part-way (crash, SMTP outage) resumes from where it stopped.
+"""
+
+import logging
+import time
+from datetime import timedelta
+from smtplib import SMTPRecipientsRefused
+
+from django.conf import settings
+from django.core.mail import EmailMessage
+from django.urls import reverse
+from django.utils import timezone
+
+from .mailers import render_newsletter_body
+from .models import Event, NewsletterIssue, Subscriber
+from .outbox import send_with_reconnect
+
+logger = logging.getLogger(__name__)
+
+# Stands in for each recipient's unsubscribe link in the rendered body
+UNSUBSCRIBE_PLACEHOLDER = '%%UNSUBSCRIBE_URL%%'
+
+
+def newsletter_events(days=30):
+    """Events from today through the next `days` days, in date order."""
+    today = timezone.localdate()
+    return list(Event.objects.filter(date__gte=today, date__lte=today + timedelta(days=days)))
+
+
+def create_issue(subject, days=30):
+    """
+    Create a newsletter issue listing the events of the next few days.
+
+    Args:
+        subject: Subject line
+        days: How many days ahead to include events for
+
+    Returns:
+        NewsletterIssue: The new issue, or None if there are no upcoming events
+    """
+    events = newsletter_events(days)
+    if not events:
+        return None
+
+    return NewsletterIssue.objects.create(
+        subject=subject,
+        body=render_newsletter_body(events, UNSUBSCRIBE_PLACEHOLDER),
+    )
+
+
+def unsubscribe_url(subscriber):
+    return f"{settings.SITE_URL}{reverse('barlery:unsubscribe', args=[subscriber.unsubscribe_token])}"
+
+
+def _message(issue, subscriber, connection):
+    url = unsubscribe_url(subscriber)
+    return EmailMessage(
+        subject=issue.subject,
+        body=issue.body.replace(UNSUBSCRIBE_PLACEHOLDER, url),
+        from_email=getattr(settings, "DEFAULT_FROM_EMAIL", None),
+        to=[subscriber.email],
+        headers={
+            # One-click unsubscribe in mail clients (RFC 8058)
+            'List-Unsubscribe': f'<{url}>',
+            'List-Unsubscribe-Post': 'List-Unsubscribe=One-Click',
+        },
+        connection=connection,
+    )
+
+
+def send_issue(issue, connection, chunk_size=100, rate=None):
+    """
+    Send an issue to every active subscriber it has not been sent to yet.
+
+    Args:
+        issue: NewsletterIssue to send
+        connection: Mail backend; it is opened once and reused
+        chunk_size: Subscribers fetched (and progress saved) per batch
+        rate: Maximum messages per second (None or 0 for no limit)
+
+    Returns:
+        NewsletterIssue: The issue, with its counters updated
+
+    Errors other than a refused recipient stop the mailing; the progress
+    saved so far lets it resume later.
+    """
+    interval = 1 / rate if rate else 0
+    next_send_at = time.monotonic()
+
+    connection.open()
+    try:
+        while True:
+            chunk = list(
+                Subscriber.objects
+                .filter(is_subscribed=True, pk__gt=issue.last_subscriber_id)
+                .order_by('pk')
+                .only('pk', 'email')[:chunk_size]
+            )
+            if not chunk:
+                break
+
+            for subscriber in chunk:
+                # Rate limit: space messages at least `interval` seconds apart
+                delay = next_send_at - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                next_send_at = max(next_send_at, time.monotonic()) + interval
+
+                try:
+                    send_with_reconnect(lambda conn: _message(issue, subscriber, conn), connection)
+                except SMTPRecipientsRefused as e:
+                    # A bad address only affects that recipient
+                    logger.warning(f"Newsletter {issue.pk} refused for {subscriber.email}: {e}")
+                    issue.failed_count += 1
+                else:
+                    issue.sent_count += 1
+                issue.last_subscriber_id = subscriber.pk
+
+            issue.save(update_fields=['last_subscriber_id', 'sent_count', 'failed_count'])
+
+        issue.completed_at = timezone.now()
+    finally:
+        issue.save(update_fields=['last_subscriber_id', 'sent_count', 'failed_count', 'completed_at'])
+        connection.close()
+
+    return issue
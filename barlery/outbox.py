@@ -0,0 +1,255 @@
+"""
+Outbox for Barlery's emails.
+
+mailers.py writes emails to the OutboundEmail table instead of talking to
+the mail server inside a request. send_pending() drains that table over one
+reused SMTP connection; the send_outbox management command runs it.
+
+Failed sends are retried with exponential backoff (1, 2, 4, ... minutes,
+capped at 6 hours) and marked failed after MAX_ATTEMPTS, so a message is
+never lost because the mail server was briefly unavailable.
+
+With STAFF_EMAIL_DIGEST_MINUTES set, routine staff notifications are held
+and sent as one digest per window instead of one email each.
+"""
+
+import logging
+from datetime import timedelta
+from smtplib import SMTPServerDisconnected
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 8
+RETRY_BASE_SECONDS = 60
+RETRY_MAX_SECONDS = 6 * 60 * 60
+
+# How long a claimed email is hidden from other workers while it is being sent
+CLAIM_SECONDS = 10 * 60
+
+
+def enqueue(kind, subject, body, to=None, reply_to='', digest=False):
+    """
+    Add an email to the outbox.
+
+    Args:
+        kind: One of OutboundEmail.KIND_*
+        subject: Subject line
+        body: Plain-text body
+        to: List of recipients (default: [CONTACT_RECIPIENT_EMAIL])
+        reply_to: Optional Reply-To address
+        digest: Hold the email for the staff digest instead of sending it
+            right away. Ignored unless STAFF_EMAIL_DIGEST_MINUTES is set.
+
+    Returns:
+        OutboundEmail: The queued email
+    """
+    window = getattr(settings, "STAFF_EMAIL_DIGEST_MINUTES", 0)
+    digest = digest and window > 0
+
+    return OutboundEmail.objects.create(
+        kind=kind,
+        subject=subject,
+        body=body,
+        from_email=getattr(settings, "DEFAULT_FROM_EMAIL", None) or '',
+        to=to or [settings.CONTACT_RECIPIENT_EMAIL],
+        reply_to=reply_to,
+        digest=digest,
+        # A digest goes out when its oldest email has waited a full window
+        next_attempt_at=timezone.now() + timedelta(minutes=window if digest else 0),
+    )
+
+
+def retry_delay(attempts):
+    """Backoff before the next attempt, after the given number of failed attempts."""
+    return timedelta(seconds=min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS))
+
+
+def claim_due(batch_size):
+    """
+    Claim up to batch_size pending emails that are due.
+
+    Claimed emails get their next attempt pushed CLAIM_SECONDS ahead, so a
+    second worker running at the same time skips them, and a worker that
+    dies mid-batch only delays them.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            OutboundEmail.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=OutboundEmail.STATUS_PENDING, next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        OutboundEmail.objects.filter(id__in=ids).update(
+            next_attempt_at=now + timedelta(seconds=CLAIM_SECONDS),
+        )
+    return list(OutboundEmail.objects.filter(id__in=ids).order_by('next_attempt_at', 'id'))
+
+
+def _message(email, connection):
+    return EmailMessage(
+        subject=email.subject,
+        body=email.body,
+        from_email=email.from_email or None,
+        to=email.to,
+        reply_to=[email.reply_to] if email.reply_to else None,
+        connection=connection,
+    )
+
+
+def claim_digest(exclude_ids):
+    """
+    Claim every other pending digest email, due or not.
+
+    Called once a digest window has closed, so everything held for the
+    digest goes out in the same message.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            OutboundEmail.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=OutboundEmail.STATUS_PENDING, digest=True)
+            .exclude(id__in=exclude_ids)
+            .values_list('id', flat=True)
+        )
+        OutboundEmail.objects.filter(id__in=ids).update(
+            next_attempt_at=now + timedelta(seconds=CLAIM_SECONDS),
+        )
+    return list(OutboundEmail.objects.filter(id__in=ids))
+
+
+def _digest_message(emails, connection):
+    local_tz = timezone.get_current_timezone()
+    emails = sorted(emails, key=lambda email: email.created_at)
+    since = timezone.localtime(emails[0].created_at, local_tz)
+
+    sections = []
+    for email in emails:
+        sections.append(f"{'=' * 60}\n{email.subject}\n{'=' * 60}\n\n{email.body.strip()}\n")
+
+    body = f"""Staff Notification Digest
+
+{len(emails)} notification(s) since {since.strftime('%B %d, %Y at %I:%M %p')} ET.
+
+""" + "\n".join(sections)
+
+    return EmailMessage(
+        subject=f"[Barlery] Digest: {len(emails)} new notification(s)",
+        body=body,
+        from_email=emails[0].from_email or None,
+        to=emails[0].to,
+        connection=connection,
+    )
+
+
+def send_with_reconnect(build_message, connection):
+    """Send a message, reconnecting once if the server dropped an idle connection."""
+    try:
+        build_message(connection).send()
+    except SMTPServerDisconnected:
+        # The server dropped an idle connection; reconnect once
+        connection.close()
+        connection.open()
+        build_message(connection).send()
+
+
+def send_pending(batch_size=100, connection=None):
+    """
+    Send all due emails in the outbox over a single connection.
+
+    Digest emails (see STAFF_EMAIL_DIGEST_MINUTES) are sent together as one
+    message per recipient list as soon as the oldest of them is due.
+
+    Args:
+        batch_size: Emails claimed per database round-trip
+        connection: Mail backend to use (default: a new one from EMAIL_BACKEND)
+
+    Returns:
+        dict: Counts of 'sent', 'retried' and 'failed' emails, and of
+            'digests' sent (each digest email also counts in 'sent')
+    """
+    stats = {'sent': 0, 'retried': 0, 'failed': 0, 'digests': 0}
+
+    # Nothing due: don't open (and authenticate) a connection at all
+    batch = claim_due(batch_size)
+    if not batch:
+        return stats
+
+    connection = connection or get_connection(fail_silently=False)
+
+    # Opened up front so the backend keeps it open across messages
+    # (it closes connections it had to open itself after every send)
+    try:
+        connection.open()
+    except Exception:
+        # Mail server unreachable: hand the batch back so it is retried next time
+        OutboundEmail.objects.filter(id__in=[email.pk for email in batch]).update(
+            next_attempt_at=timezone.now(),
+        )
+        raise
+    try:
+        while batch:
+            _send_batch(batch, connection, stats)
+            batch = claim_due(batch_size)
+    finally:
+        connection.close()
+
+    return stats
+
+
+def _send_batch(batch, connection, stats):
+    digest = [email for email in batch if email.digest]
+    if digest:
+        digest += claim_digest(exclude_ids=[email.pk for email in digest])
+        groups = {}
+        for email in digest:
+            groups.setdefault(tuple(email.to), []).append(email)
+        for emails in groups.values():
+            _deliver(emails, lambda conn, emails=emails: _digest_message(emails, conn), connection, stats)
+            stats['digests'] += 1
+
+    for email in batch:
+        if not email.digest:
+            _deliver([email], lambda conn, email=email: _message(email, conn), connection, stats)
+
+
+def _deliver(emails, build_message, connection, stats):
+    """Send one message and record the outcome on the outbox emails it covers."""
+    try:
+        send_with_reconnect(build_message, connection)
+    except Exception as e:
+        for email in emails:
+            _record_failure(email, e, stats)
+        return
+
+    now = timezone.now()
+    for email in emails:
+        email.status = OutboundEmail.STATUS_SENT
+        email.attempts += 1
+        email.sent_at = now
+        email.last_error = ''
+        email.save(update_fields=['status', 'attempts', 'sent_at', 'last_error'])
+        stats['sent'] += 1
+
+
+def _record_failure(email, error, stats):
+    email.attempts += 1
+    email.last_error = str(error)
+    if email.attempts >= MAX_ATTEMPTS:
+        email.status = OutboundEmail.STATUS_FAILED
+        stats['failed'] += 1
+        logger.error(f"Giving up on email {email.pk} after {email.attempts} attempts: {error}")
+    else:
+        email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+        stats['retried'] += 1
+        logger.warning(f"Failed to send email {email.pk} (attempt {email.attempts}), will retry: {error}")
+    email.save(update_fields=['status', 'attempts', 'last_error', 'next_attempt_at'])
@@ -0,0 +1,85 @@
+"""
+Bulk purge of expired events for Barlery.
+
+Old events are removed by the purge_old_events management command (run it
+from a scheduled job) instead of during event creation. Rows are deleted in
+bulk and their images are removed from storage with batched requests.
+"""
+
+import time
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import caching
+from .models import Event, EventImageRendition
+from .signals import event_invalidation_paused
+from .utils import delete_storage_files
+
+# Events older than this many days are purged
+DEFAULT_RETENTION_DAYS = 7
+
+
+def purge_old_events(days=DEFAULT_RETENTION_DAYS, dry_run=False, batch_size=1000):
+    """
+    Delete events (and their images) dated more than `days` days ago.
+
+    Args:
+        days (int): Retention period in days
+        dry_run (bool): Only count what would be deleted
+        batch_size (int): Events deleted per DELETE statement / storage request
+
+    Returns:
+        dict: 'events' and 'images' counts, plus 'select_seconds',
+            'delete_seconds' and 'storage_seconds' timings
+    """
+    cutoff_date = timezone.now().date() - timedelta(days=days)
+    stats = {
+        'cutoff_date': cutoff_date,
+        'events': 0,
+        'images': 0,
+        'select_seconds': 0.0,
+        'delete_seconds': 0.0,
+        'storage_seconds': 0.0,
+    }
+
+    # One query for every expired event's id and image name
+    started = time.perf_counter()
+    expired = list(Event.objects.filter(date__lt=cutoff_date).values_list('id', 'image'))
+
+    # Resized renditions are stored as separate files and go too
+    expired_ids = [event_id for event_id, _ in expired]
+    rendition_names = []
+    for start in range(0, len(expired_ids), batch_size):
+        rendition_names += EventImageRendition.objects.filter(
+            event_id__in=expired_ids[start:start + batch_size]
+        ).values_list('image', flat=True)
+    stats['select_seconds'] = time.perf_counter() - started
+
+    stats['events'] = len(expired)
+    image_names = [image for _, image in expired if image] + rendition_names
+    stats['images'] = len(image_names)
+
+    if dry_run or not expired:
+        return stats
+
+    started = time.perf_counter()
+    # Without the per-row handlers each batch bumps the events version once
+    with event_invalidation_paused():
+        for start in range(0, len(expired), batch_size):
+            batch_ids = [event_id for event_id, _ in expired[start:start + batch_size]]
+            # QuerySet.delete() doesn't call Event.delete(), so images are removed below.
+            # Only the event ids are loaded.
+            with transaction.atomic():
+                Event.objects.filter(id__in=batch_ids).only('id').delete()
+                caching.bump_version(caching.EVENTS)
+    stats['delete_seconds'] = time.perf_counter() - started
+
+    # Remove images only after the rows are gone, in batched storage requests
+    started = time.perf_counter()
+    storage = Event._meta.get_field('image').storage
+    stats['images'] = delete_storage_files(storage, image_names, batch_size=min(batch_size, 1000))
+    stats['storage_seconds'] = time.perf_counter() - started
+
+    return stats
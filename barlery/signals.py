@@ -0,0 +1,52 @@
+"""
+Signal handlers for Barlery.
+
+Bumps the cache version for a model's namespace whenever rows are saved or
+deleted, whether the change came from a view, the admin or a management
+command.
+"""
+
+import contextvars
+from contextlib import contextmanager
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import caching
+from .models import Event, EventImageRendition, MenuItem, WeeklyHours
+
+_events_invalidation_paused = contextvars.ContextVar("barlery_events_invalidation_paused", default=False)
+
+
+@receiver([post_save, post_delete], sender=MenuItem)
+def invalidate_menu(sender, **kwargs):
+    caching.bump_version(caching.MENU)
+
+
+@receiver([post_save, post_delete], sender=Event)
+@receiver([post_save, post_delete], sender=EventImageRendition)
+def invalidate_events(sender, **kwargs):
+    if not _events_invalidation_paused.get():
+        caching.bump_version(caching.EVENTS)
+
+
+@contextmanager
+def event_invalidation_paused():
+    """
+    Skip invalidate_events for changes made while the block runs.
+
+    For bulk jobs that bump caching.EVENTS themselves once per batch, so
+    deleting N events doesn't schedule N version bumps. Only the current
+    thread (or task) is affected: events changed by other requests in the
+    same process still bump the version.
+    """
+    token = _events_invalidation_paused.set(True)
+    try:
+        yield
+    finally:
+        _events_invalidation_paused.reset(token)
+
+
+@receiver(post_save, sender=WeeklyHours)
+def invalidate_hours(sender, **kwargs):
+    caching.bump_version(caching.HOURS)
@@ -0,0 +1,284 @@
+"""
+Single-flight rebuilds with stale-while-revalidate for cached snapshots.
+
+get_or_build keeps one entry per snapshot in the cache, tagged with the
+namespace version (see caching.py) and the generation it was built for
+(such as today's date). When the entry is out of date, only one worker
+rebuilds it; the others keep serving the entry they have instead of all
+hitting the database at once:
+
+    fresh       Served as is.
+    refresh due In the last EARLY_REFRESH part of its timeout: served as is
+                while one worker rebuilds it in the background, so it is
+                replaced before it expires and nobody waits at expiry.
+    stale       Expired, or built from an older version or generation: one
+                worker rebuilds it while the others serve the stale copy.
+    missing     One worker builds it; the others wait for its result (up to
+                WAIT_TIMEOUT, then build it themselves).
+
+A worker claims a rebuild by adding the key to an in-process set of
+claimed keys (for its threads) and a lock key to the cache (for other
+workers). The file cache's add isn't atomic, so two workers may rarely
+both rebuild; that only costs the duplicate work.
+
+Pages that serve a stale copy must not label it with an ETag built from
+the current version, or browsers and the CDN would keep it. Stale reads
+are therefore recorded while tracking_stale_reads is active, and
+public_cache_control (conditional.py) drops the validators and marks
+those responses uncacheable. The record is a context variable, so it
+covers asyncio tasks and sync_to_async calls made by the view, but not
+plain threads, which start with an empty context.
+
+aget_or_build is the async version, for async_views.py; it rebuilds in
+the background with an asyncio task instead of a thread.
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.db import connections
+
+from . import caching
+
+# Entries are refreshed in the background during this last part of their timeout
+EARLY_REFRESH = 0.2
+
+# Longest a rebuild may hold its lock before another worker may take over
+LOCK_TIMEOUT = 30
+
+# How long a request waits for another worker's build before building itself
+WAIT_TIMEOUT = 5
+WAIT_INTERVAL = 0.025
+
+# Keys this process is rebuilding; only held for the length of a rebuild
+_claimed = set()
+_claimed_lock = threading.Lock()
+
+# Background refresh tasks, kept referenced until they finish
+_tasks = set()
+
+_stale_reads = contextvars.ContextVar("barlery_stale_reads", default=None)
+
+
+@contextmanager
+def tracking_stale_reads():
+    """
+    Record the snapshots served stale while the block runs.
+
+    Yields a list that gets one entry per stale read, including reads in
+    asyncio tasks and sync_to_async calls started from the block. Reads
+    in a threading.Thread are missed unless it runs in a copy of the
+    context (contextvars.copy_context().run).
+    """
+    reads = []
+    token = _stale_reads.set(reads)
+    try:
+        yield reads
+    finally:
+        _stale_reads.reset(token)
+
+
+def get_or_build(namespace, parts, build, timeout=None, generation=None):
+    """
+    Get a cached snapshot, rebuilding it in a single worker when out of date.
+
+    Args:
+        namespace (str): One of caching.MENU, EVENTS or HOURS; bumping its
+            version makes the entry stale
+        parts (tuple): Identify the snapshot within the namespace
+        build (callable): Builds the snapshot (no arguments)
+        timeout (int): Seconds the snapshot stays fresh, or None for as
+            long as the version (and generation) stay the same
+        generation: Anything else the snapshot depends on (e.g. today's
+            date); a different value makes the entry stale
+
+    Returns:
+        The snapshot
+    """
+    key, lock_key = _keys(namespace, parts)
+    version = caching.get_version(namespace)
+    entry = cache.get(key)
+    state = _state(entry, version, generation)
+
+    if state == "fresh":
+        return entry["value"]
+
+    if state == "refresh":
+        if _acquire(lock_key):
+            threading.Thread(
+                target=_refresh_in_thread,
+                args=(key, lock_key, namespace, build, timeout, generation),
+                daemon=True,
+            ).start()
+        return entry["value"]
+
+    if _acquire(lock_key):
+        try:
+            return _build_and_store(key, version, build, timeout, generation)
+        finally:
+            _release(lock_key)
+
+    if state == "stale":
+        _record_stale_read(key)
+        return entry["value"]
+
+    # Nothing to serve yet: wait for the worker that is building it
+    deadline = time.monotonic() + WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_INTERVAL)
+        entry = cache.get(key)
+        if _state(entry, version, generation) != "missing":
+            return entry["value"]
+    return _build_and_store(key, version, build, timeout, generation)
+
+
+async def aget_or_build(namespace, parts, abuild, timeout=None, generation=None):
+    """Async version of get_or_build; abuild is a coroutine function."""
+    key, lock_key = _keys(namespace, parts)
+    version = await caching.aget_version(namespace)
+    entry = await cache.aget(key)
+    state = _state(entry, version, generation)
+
+    if state == "fresh":
+        return entry["value"]
+
+    if state == "refresh":
+        if await _aacquire(lock_key):
+            task = asyncio.create_task(_arefresh(key, lock_key, namespace, abuild, timeout, generation))
+            _tasks.add(task)
+            task.add_done_callback(_tasks.discard)
+        return entry["value"]
+
+    if await _aacquire(lock_key):
+        try:
+            return await _abuild_and_store(key, version, abuild, timeout, generation)
+        finally:
+            await _arelease(lock_key)
+
+    if state == "stale":
+        _record_stale_read(key)
+        return entry["value"]
+
+    deadline = time.monotonic() + WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        await asyncio.sleep(WAIT_INTERVAL)
+        entry = await cache.aget(key)
+        if _state(entry, version, generation) != "missing":
+            return entry["value"]
+    return await _abuild_and_store(key, version, abuild, timeout, generation)
+
+
+def _keys(namespace, parts):
+    suffix = ":".join(str(part) for part in parts)
+    prefix = f"{caching.KEY_PREFIX}:{namespace}"
+    return f"{prefix}:latest:{suffix}", f"{prefix}:lock:{suffix}"
+
+
+def _state(entry, version, generation):
+    if entry is None:
+        return "missing"
+    # A newer version than ours was read by a worker that saw the bump first
+    if entry["version"] < version or entry["generation"] != generation:
+        return "stale"
+
+    now = time.time()
+    if entry["expires"] is None or now < entry["refresh_at"]:
+        return "fresh"
+    if now < entry["expires"]:
+        return "refresh"
+    return "stale"
+
+
+def _make_entry(version, value, timeout, generation):
+    now = time.time()
+    return {
+        "version": version,
+        "generation": generation,
+        "value": value,
+        "refresh_at": None if timeout is None else now + timeout * (1 - EARLY_REFRESH),
+        "expires": None if timeout is None else now + timeout,
+    }
+
+
+def _storage_timeout(timeout):
+    # Kept past expiry so there's a stale copy to serve during the rebuild
+    return None if timeout is None else timeout * 2
+
+
+def _build_and_store(key, version, build, timeout, generation):
+    value = build()
+    cache.set(key, _make_entry(version, value, timeout, generation), timeout=_storage_timeout(timeout))
+    return value
+
+
+async def _abuild_and_store(key, version, abuild, timeout, generation):
+    value = await abuild()
+    await cache.aset(key, _make_entry(version, value, timeout, generation), timeout=_storage_timeout(timeout))
+    return value
+
+
+def _refresh_in_thread(key, lock_key, namespace, build, timeout, generation):
+    try:
+        _build_and_store(key, caching.get_version(namespace), build, timeout, generation)
+    finally:
+        _release(lock_key)
+        # The thread's own database connection
+        connections.close_all()
+
+
+async def _arefresh(key, lock_key, namespace, abuild, timeout, generation):
+    try:
+        await _abuild_and_store(key, await caching.aget_version(namespace), abuild, timeout, generation)
+    finally:
+        await _arelease(lock_key)
+
+
+def _claim(lock_key):
+    with _claimed_lock:
+        if lock_key in _claimed:
+            return False
+        _claimed.add(lock_key)
+        return True
+
+
+def _unclaim(lock_key):
+    with _claimed_lock:
+        _claimed.discard(lock_key)
+
+
+def _acquire(lock_key):
+    if not _claim(lock_key):
+        return False
+    if cache.add(lock_key, 1, timeout=LOCK_TIMEOUT):
+        return True
+    _unclaim(lock_key)
+    return False
+
+
+def _release(lock_key):
+    cache.delete(lock_key)
+    _unclaim(lock_key)
+
+
+async def _aacquire(lock_key):
+    if not _claim(lock_key):
+        return False
+    if await cache.aadd(lock_key, 1, timeout=LOCK_TIMEOUT):
+        return True
+    _unclaim(lock_key)
+    return False
+
+
+async def _arelease(lock_key):
+    await cache.adelete(lock_key)
+    _unclaim(lock_key)
+
+
+def _record_stale_read(key):
+    reads = _stale_reads.get()
+    if reads is not None:
+        reads.append(key)
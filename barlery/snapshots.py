@@ -0,0 +1,333 @@
+"""
+Cached read models for Barlery's public pages.
+
+Each function here builds the data a public view needs, stores it in the
+cache and returns the cached copy on later calls. Entries are tagged with
+the version of their data (see caching.py), which is bumped whenever the
+underlying models change. The menu, calendar and index snapshots go
+through single_flight.py, so after a change (or at midnight) one worker
+rebuilds them while the others keep serving the previous copy.
+
+The a-prefixed functions are async versions for async_views.py. They share
+the cache entries with their sync counterparts, read the cache without
+blocking the event loop and load data on a miss with the async ORM.
+"""
+
+import calendar as cal_module
+from datetime import date, datetime
+
+from asgiref.sync import sync_to_async
+from django.db.models import Q
+from django.template.loader import render_to_string
+
+from . import caching, single_flight
+from .models import Event, MenuItem, WeeklyHours
+
+# Number of event cards per "Load More" page on the calendar
+UPCOMING_EVENTS_PAGE_SIZE = 6
+
+# Number of upcoming events on the home page
+INDEX_EVENTS_COUNT = 3
+
+# How long event snapshots stay fresh (date-dependent ones go stale at midnight anyway)
+EVENTS_TIMEOUT = 60 * 60 * 24
+
+# Per-process copy of the weekly hours, tagged with the hours version it was built from
+_hours_memo = {}
+
+
+def menu_snapshot():
+    """
+    Get the full menu grouped by category.
+
+    The menu is loaded with a single ordered query and grouped in Python.
+    The result is cached until the next MenuItem save or delete.
+
+    Returns:
+        dict: Maps each MenuItem category value to a list of items sorted by name
+    """
+    return single_flight.get_or_build(
+        caching.MENU,
+        ("snapshot",),
+        lambda: _group_menu(MenuItem.objects.order_by("category", "name")),
+    )
+
+
+async def amenu_snapshot():
+    """Async version of menu_snapshot."""
+    async def abuild():
+        return _group_menu([item async for item in MenuItem.objects.order_by("category", "name")])
+
+    return await single_flight.aget_or_build(caching.MENU, ("snapshot",), abuild)
+
+
+def _group_menu(items):
+    snapshot = {category: [] for category, _ in MenuItem.CATEGORY_CHOICES}
+    for item in items:
+        snapshot.setdefault(item.category, []).append(item)
+    return snapshot
+
+
+def encode_event_cursor(event):
+    """Encode an event's (date, start_time, id) sort key as a page cursor."""
+    return f"{event.date.isoformat()}_{event.start_time.strftime('%H%M%S')}_{event.id}"
+
+
+def decode_event_cursor(cursor):
+    """
+    Decode a page cursor produced by encode_event_cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    date_str, time_str, id_str = cursor.split('_')
+    return (
+        datetime.strptime(date_str, '%Y-%m-%d').date(),
+        datetime.strptime(time_str, '%H%M%S').time(),
+        int(id_str),
+    )
+
+
+def _upcoming_events_query(today, cursor):
+    events = Event.objects.filter(date__gte=today)
+    if cursor:
+        cursor_date, cursor_time, cursor_id = cursor
+        events = events.filter(
+            Q(date__gt=cursor_date)
+            | Q(date=cursor_date, start_time__gt=cursor_time)
+            | Q(date=cursor_date, start_time=cursor_time, id__gt=cursor_id)
+        )
+
+    # Fetch one extra row to find out whether another page exists
+    return (
+        events.order_by('date', 'start_time', 'id')
+        .prefetch_related('renditions')[:UPCOMING_EVENTS_PAGE_SIZE + 1]
+    )
+
+
+def _split_upcoming_events_page(events):
+    has_more = len(events) > UPCOMING_EVENTS_PAGE_SIZE
+    events = events[:UPCOMING_EVENTS_PAGE_SIZE]
+
+    next_cursor = encode_event_cursor(events[-1]) if has_more else None
+    return events, next_cursor
+
+
+def upcoming_events_page(today, cursor=None):
+    """
+    Get one page of upcoming events using keyset pagination.
+
+    Events are ordered by (date, start_time, id) and each page starts right
+    after the cursor, so every page costs the same no matter how deep it is.
+    The first page is cached until events change.
+
+    Args:
+        today: Events before this date are excluded
+        cursor: Decoded cursor (date, start_time, id) of the last event on the
+            previous page, or None for the first page
+
+    Returns:
+        tuple: (list of events, encoded cursor for the next page or None)
+    """
+    if cursor:
+        return _split_upcoming_events_page(list(_upcoming_events_query(today, cursor)))
+
+    return single_flight.get_or_build(
+        caching.EVENTS,
+        ("upcoming",),
+        lambda: _split_upcoming_events_page(list(_upcoming_events_query(today, None))),
+        timeout=EVENTS_TIMEOUT,
+        generation=today,
+    )
+
+
+async def aupcoming_events_page(today, cursor=None):
+    """Async version of upcoming_events_page."""
+    if cursor:
+        return _split_upcoming_events_page([event async for event in _upcoming_events_query(today, cursor)])
+
+    async def abuild():
+        return _split_upcoming_events_page([event async for event in _upcoming_events_query(today, None)])
+
+    return await single_flight.aget_or_build(
+        caching.EVENTS, ("upcoming",), abuild, timeout=EVENTS_TIMEOUT, generation=today,
+    )
+
+
+def _index_events_query(today):
+    return (
+        Event.objects.filter(date__gte=today)
+        .order_by('date', 'start_time')
+        .prefetch_related('renditions')[:INDEX_EVENTS_COUNT]
+    )
+
+
+def index_events(today):
+    """
+    Get the next few events for the home page.
+
+    Cached until events change or the date does.
+
+    Args:
+        today: Events before this date are excluded
+
+    Returns:
+        list: Up to INDEX_EVENTS_COUNT events, with their renditions prefetched
+    """
+    return single_flight.get_or_build(
+        caching.EVENTS,
+        ("index",),
+        lambda: list(_index_events_query(today)),
+        timeout=EVENTS_TIMEOUT,
+        generation=today,
+    )
+
+
+async def aindex_events(today):
+    """Async version of index_events."""
+    async def abuild():
+        return [event async for event in _index_events_query(today)]
+
+    return await single_flight.aget_or_build(
+        caching.EVENTS, ("index",), abuild, timeout=EVENTS_TIMEOUT, generation=today,
+    )
+
+
+def _month_events_query(year, month, today):
+    first_day = date(year, month, 1)
+    last_day = date(year, month, cal_module.monthrange(year, month)[1])
+
+    # Only events from today onwards are shown
+    return Event.objects.filter(
+        date__gte=max(first_day, today),
+        date__lte=last_day,
+    ).order_by('date', 'start_time')
+
+
+def _build_month_grid(year, month, today, events):
+    events_by_day = {}
+    for event in events:
+        events_by_day.setdefault(event.date.day, []).append(event)
+
+    calendar_weeks = []
+    for week in cal_module.monthcalendar(year, month):
+        week_data = []
+        for day in week:
+            if day == 0:
+                # Empty cell for days from previous/next month
+                week_data.append({
+                    'day': None,
+                    'events': [],
+                    'is_today': False,
+                    'is_past': False,
+                })
+            else:
+                current_date = date(year, month, day)
+                week_data.append({
+                    'day': day,
+                    'date': current_date,
+                    'events': events_by_day.get(day, []),
+                    'is_today': current_date == today,
+                    'is_past': current_date < today,
+                })
+        calendar_weeks.append(week_data)
+
+    return {
+        'calendar_weeks': calendar_weeks,
+        'total_events': len(events),
+    }
+
+
+def month_grid(year, month, today):
+    """
+    Get the calendar grid for a month with its events placed on each day.
+
+    Only the current month depends on the exact date (for the "today" and
+    "past" markers and for hiding past events). Every other month is either
+    entirely past or entirely future, so it is built for that marker
+    instead and shared across days. Months nobody looks at for a while
+    expire like the other event snapshots.
+
+    Args:
+        year (int): Calendar year
+        month (int): Calendar month (1-12)
+        today (date): The current date
+
+    Returns:
+        dict: 'calendar_weeks' (list of weeks, each a list of day dicts)
+            and 'total_events' (number of events shown this month)
+    """
+    day_marker = _month_day_marker(year, month, today)
+    return single_flight.get_or_build(
+        caching.EVENTS,
+        ("month", year, month),
+        lambda: _build_month_grid(year, month, today, list(_month_events_query(year, month, today))),
+        timeout=EVENTS_TIMEOUT,
+        generation=day_marker,
+    )
+
+
+async def amonth_grid(year, month, today):
+    """Async version of month_grid."""
+    day_marker = _month_day_marker(year, month, today)
+
+    async def abuild():
+        events = [event async for event in _month_events_query(year, month, today)]
+        return _build_month_grid(year, month, today, events)
+
+    return await single_flight.aget_or_build(
+        caching.EVENTS,
+        ("month", year, month),
+        abuild,
+        timeout=EVENTS_TIMEOUT,
+        generation=day_marker,
+    )
+
+
+def _month_day_marker(year, month, today):
+    if today < date(year, month, 1):
+        return "future"
+    if (today.year, today.month) != (year, month):
+        return "past"
+    return today.isoformat()
+
+
+def hours_snapshot():
+    """
+    Get the weekly hours and their pre-rendered _hours_table.html fragment.
+
+    The snapshot is kept in process memory, so a request costs one cache
+    lookup for the hours version instead of a get_or_create query and a
+    template render. Saving WeeklyHours bumps the shared version, which makes
+    every worker rebuild its copy on its next request.
+
+    Returns:
+        dict: 'hours' (the WeeklyHours singleton) and 'hours_table' (rendered HTML)
+    """
+    version = caching.get_version(caching.HOURS)
+    snapshot = _hours_memo.get('snapshot')
+    if snapshot is None or snapshot['version'] != version:
+        snapshot = _build_hours_snapshot(version)
+    return snapshot
+
+
+async def ahours_snapshot():
+    """Async version of hours_snapshot."""
+    version = await caching.aget_version(caching.HOURS)
+    snapshot = _hours_memo.get('snapshot')
+    if snapshot is None or snapshot['version'] != version:
+        # Rare (once per process per hours change): WeeklyHours.load() may
+        # create the row, so the whole rebuild runs in a worker thread
+        snapshot = await sync_to_async(_build_hours_snapshot)(version)
+    return snapshot
+
+
+def _build_hours_snapshot(version):
+    hours = WeeklyHours.load()
+    snapshot = {
+        'version': version,
+        'hours': hours,
+        'hours_table': render_to_string('barlery/_hours_table.html', {'hours': hours}),
+    }
+    _hours_memo['snapshot'] = snapshot
+    return snapshot
@@ -141,6 +141,51 @@ document.addEventListener("DOMContentLoaded", () => {
     }
   });
 
+  /* ---------------------------
+     Load More (per status bucket)
+  ---------------------------- */
+  document.addEventListener("click", async (e) => {
+    const btn = e.target.closest("[data-action='load-more-accounts']");
+    if (!btn) return;
+
+    const list = document.getElementById(btn.dataset.listId);
+    if (!list) return;
+
+    // Keep the current search so the next page matches it
+    const params = new URLSearchParams(window.location.search);
+    params.set("bucket", btn.dataset.bucket);
+    params.set("cursor", btn.dataset.cursor);
+
+    btn.disabled = true;
+    btn.textContent = "Loading...";
+
+    try {
+      const resp = await fetch(`?${params.toString()}`, {
+        headers: { "X-Requested-With": "XMLHttpRequest" },
+      });
+      const data = await resp.json();
+
+      if (!resp.ok) {
+        throw new Error(data.error || `Request failed (${resp.status})`);
+      }
+
+      list.insertAdjacentHTML("beforeend", data.html);
+
+      if (data.has_more) {
+        btn.dataset.cursor = data.next_cursor;
+        btn.disabled = false;
+        btn.textContent = "Load More";
+      } else {
+        btn.parentElement.remove();
+      }
+    } catch (err) {
+      console.error("Error loading more accounts:", err);
+      btn.disabled = false;
+      btn.textContent = "Load More";
+      alert("Error loading more accounts. Please try again.");
+    }
+  });
+
   /* ---------------------------
      Toggle Deactivated Users
   ---------------------------- */
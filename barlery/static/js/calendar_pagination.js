@@ -8,7 +8,8 @@ document.addEventListener('DOMContentLoaded', function() {
   }
   
   loadMoreBtn.addEventListener('click', function() {
-    const page = parseInt(this.getAttribute('data-page'));
+    // Opaque keyset cursor for the next page (set by the server)
+    const page = this.getAttribute('data-page');
     
     // Disable button and show loading state
     loadMoreBtn.disabled = true;
@@ -16,7 +17,7 @@ document.addEventListener('DOMContentLoaded', function() {
     loadMoreBtn.textContent = 'Loading...';
     
     // Make AJAX request
-    fetch(`?page=${page}`, {
+    fetch(`?page=${encodeURIComponent(page)}`, {
       method: 'GET',
       headers: {
         'X-Requested-With': 'XMLHttpRequest',
@@ -32,6 +33,9 @@ document.addEventListener('DOMContentLoaded', function() {
       while (tempDiv.firstChild) {
         eventsGrid.appendChild(tempDiv.firstChild);
       }
+
+      // Add staff controls to the new cards (see staff_ui.js)
+      window.BarleryStaffUI.hydrate(eventsGrid);
       
       // Update button state
       if (data.has_more) {
@@ -0,0 +1,47 @@
+// CSRF tokens for the forms on the public pages.
+//
+// Public pages are cached and shared by every visitor, so their forms
+// can't carry a CSRF token. Forms with a data-csrf-url attribute fetch a
+// fresh token from that URL (the csrf_token view) when submitted, add it
+// as the csrfmiddlewaretoken field and then submit. The request also sets
+// the CSRF cookie the token is checked against.
+document.addEventListener('submit', function(e) {
+  const form = e.target;
+  if (!form.dataset || !form.dataset.csrfUrl) {
+    return;
+  }
+
+  e.preventDefault();
+  const submitButton = form.querySelector('[type="submit"]');
+  if (submitButton) {
+    submitButton.disabled = true;
+  }
+
+  fetch(form.dataset.csrfUrl, {
+    credentials: 'same-origin',
+    headers: {
+      'Accept': 'application/json',
+    },
+  })
+  .then(response => response.json())
+  .then(data => {
+    let input = form.querySelector('input[name="csrfmiddlewaretoken"]');
+    if (!input) {
+      input = document.createElement('input');
+      input.type = 'hidden';
+      input.name = 'csrfmiddlewaretoken';
+      form.appendChild(input);
+    }
+    input.value = data.token;
+
+    // submit() doesn't fire this handler again
+    form.submit();
+  })
+  .catch(error => {
+    console.error('Error fetching CSRF token:', error);
+    if (submitButton) {
+      submitButton.disabled = false;
+    }
+    alert('Sorry, the form could not be sent. Please try again.');
+  });
+});
@@ -1,12 +1,11 @@
 // Handle logout link click
-document.addEventListener('DOMContentLoaded', function() {
-  const logoutLink = document.getElementById('logout-link');
+// Delegated, because public pages add the link after loading (see staff_ui.js)
+document.addEventListener('click', function(e) {
+  const logoutLink = e.target.closest('#logout-link');
   const logoutForm = document.getElementById('logout-form');
-  
+
   if (logoutLink && logoutForm) {
-    logoutLink.addEventListener('click', function(e) {
-      e.preventDefault();
-      logoutForm.submit();
-    });
+    e.preventDefault();
+    logoutForm.submit();
   }
-});
\ No newline at end of file
+});
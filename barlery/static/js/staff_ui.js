@@ -0,0 +1,58 @@
+// Staff controls and flash messages for the public pages.
+//
+// Public pages are the same for every visitor so they can be cached, and
+// mark staff-only markup with <template data-staff-ui="name"> placeholders
+// (see public_base.html). When the barlery_logged_in cookie says someone
+// may be logged in, the placeholders are sent to the staff_ui view, which
+// renders them for logged-in users, along with any flash messages.
+// Anonymous visitors don't make the request at all.
+window.BarleryStaffUI = (function() {
+  const HINT_COOKIE = 'barlery_logged_in';
+
+  function mayBeLoggedIn() {
+    return document.cookie.split('; ').some(cookie => cookie.startsWith(HINT_COOKIE + '='));
+  }
+
+  // Replace the placeholders under root with their rendered markup
+  function hydrate(root) {
+    const alerts = document.querySelector('[data-staff-ui-alerts]');
+    if (!alerts || !mayBeLoggedIn()) {
+      return Promise.resolve();
+    }
+
+    const placeholders = Array.from((root || document).querySelectorAll('template[data-staff-ui]'));
+    const params = new URLSearchParams();
+    new Set(placeholders.map(placeholder => placeholder.dataset.staffUi)).forEach(slot => {
+      params.append('slot', slot);
+    });
+
+    return fetch(`${alerts.dataset.url}?${params}`, {
+      credentials: 'same-origin',
+      headers: {
+        'Accept': 'application/json',
+      },
+    })
+    .then(response => response.json())
+    .then(data => {
+      if (data.alerts.trim()) {
+        alerts.innerHTML = data.alerts;
+      }
+
+      placeholders.forEach(placeholder => {
+        const html = data.slots[placeholder.dataset.staffUi];
+        if (html) {
+          placeholder.replaceWith(document.createRange().createContextualFragment(html));
+        }
+      });
+    })
+    .catch(error => {
+      console.error('Error loading staff controls:', error);
+    });
+  }
+
+  document.addEventListener('DOMContentLoaded', function() {
+    hydrate(document);
+  });
+
+  return { hydrate: hydrate };
+})();
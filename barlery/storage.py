@@ -0,0 +1,82 @@
+"""
+Static file storage for serving Barlery's CSS, JS and images from R2.
+
+collectstatic stores every file under a content-hashed name (site.css ->
+site.3f2a9c1b7e4d.css) and writes a staticfiles.json manifest mapping the
+original names to the hashed ones, which {% static %} then uses. A hashed
+file never changes, so it is uploaded with a one-year immutable
+Cache-Control header and returning visitors never fetch it again. Its
+URL must not change either, so static URLs are never signed (the bucket
+is public-read); a signed URL is new on every render.
+
+Each compressible hashed file also gets precompressed .br and .gz copies,
+uploaded with their Content-Encoding set, for a CDN rule or worker that
+rewrites requests by Accept-Encoding. This is the R2 counterpart of
+WhiteNoise's CompressedManifestStaticFilesStorage, which is used when
+static files are served by the app itself (SERVE_STATIC_FROM_R2=False).
+"""
+
+import re
+
+from django.contrib.staticfiles.storage import ManifestFilesMixin
+from django.core.files.base import ContentFile
+from storages.backends.s3 import S3Storage
+from whitenoise.compress import Compressor
+
+# Hashed names never change their contents
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Unhashed originals and the manifest itself change on every deploy
+REVALIDATE_CACHE_CONTROL = "public, max-age=300, must-revalidate"
+
+# Matches names produced by HashedFilesMixin.hashed_name (plus compressed copies)
+HASHED_NAME_RE = re.compile(r"\.[0-9a-f]{12}\.[^./]+(\.(br|gz))?$")
+
+
+class ManifestR2StaticStorage(ManifestFilesMixin, S3Storage):
+    """
+    S3 storage (R2 in production) for static files with hashed names,
+    precompressed copies and far-future caching.
+    """
+
+    # Unsigned, so a file keeps the same URL and browsers reuse their copy
+    querystring_auth = False
+
+    def get_object_parameters(self, name):
+        params = super().get_object_parameters(name)
+        if HASHED_NAME_RE.search(name):
+            params["CacheControl"] = IMMUTABLE_CACHE_CONTROL
+        else:
+            params["CacheControl"] = REVALIDATE_CACHE_CONTROL
+        return params
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+
+        compressor = Compressor(quiet=True)
+        for name in sorted(set(self.hashed_files.values())):
+            if compressor.should_compress(name):
+                self._save_compressed(compressor, name)
+
+    def _save_compressed(self, compressor, name):
+        """
+        Upload .br and .gz copies of a hashed file when they are worth it.
+
+        S3Storage sets the Content-Type of the original and the matching
+        Content-Encoding from the double extension (site.<hash>.css.br).
+        """
+        with self.open(name) as original:
+            data = original.read()
+
+        if compressor.use_brotli:
+            compressed = compressor.compress_brotli(data)
+            if not compressor.is_compressed_effectively("Brotli", name, len(data), compressed):
+                # If Brotli compression wasn't effective gzip won't be either
+                return
+            self._save(f"{name}.br", ContentFile(compressed))
+
+        compressed = compressor.compress_gzip(data)
+        if compressor.is_compressed_effectively("Gzip", name, len(data), compressed):
+            self._save(f"{name}.gz", ContentFile(compressed))
@@ -0,0 +1,75 @@
+"""
+Template tags linking the per-page CSS and JS bundles (see barlery/bundles.py).
+
+Usage:
+    {% load bundles %}
+    {% bundle_css "calendar" %}
+    {% bundle_js "calendar" %}
+"""
+
+from django import template
+from django.conf import settings
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join, mark_safe
+
+from ..bundles import BUNDLES, bundle_chain, load_manifest
+
+register = template.Library()
+
+
+def _source_url(path):
+    url = static(path)
+    if settings.STATIC_VERSION:
+        url = f"{url}?v={settings.STATIC_VERSION}"
+    return url
+
+
+def _source_files(name, kind):
+    return [path for bundle in bundle_chain(name) for path in BUNDLES[bundle].get(kind, [])]
+
+
+def _built(name, kind):
+    manifest = load_manifest()
+    return [manifest[bundle] for bundle in bundle_chain(name) if kind in manifest.get(bundle, {})]
+
+
+@register.simple_tag
+def bundle_css(name):
+    """
+    Link a bundle's stylesheets, those of the shared bundles it builds on first.
+
+    When built, the critical CSS of all of them is inlined and the full
+    stylesheets are loaded without blocking rendering (with a <noscript>
+    fallback). Otherwise each source stylesheet is linked as usual.
+    """
+    if not load_manifest():
+        return format_html_join(
+            "\n", '<link rel="stylesheet" href="{}">',
+            ((_source_url(path),) for path in _source_files(name, "css")),
+        )
+
+    built = _built(name, "css")
+    urls = [static(entry["css"]) for entry in built]
+    return format_html(
+        '<style>{}</style>\n{}\n<noscript>{}</noscript>',
+        # Minified CSS from our own static files; escaping would break selectors like "a > b"
+        mark_safe("".join(entry["critical"] for entry in built)),
+        format_html_join(
+            "\n", '<link rel="preload" href="{}" as="style" onload="this.onload=null;this.rel=\'stylesheet\'">',
+            ((url,) for url in urls),
+        ),
+        format_html_join("", '<link rel="stylesheet" href="{}">', ((url,) for url in urls)),
+    )
+
+
+@register.simple_tag
+def bundle_js(name):
+    """
+    Load a bundle's scripts, those of the shared bundles it builds on first
+    (deferred; they all wait for DOMContentLoaded).
+    """
+    if not load_manifest():
+        urls = [_source_url(path) for path in _source_files(name, "js")]
+    else:
+        urls = [static(entry["js"]) for entry in _built(name, "js")]
+    return format_html_join("\n", '<script src="{}" defer></script>', ((url,) for url in urls))
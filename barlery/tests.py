@@ -1,3 +1,1606 @@
-from django.test import TestCase
+import hashlib
+import importlib
+import json
+import os
+import runpy
+import shutil
+import tempfile
+import threading
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from unittest import mock, skipUnless
+from io import BytesIO, StringIO
+from pathlib import Path
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.utils import make_template_fragment_key
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.db.models.signals import post_save
+from django.http import Http404
+from django.test import AsyncRequestFactory, Client, LiveServerTestCase, TestCase, override_settings
+from django.utils import timezone
+from django.utils.http import http_date
+from PIL import Image
+
+from . import accounts, async_views, bundles, cache_backends, caching, checks, conditional, newsletter, outbox, signals, single_flight, snapshots
+from .forms import EventForm
+from .management.commands import build_icons
+from .management.commands.benchmark_pages import percentile
+from .management.commands.explain_hot_queries import hot_queries
+from .purge import purge_old_events
+from .views import CALENDAR_MONTHS_AHEAD, CALENDAR_MONTHS_BACK, requested_month
+from .storage import ManifestR2StaticStorage
+from .templatetags.bundles import bundle_css, bundle_js
+from .utils import ImageTooLarge, check_image_pixels, encode_compressed_jpeg, make_renditions
+from .mailers import send_venue_request_email
+from .middleware import LOGIN_HINT_COOKIE
+from .models import (
+    Event,
+    EventImageRendition,
+    EventRequest,
+    MenuItem,
+    OutboundEmail,
+    Subscriber,
+    User,
+    WeeklyHours,
+)
+
+
+def image_bytes(size=(64, 48), format='JPEG', color=(200, 30, 30), **save_options):
+    output = BytesIO()
+    Image.new('RGB', size, color).save(output, format=format, **save_options)
+    return output.getvalue()
+
+
+class CachedTestCase(TestCase):
+    """
+    Starts every test with an empty cache.
+
+    The default cache is backed by files that outlive the test database,
+    and caching.bump_version waits for the transaction to commit, so tests
+    that change data run those callbacks with captureOnCommitCallbacks.
+    """
+
+    def setUp(self):
+        cache.clear()
+        snapshots._hours_memo.clear()
+
+    def make_menu_item(self, name, category=MenuItem.CATEGORY_BEER, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            return MenuItem.objects.create(name=name, category=category, last_updated=timezone.now(), **fields)
+
+    def make_event(self, title, days_ahead=1, start=time(19), **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Event.objects.create(
+                title=title,
+                date=timezone.localdate() + timedelta(days=days_ahead),
+                start_time=start,
+                **fields,
+            )
+
+
+class MediaTestCase(CachedTestCase):
+    """Saves uploaded files to a temporary MEDIA_ROOT."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.enterClassContext(override_settings(MEDIA_ROOT=cls.media_root))
+        cls.addClassCleanup(shutil.rmtree, cls.media_root, ignore_errors=True)
+
+
+class MenuSnapshotTests(CachedTestCase):
+    def test_groups_items_by_category_in_name_order(self):
+        self.make_menu_item("Stout")
+        self.make_menu_item("Amber")
+        self.make_menu_item("Fries", category=MenuItem.CATEGORY_FOOD)
+
+        snapshot = snapshots.menu_snapshot()
+
+        self.assertEqual([item.name for item in snapshot[MenuItem.CATEGORY_BEER]], ["Amber", "Stout"])
+        self.assertEqual([item.name for item in snapshot[MenuItem.CATEGORY_FOOD]], ["Fries"])
+        self.assertEqual(snapshot[MenuItem.CATEGORY_WINE], [])
+
+    def test_built_with_one_query_and_then_served_from_cache(self):
+        self.make_menu_item("Stout")
+
+        with self.assertNumQueries(1):
+            snapshots.menu_snapshot()
+        with self.assertNumQueries(0):
+            snapshots.menu_snapshot()
+
+    def test_saving_an_item_bumps_the_menu_version(self):
+        item = self.make_menu_item("Stout")
+        version = caching.get_version(caching.MENU)
+        snapshots.menu_snapshot()
+
+        item.name = "Imperial Stout"
+        with self.captureOnCommitCallbacks(execute=True):
+            item.save()
+
+        self.assertGreater(caching.get_version(caching.MENU), version)
+        self.assertEqual(snapshots.menu_snapshot()[MenuItem.CATEGORY_BEER][0].name, "Imperial Stout")
+
+    def test_deleting_an_item_invalidates_the_snapshot(self):
+        item = self.make_menu_item("Stout")
+        snapshots.menu_snapshot()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            item.delete()
+
+        self.assertEqual(snapshots.menu_snapshot()[MenuItem.CATEGORY_BEER], [])
+
+    def test_bump_waits_for_the_transaction_to_commit(self):
+        version = caching.get_version(caching.MENU)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            caching.bump_version(caching.MENU)
+            self.assertEqual(caching.get_version(caching.MENU), version)
+
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+        self.assertEqual(caching.get_version(caching.MENU), version + 1)
+
+    def test_menu_page_lists_the_items(self):
+        self.make_menu_item("Stout", description="Dark and roasty")
+
+        response = self.client.get("/menu")
+
+        self.assertContains(response, "Stout")
+
+
+class SharedCacheCheckTests(TestCase):
+    def test_passes_for_the_configured_caches(self):
+        self.assertEqual(checks.check_shared_cache(None), [])
+
+    @override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+    def test_warns_about_a_per_process_default_cache(self):
+        self.assertEqual([warning.id for warning in checks.check_shared_cache(None)], ["barlery.W001"])
+
+    @override_settings(CACHES={
+        "default": {"BACKEND": "barlery.cache_backends.TieredCache", "OPTIONS": {"L2": "shared"}},
+        "shared": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    })
+    def test_warns_about_a_per_process_second_tier(self):
+        self.assertEqual([warning.id for warning in checks.check_shared_cache(None)], ["barlery.W001"])
+
+
+class UpcomingEventsPageTests(CachedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.today = timezone.localdate()
+        self.make_event("Yesterday", days_ahead=-1)
+        # Same date and start time for several events, so the id breaks the ties
+        self.events = [self.make_event(f"Event {number}", days_ahead=number // 3) for number in range(14)]
+
+    def collect_pages(self):
+        pages = []
+        cursor = None
+        while True:
+            events, next_cursor = snapshots.upcoming_events_page(self.today, cursor)
+            pages.append(events)
+            if next_cursor is None:
+                return pages
+            cursor = snapshots.decode_event_cursor(next_cursor)
+
+    def test_pages_cover_every_upcoming_event_once_in_order(self):
+        pages = self.collect_pages()
+
+        self.assertEqual([len(page) for page in pages], [6, 6, 2])
+        self.assertEqual([event.pk for page in pages for event in page], [event.pk for event in self.events])
+
+    def test_cursor_round_trip(self):
+        event = self.events[4]
+
+        cursor = snapshots.decode_event_cursor(snapshots.encode_event_cursor(event))
+
+        self.assertEqual(cursor, (event.date, event.start_time, event.pk))
+
+    def test_malformed_cursor_is_rejected(self):
+        for cursor in ("", "2024-01-01_190000", "2024-13-01_190000_1", "2024-01-01_190000_x"):
+            with self.subTest(cursor=cursor), self.assertRaises(ValueError):
+                snapshots.decode_event_cursor(cursor)
+
+    def test_calendar_returns_later_pages_as_json(self):
+        _, next_cursor = snapshots.upcoming_events_page(self.today)
+
+        response = self.client.get("/calendar", {"page": next_cursor}, headers={"x-requested-with": "XMLHttpRequest"})
+
+        data = response.json()
+        self.assertTrue(data["has_more"])
+        self.assertIn("Event 6", data["html"])
+        self.assertNotIn("Event 5", data["html"])
+
+    def test_calendar_rejects_a_bad_page_cursor(self):
+        response = self.client.get("/calendar", {"page": "nope"}, headers={"x-requested-with": "XMLHttpRequest"})
+
+        self.assertEqual(response.status_code, 400)
+
+
+class MonthGridTests(CachedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.today = timezone.localdate()
+
+    def grid_days(self, grid):
+        return {day['day']: day for week in grid['calendar_weeks'] for day in week if day['day']}
+
+    def test_places_events_on_their_days(self):
+        event = self.make_event("Trivia", days_ahead=0)
+
+        grid = snapshots.month_grid(self.today.year, self.today.month, self.today)
+
+        days = self.grid_days(grid)
+        self.assertEqual(days[self.today.day]['events'], [event])
+        self.assertTrue(days[self.today.day]['is_today'])
+        self.assertEqual(grid['total_events'], 1)
+
+    def test_past_events_are_hidden(self):
+        self.make_event("Old", days_ahead=-40)
+        past = self.today - timedelta(days=40)
+
+        grid = snapshots.month_grid(past.year, past.month, self.today)
+
+        self.assertEqual(grid['total_events'], 0)
+        self.assertTrue(all(day['is_past'] for day in self.grid_days(grid).values()))
+
+    def test_cached_until_events_change(self):
+        self.make_event("Trivia", days_ahead=0)
+        snapshots.month_grid(self.today.year, self.today.month, self.today)
+
+        with self.assertNumQueries(0):
+            snapshots.month_grid(self.today.year, self.today.month, self.today)
+
+        self.make_event("Karaoke", days_ahead=0)
+        grid = snapshots.month_grid(self.today.year, self.today.month, self.today)
+        self.assertEqual(grid['total_events'], 2)
+
+    def test_calendar_page_shows_the_month(self):
+        self.make_event("Trivia", days_ahead=0)
+
+        response = self.client.get("/calendar")
+
+        self.assertContains(response, "Trivia")
+        self.assertEqual(response.context['month'], self.today.month)
+
+
+class EventImageMetadataTests(MediaTestCase):
+    def test_upload_records_the_image_metadata(self):
+        content = image_bytes((64, 48))
+
+        event = self.make_event("Trivia", image=SimpleUploadedFile("trivia.jpg", content, "image/jpeg"))
+
+        event.refresh_from_db()
+        self.assertTrue(event.has_valid_image())
+        self.assertEqual((event.image_width, event.image_height), (64, 48))
+        self.assertEqual(event.image_size, len(content))
+        self.assertEqual(event.image_hash, hashlib.sha256(content).hexdigest())
+
+    def test_image_saved_to_storage_first_is_read_back(self):
+        content = image_bytes((30, 20))
+        event = self.make_event("Trivia")
+
+        event.image.save("trivia.jpg", ContentFile(content), save=False)
+        event.save()
+
+        self.assertTrue(event.image_exists)
+        self.assertEqual((event.image_width, event.image_height), (30, 20))
+        self.assertEqual(event.image_hash, hashlib.sha256(content).hexdigest())
+
+    def test_removing_the_image_clears_the_metadata(self):
+        event = self.make_event("Trivia", image=SimpleUploadedFile("trivia.jpg", image_bytes(), "image/jpeg"))
+
+        event.image = None
+        event.save()
+
+        self.assertFalse(event.has_valid_image())
+        self.assertIsNone(event.image_width)
+        self.assertEqual(event.image_hash, '')
+
+    def test_has_valid_image_does_not_touch_storage(self):
+        event = self.make_event("Trivia", image=SimpleUploadedFile("trivia.jpg", image_bytes(), "image/jpeg"))
+        event.image.storage.delete(event.image.name)
+
+        self.assertTrue(event.has_valid_image())
+
+    def test_verify_event_images_records_missing_files(self):
+        event = self.make_event("Trivia", image=SimpleUploadedFile("trivia.jpg", image_bytes(), "image/jpeg"))
+        event.image.storage.delete(event.image.name)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('verify_event_images', stdout=StringIO())
+
+        event.refresh_from_db()
+        self.assertFalse(event.has_valid_image())
+        self.assertIsNone(event.image_width)
+
+
+class HoursSnapshotTests(CachedTestCase):
+    def test_renders_the_hours_table(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            WeeklyHours.objects.create(monday_open=time(16), monday_close=time(23))
+
+        snapshot = snapshots.hours_snapshot()
+
+        self.assertIn("4:00PM–11:00PM", snapshot['hours_table'])
+        self.assertEqual(snapshot['hours'].monday_open, time(16))
+
+    def test_kept_in_process_until_the_version_changes(self):
+        snapshots.hours_snapshot()
+
+        # Only the version key is looked up, in the cache
+        with self.assertNumQueries(0):
+            snapshots.hours_snapshot()
+
+    def test_saving_the_hours_rebuilds_the_snapshot(self):
+        snapshots.hours_snapshot()
+
+        hours = WeeklyHours.load()
+        hours.friday_open = time(12)
+        hours.friday_close = time(2)
+        with self.captureOnCommitCallbacks(execute=True):
+            hours.save()
+
+        self.assertEqual(snapshots.hours_snapshot()['hours'].friday_open, time(12))
+
+
+class ConditionalGetTests(CachedTestCase):
+    def test_index_answers_a_matching_etag_with_304_and_no_queries(self):
+        self.make_event("Trivia")
+        etag = self.client.get("/")['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get("/", headers={"if-none-match": etag})
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_index_etag_changes_with_the_events(self):
+        etag = self.client.get("/")['ETag']
+
+        self.make_event("Trivia")
+
+        response = self.client.get("/", headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etags_use_the_local_date(self):
+        # 02:00 UTC on March 10 is still March 9 in New York
+        now = datetime(2026, 3, 10, 2, tzinfo=dt_timezone.utc)
+        request = self.client.get("/").wsgi_request
+
+        with mock.patch('django.utils.timezone.now', return_value=now):
+            index_etag = conditional.index_etag(request)
+            calendar_etag = conditional.calendar_etag(request)
+
+        with mock.patch('django.utils.timezone.now', return_value=now - timedelta(hours=3)):
+            self.assertEqual(conditional.index_etag(request), index_etag)
+            self.assertEqual(conditional.calendar_etag(request), calendar_etag)
+        with mock.patch('django.utils.timezone.now', return_value=now + timedelta(hours=3)):
+            self.assertNotEqual(conditional.index_etag(request), index_etag)
+            self.assertNotEqual(conditional.calendar_etag(request), calendar_etag)
+
+    def test_menu_is_revalidated_by_etag_only(self):
+        self.make_menu_item("Stout")
+        newest = self.make_menu_item("Lager")
+        response = self.client.get("/menu")
+        self.assertFalse(response.has_header('Last-Modified'))
+
+        # Deleting the newest item moves max(last_updated) back in time
+        with self.captureOnCommitCallbacks(execute=True):
+            newest.delete()
+        response = self.client.get("/menu", headers={
+            "if-none-match": response['ETag'],
+            "if-modified-since": http_date(timezone.now().timestamp()),
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, "Lager")
+
+    def test_event_details_etag_changes_when_the_event_is_saved(self):
+        event = self.make_event("Trivia")
+        url = f"/event/details/{event.pk}/"
+        etag = self.client.get(url)['ETag']
+
+        event.title = "Pub Trivia"
+        with self.captureOnCommitCallbacks(execute=True):
+            event.save()
+
+        self.assertEqual(self.client.get(url, headers={"if-none-match": etag}).status_code, 200)
+
+    def test_public_pages_may_be_kept_by_shared_caches(self):
+        response = self.client.get("/")
+
+        self.assertIn("public", response['Cache-Control'])
+        self.assertIn("s-maxage", response['Cache-Control'])
+
+
+class PurgeOldEventsTests(MediaTestCase):
+    def make_old_event_with_image(self, title, days_ago=30):
+        image = SimpleUploadedFile(f"{title}.jpg", image_bytes(), "image/jpeg")
+        event = self.make_event(title, days_ahead=-days_ago, image=image)
+        event.rebuild_renditions(event.image)
+        return event
+
+    def test_deletes_old_events_and_their_files(self):
+        old = self.make_old_event_with_image("old")
+        recent = self.make_event("recent", days_ahead=-2)
+        storage = old.image.storage
+        names = [old.image.name] + [rendition.image.name for rendition in old.renditions.all()]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            stats = purge_old_events(days=7)
+
+        self.assertEqual(stats['events'], 1)
+        self.assertEqual(stats['images'], len(names))
+        self.assertEqual(list(Event.objects.all()), [recent])
+        self.assertFalse(EventImageRendition.objects.exists())
+        self.assertFalse(any(storage.exists(name) for name in names))
+
+    def test_dry_run_deletes_nothing(self):
+        old = self.make_old_event_with_image("old")
+
+        stats = purge_old_events(days=7, dry_run=True)
+
+        self.assertEqual(stats['events'], 1)
+        self.assertTrue(Event.objects.filter(pk=old.pk).exists())
+        self.assertTrue(old.image.storage.exists(old.image.name))
+
+    def test_bumps_the_events_version_once_per_batch(self):
+        for number in range(5):
+            self.make_event(f"old {number}", days_ahead=-30)
+        version = caching.get_version(caching.EVENTS)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            purge_old_events(days=7, batch_size=2)
+
+        self.assertEqual(caching.get_version(caching.EVENTS), version + 3)
+
+    def test_event_receivers_are_reconnected_afterwards(self):
+        self.make_event("old", days_ahead=-30)
+        with self.captureOnCommitCallbacks(execute=True):
+            purge_old_events(days=7)
+        version = caching.get_version(caching.EVENTS)
+
+        self.make_event("new")
+
+        self.assertEqual(caching.get_version(caching.EVENTS), version + 1)
+
+    def test_other_threads_still_invalidate_during_a_purge(self):
+        version = caching.get_version(caching.EVENTS)
+
+        def save_elsewhere():
+            try:
+                post_save.send(sender=Event, instance=None, created=False)
+            finally:
+                connections.close_all()
+
+        with signals.event_invalidation_paused():
+            post_save.send(sender=Event, instance=None, created=False)
+            thread = threading.Thread(target=save_elsewhere)
+            thread.start()
+            thread.join()
+
+        self.assertEqual(caching.get_version(caching.EVENTS), version + 1)
+
+    def test_batch_size_must_be_positive(self):
+        with self.assertRaisesMessage(CommandError, "--batch-size"):
+            call_command('purge_old_events', '--batch-size', '0', stdout=StringIO())
+
+    def test_saving_an_event_no_longer_purges(self):
+        self.make_event("old", days_ahead=-30)
+
+        self.make_event("new")
+
+        self.assertEqual(Event.objects.count(), 2)
+
+
+class EventImageRenditionTests(MediaTestCase):
+    def event_form(self, image, instance=None):
+        data = {'title': "Trivia", 'date': timezone.localdate(), 'start_time': "19:00"}
+        files = {'image': SimpleUploadedFile("trivia.png", image, "image/png")} if image else {}
+        return EventForm(data, files, instance=instance)
+
+    def test_makes_every_size_in_every_format(self):
+        renditions = make_renditions(BytesIO(image_bytes((1600, 1200))))
+
+        sizes = {(r['kind'], r['format']): (r['width'], r['height']) for r in renditions}
+        self.assertEqual(sizes, {
+            ('card', 'webp'): (480, 360), ('card', 'jpeg'): (480, 360),
+            ('detail', 'webp'): (1200, 900), ('detail', 'jpeg'): (1200, 900),
+            ('og', 'webp'): (1200, 630), ('og', 'jpeg'): (1200, 630),
+        })
+
+    def test_small_images_are_not_upscaled(self):
+        renditions = make_renditions(BytesIO(image_bytes((300, 200))))
+
+        card = next(r for r in renditions if r['kind'] == 'card')
+        self.assertEqual((card['width'], card['height']), (300, 200))
+
+    def test_event_form_builds_renditions_for_an_upload(self):
+        form = self.event_form(image_bytes((800, 600), format='PNG'))
+        self.assertTrue(form.is_valid(), form.errors)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            event = form.save()
+
+        self.assertEqual(event.renditions.count(), 6)
+        self.assertTrue(event.image.name.endswith('.jpg'))
+        self.assertIn(" 480w", event.webp_srcset)
+        self.assertEqual(event.card_rendition.format, 'jpeg')
+
+    def test_clearing_the_image_removes_the_renditions(self):
+        form = self.event_form(image_bytes(format='PNG'))
+        self.assertTrue(form.is_valid(), form.errors)
+        event = form.save()
+        names = [rendition.image.name for rendition in event.renditions.all()]
+
+        data = {'title': "Trivia", 'date': timezone.localdate(), 'start_time': "19:00", 'image-clear': 'on'}
+        form = EventForm(data, {}, instance=event)
+        self.assertTrue(form.is_valid(), form.errors)
+        form.save()
+
+        self.assertFalse(event.renditions.exists())
+        self.assertFalse(any(event.image.storage.exists(name) for name in names))
+
+    def test_event_card_links_the_renditions(self):
+        form = self.event_form(image_bytes((800, 600), format='PNG'))
+        self.assertTrue(form.is_valid(), form.errors)
+        with self.captureOnCommitCallbacks(execute=True):
+            event = form.save()
+
+        response = self.client.get("/")
+
+        self.assertContains(response, f'srcset="{event.webp_srcset}"')
+
+
+class CompressExistingImagesTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.ledger = os.path.join(tempfile.mkdtemp(dir=self.media_root), "ledger.json")
+
+    def compress(self, *args):
+        stdout = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('compress_existing_images', '--ledger', self.ledger, *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def make_png_event(self):
+        image = SimpleUploadedFile("trivia.png", image_bytes((1600, 1200), format='PNG'), "image/png")
+        return self.make_event("Trivia", image=image)
+
+    def test_compresses_images_and_builds_their_renditions(self):
+        event = self.make_png_event()
+        old_name = event.image.name
+
+        self.compress()
+
+        event.refresh_from_db()
+        self.assertTrue(event.image.name.endswith('.jpg'))
+        self.assertEqual((event.image_width, event.image_height), (1200, 900))
+        self.assertEqual(event.renditions.count(), 6)
+        self.assertFalse(event.image.storage.exists(old_name))
+        with event.image.open('rb') as image_file:
+            self.assertEqual(hashlib.sha256(image_file.read()).hexdigest(), event.image_hash)
+
+    def test_second_run_skips_images_in_the_ledger(self):
+        self.make_png_event()
+        self.compress()
+
+        output = self.compress()
+
+        self.assertIn("Already in ledger (not downloaded): 1", output)
+        self.assertIn("Successfully compressed: 0", output)
+
+    def test_dry_run_changes_nothing(self):
+        event = self.make_png_event()
+
+        output = self.compress('--dry-run')
+
+        self.assertIn("Would compress", output)
+        self.assertEqual(Event.objects.get(pk=event.pk).image.name, event.image.name)
+        self.assertFalse(os.path.exists(self.ledger))
+
+
+class ImageDecodingTests(TestCase):
+    def test_rejects_images_with_too_many_pixels(self):
+        with Image.open(BytesIO(image_bytes((100, 100)))) as img:
+            check_image_pixels(img, max_pixels=10_000)
+            with self.assertRaises(ImageTooLarge):
+                check_image_pixels(img, max_pixels=9_999)
+
+    def test_compression_refuses_to_decode_huge_images(self):
+        with mock.patch('barlery.utils.MAX_IMAGE_PIXELS', 1_000):
+            with self.assertRaises(ImageTooLarge):
+                encode_compressed_jpeg(BytesIO(image_bytes((100, 100))))
+            with self.assertRaises(ImageTooLarge):
+                make_renditions(BytesIO(image_bytes((100, 100))))
+
+    def test_event_form_rejects_huge_images(self):
+        data = {'title': "Trivia", 'date': timezone.localdate(), 'start_time': "19:00"}
+        files = {'image': SimpleUploadedFile("huge.png", image_bytes((100, 100), format='PNG'), "image/png")}
+
+        with mock.patch('barlery.utils.MAX_IMAGE_PIXELS', 1_000):
+            form = EventForm(data, files)
+            self.assertFalse(form.is_valid())
+
+        self.assertIn("megapixels", form.errors['image'][0])
+
+    def test_compressed_image_fits_the_box(self):
+        compressed = encode_compressed_jpeg(BytesIO(image_bytes((3000, 2000))), 1200, 1200)
+
+        self.assertEqual((compressed['width'], compressed['height']), (1200, 800))
+        with Image.open(BytesIO(compressed['content'])) as img:
+            self.assertEqual(img.size, (1200, 800))
+
+    def test_sideways_photos_are_rotated_and_fit_the_box(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6  # rotated 90 degrees
+        content = image_bytes((3000, 2000), exif=exif)
+
+        compressed = encode_compressed_jpeg(BytesIO(content), 1200, 600)
+
+        self.assertEqual((compressed['width'], compressed['height']), (400, 600))
+
+
+class FailingConnection:
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def send_messages(self, messages):
+        raise OSError("Mail server unavailable")
+
+
+class OutboxTests(TestCase):
+    def test_contact_form_queues_the_email(self):
+        response = self.client.post("/contact", {
+            'name': "Ada", 'email': "ada@example.com", 'subject': "Booking", 'message': "Hello",
+        })
+
+        self.assertRedirects(response, "/success?type=contact", fetch_redirect_response=False)
+        email = OutboundEmail.objects.get()
+        self.assertEqual(email.kind, OutboundEmail.KIND_CONTACT)
+        self.assertEqual(email.reply_to, "ada@example.com")
+        self.assertEqual(mail.outbox, [])
+
+    def test_sends_due_emails_over_one_connection(self):
+        outbox.enqueue(OutboundEmail.KIND_CONTACT, "First", "Body")
+        outbox.enqueue(OutboundEmail.KIND_CONTACT, "Second", "Body")
+        connection = mock.MagicMock(wraps=mail.get_connection())
+
+        stats = outbox.send_pending(batch_size=1, connection=connection)
+
+        self.assertEqual(stats['sent'], 2)
+        self.assertEqual(connection.open.call_count, 1)
+        self.assertEqual([message.subject for message in mail.outbox], ["First", "Second"])
+        self.assertFalse(OutboundEmail.objects.exclude(status=OutboundEmail.STATUS_SENT).exists())
+
+    def test_does_not_connect_when_nothing_is_due(self):
+        outbox.enqueue(OutboundEmail.KIND_CONTACT, "Later", "Body")
+        OutboundEmail.objects.update(next_attempt_at=timezone.now() + timedelta(minutes=5))
+        connection = mock.MagicMock()
+
+        stats = outbox.send_pending(connection=connection)
+
+        self.assertEqual(stats['sent'], 0)
+        connection.open.assert_not_called()
+
+    def test_failed_sends_are_retried_with_backoff(self):
+        email = outbox.enqueue(OutboundEmail.KIND_CONTACT, "Hello", "Body")
+
+        with self.assertLogs('barlery.outbox', 'WARNING'):
+            stats = outbox.send_pending(connection=FailingConnection())
+
+        email.refresh_from_db()
+        self.assertEqual(stats['retried'], 1)
+        self.assertEqual(email.status, OutboundEmail.STATUS_PENDING)
+        self.assertEqual(email.attempts, 1)
+        self.assertIn("unavailable", email.last_error)
+        self.assertGreater(email.next_attempt_at, timezone.now() + timedelta(seconds=50))
+
+    def test_gives_up_after_max_attempts(self):
+        email = outbox.enqueue(OutboundEmail.KIND_CONTACT, "Hello", "Body")
+        OutboundEmail.objects.update(attempts=outbox.MAX_ATTEMPTS - 1)
+
+        with self.assertLogs('barlery.outbox', 'ERROR'):
+            stats = outbox.send_pending(connection=FailingConnection())
+
+        email.refresh_from_db()
+        self.assertEqual(stats['failed'], 1)
+        self.assertEqual(email.status, OutboundEmail.STATUS_FAILED)
+
+    def test_unreachable_server_hands_the_batch_back(self):
+        email = outbox.enqueue(OutboundEmail.KIND_CONTACT, "Hello", "Body")
+        connection = mock.MagicMock()
+        connection.open.side_effect = OSError("Connection refused")
+
+        with self.assertRaises(OSError):
+            outbox.send_pending(connection=connection)
+
+        email.refresh_from_db()
+        self.assertEqual(email.attempts, 0)
+        self.assertLessEqual(email.next_attempt_at, timezone.now())
+
+    def test_retry_delay_doubles_up_to_the_cap(self):
+        self.assertEqual(outbox.retry_delay(1), timedelta(minutes=1))
+        self.assertEqual(outbox.retry_delay(3), timedelta(minutes=4))
+        self.assertEqual(outbox.retry_delay(20), timedelta(seconds=outbox.RETRY_MAX_SECONDS))
+
+
+@override_settings(STAFF_EMAIL_DIGEST_MINUTES=30, STAFF_EMAIL_URGENT_DAYS=3)
+class StaffDigestTests(TestCase):
+    def request_venue(self, days_ahead):
+        event_request = EventRequest.objects.create(
+            first_name="Ada", last_name="Lovelace", email="ada@example.com", phone="5551234567",
+            contact_preference=EventRequest.CONTACT_EMAIL, nature="Birthday",
+            date=timezone.localdate() + timedelta(days=days_ahead),
+            start_time=time(18), end_time=time(21), description="Party for 20",
+        )
+        self.assertTrue(send_venue_request_email(event_request))
+        return OutboundEmail.objects.latest('id')
+
+    def test_routine_requests_wait_for_the_digest(self):
+        email = self.request_venue(days_ahead=30)
+
+        self.assertTrue(email.digest)
+        self.assertEqual(outbox.send_pending()['sent'], 0)
+        self.assertEqual(mail.outbox, [])
+
+    def test_urgent_requests_skip_the_digest(self):
+        email = self.request_venue(days_ahead=1)
+
+        self.assertFalse(email.digest)
+        self.assertEqual(outbox.send_pending()['sent'], 1)
+
+    def test_held_emails_go_out_as_one_digest_once_the_oldest_is_due(self):
+        first = self.request_venue(days_ahead=30)
+        self.request_venue(days_ahead=40)
+        OutboundEmail.objects.filter(pk=first.pk).update(next_attempt_at=timezone.now())
+
+        stats = outbox.send_pending()
+
+        self.assertEqual((stats['sent'], stats['digests']), (2, 1))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn("Digest: 2 new notification(s)", mail.outbox[0].subject)
+        self.assertEqual(mail.outbox[0].body.count("[Venue Request] Birthday"), 2)
+
+    @override_settings(STAFF_EMAIL_DIGEST_MINUTES=0)
+    def test_no_digest_without_a_window(self):
+        email = self.request_venue(days_ahead=30)
+
+        self.assertFalse(email.digest)
+        self.assertEqual(outbox.send_pending()['sent'], 1)
+
+
+class UnsubscribeTests(TestCase):
+    def setUp(self):
+        self.subscriber = Subscriber.objects.create(email="ada@example.com")
+
+    def test_token_identifies_the_subscriber(self):
+        token = self.subscriber.unsubscribe_token
+
+        self.assertEqual(Subscriber.from_unsubscribe_token(token), self.subscriber)
+        self.assertIsNone(Subscriber.from_unsubscribe_token(f"{token}x"))
+
+    def test_get_only_asks_for_confirmation(self):
+        response = self.client.get(f"/unsubscribe/{self.subscriber.unsubscribe_token}")
+
+        self.assertContains(response, "ada@example.com")
+        self.subscriber.refresh_from_db()
+        self.assertTrue(self.subscriber.is_subscribed)
+
+    def test_one_click_post_unsubscribes_without_a_csrf_token(self):
+        client = Client(enforce_csrf_checks=True)
+
+        response = client.post(f"/unsubscribe/{self.subscriber.unsubscribe_token}", {'List-Unsubscribe': 'One-Click'})
+
+        self.assertRedirects(response, "/success?type=unsubscribe", fetch_redirect_response=False)
+        self.subscriber.refresh_from_db()
+        self.assertFalse(self.subscriber.is_subscribed)
+        self.assertIsNotNone(self.subscriber.unsubscribed_at)
+
+    def test_invalid_token_is_not_found(self):
+        self.assertEqual(self.client.get("/unsubscribe/not-a-token").status_code, 404)
+
+
+class NewsletterTests(CachedTestCase):
+    def test_no_issue_without_upcoming_events(self):
+        self.assertIsNone(newsletter.create_issue("This month"))
+
+    def test_sends_each_active_subscriber_their_own_unsubscribe_link(self):
+        self.make_event("Trivia")
+        ada = Subscriber.objects.create(email="ada@example.com")
+        Subscriber.objects.create(email="gone@example.com", is_subscribed=False)
+        issue = newsletter.create_issue("This month")
+
+        newsletter.send_issue(issue, mail.get_connection())
+
+        self.assertEqual([message.to for message in mail.outbox], [["ada@example.com"]])
+        message = mail.outbox[0]
+        self.assertIn("TRIVIA", message.body)
+        self.assertIn(newsletter.unsubscribe_url(ada), message.body)
+        self.assertEqual(message.extra_headers['List-Unsubscribe'], f"<{newsletter.unsubscribe_url(ada)}>")
+        self.assertEqual((issue.sent_count, issue.last_subscriber_id), (1, ada.pk))
+        self.assertIsNotNone(issue.completed_at)
+
+    def test_resumes_after_the_last_subscriber_sent_to(self):
+        self.make_event("Trivia")
+        first = Subscriber.objects.create(email="first@example.com")
+        Subscriber.objects.create(email="second@example.com")
+        issue = newsletter.create_issue("This month")
+        issue.last_subscriber_id = first.pk
+
+        newsletter.send_issue(issue, mail.get_connection(), chunk_size=1)
+
+        self.assertEqual([message.to for message in mail.outbox], [["second@example.com"]])
+
+
+@skipUnless(connection.vendor == 'sqlite', "Checks SQLite query plans")
+class HotQueryIndexTests(TestCase):
+    def test_hot_queries_read_rows_in_index_order(self):
+        for description, queryset in hot_queries():
+            if description == "Account management: count per status":
+                continue  # Counts every user, so a scan is expected
+            with self.subTest(description):
+                plan = queryset.explain()
+                self.assertIn("USING INDEX", plan)
+                self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_explain_hot_queries_prints_every_plan(self):
+        stdout = StringIO()
+
+        call_command('explain_hot_queries', stdout=stdout)
+
+        self.assertIn("event_date_start_idx", stdout.getvalue())
+        self.assertIn("outbox_due_idx", stdout.getvalue())
+
+
+class SearchIndexTests(TestCase):
+    def test_postgres_indexes_match_the_search_sql(self):
+        from django.db.backends.postgresql.base import DatabaseWrapper
+
+        migration = importlib.import_module('barlery.migrations.0010_user_search_indexes')
+        postgres = DatabaseWrapper({**connection.settings_dict, 'NAME': 'barlery'}, alias='postgres')
+        sql, params = accounts.account_page_query(accounts.ACTIVE, search='jo 555').query.get_compiler(
+            connection=postgres,
+        ).as_sql()
+        # Postgres matches expressions regardless of the table prefix and the varchar -> text cast
+        sql = sql % tuple(f"'{param}'" if isinstance(param, str) else param for param in params)
+        sql = sql.replace('"barlery_user".', '').replace('::text', '')
+
+        for name, expression in migration.SEARCH_INDEXES:
+            with self.subTest(name):
+                self.assertIn(f"{expression} LIKE", sql)
+
+
+class AccountManagementTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin@example.com", "Admin", "User", "5550000000")
+
+    def setUp(self):
+        self.joined = timezone.now()
+
+    def make_user(self, email, first_name="Test", last_name="User", phone="5551112222", active=True, **fields):
+        self.joined -= timedelta(minutes=1)
+        return User.objects.create_user(
+            email, first_name, last_name, phone, is_active=active, date_joined=self.joined, **fields,
+        )
+
+    def search(self, search, bucket=accounts.ACTIVE):
+        return [user.email for user in accounts.account_page(bucket, search=search)[0]]
+
+    def test_counts_each_status_bucket(self):
+        self.make_user("active@example.com")
+        self.make_user("pending@example.com", active=False)
+        self.make_user("gone@example.com", active=False, last_login=timezone.now())
+
+        self.assertEqual(accounts.account_counts(), {
+            accounts.PENDING: 1, accounts.ACTIVE: 1, accounts.DEACTIVATED: 1,
+        })
+
+    def test_pages_cover_every_account_newest_first(self):
+        users = [self.make_user(f"user{number}@example.com") for number in range(accounts.ACCOUNTS_PAGE_SIZE + 5)]
+
+        first_page, cursor = accounts.account_page(accounts.ACTIVE)
+        second_page, last_cursor = accounts.account_page(accounts.ACTIVE, accounts.decode_account_cursor(cursor))
+
+        self.assertEqual(first_page + second_page, users)
+        self.assertIsNone(last_cursor)
+
+    def test_search_matches_name_and_email_prefixes(self):
+        self.make_user("ada@example.com", "Ada", "Lovelace")
+        self.make_user("grace@example.com", "Grace", "Hopper")
+
+        self.assertEqual(self.search("ada"), ["ada@example.com"])
+        self.assertEqual(self.search("hop"), ["grace@example.com"])
+        self.assertEqual(self.search("grace hopper"), ["grace@example.com"])
+        self.assertEqual(self.search("grace lovelace"), [])
+        self.assertEqual(self.search("love"), ["ada@example.com"])
+
+    def test_search_matches_phone_digits_however_formatted(self):
+        self.make_user("ada@example.com", phone="(555) 123-4567")
+        self.make_user("grace@example.com", phone="555.987.6543")
+
+        self.assertEqual(self.search("555123"), ["ada@example.com"])
+        self.assertEqual(self.search("(555) 123"), ["ada@example.com"])
+        self.assertEqual(self.search("555-987"), ["grace@example.com"])
+        self.assertEqual(len(self.search("555")), 2)
+
+    def test_page_is_for_staff_only(self):
+        response = self.client.get("/accounts/management/")
+
+        self.assertEqual(response.status_code, 302)
+
+    def test_next_page_as_json(self):
+        for number in range(accounts.ACCOUNTS_PAGE_SIZE + 1):
+            self.make_user(f"user{number}@example.com")
+        self.client.force_login(self.admin)
+        response = self.client.get("/accounts/management/")
+        cursor = response.context['users_next']
+
+        response = self.client.get(
+            "/accounts/management/", {'bucket': accounts.ACTIVE, 'cursor': cursor},
+            headers={"x-requested-with": "XMLHttpRequest"},
+        )
+
+        data = response.json()
+        self.assertFalse(data['has_more'])
+        self.assertIn(f"user{accounts.ACCOUNTS_PAGE_SIZE}@example.com", data['html'])
+
+    def test_bad_cursor_is_rejected(self):
+        self.client.force_login(self.admin)
+
+        response = self.client.get(
+            "/accounts/management/", {'bucket': accounts.ACTIVE, 'cursor': "nope"},
+            headers={"x-requested-with": "XMLHttpRequest"},
+        )
+
+        self.assertEqual(response.status_code, 400)
+
+
+class AsyncViewTests(CachedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.factory = AsyncRequestFactory()
+        self.event = self.make_event("Trivia")
+        self.make_menu_item("Stout")
+
+    async def test_pages_render_the_same_content_as_the_sync_views(self):
+        pages = [
+            ("/", async_views.index, ()),
+            ("/menu", async_views.menu, ()),
+            ("/calendar", async_views.calendar, ()),
+            (f"/event/details/{self.event.pk}/", async_views.event_details, (self.event.pk,)),
+        ]
+        for url, view, args in pages:
+            with self.subTest(url):
+                response = await view(self.factory.get(url), *args)
+                sync_response = await self.async_client.get(url)
+
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.content, sync_response.content)
+                self.assertEqual(response['ETag'], sync_response['ETag'])
+                self.assertIn("public", response['Cache-Control'])
+
+    async def test_matching_etag_gets_304(self):
+        etag = (await async_views.index(self.factory.get("/")))['ETag']
+
+        response = await async_views.index(self.factory.get("/", headers={"if-none-match": etag}))
+
+        self.assertEqual(response.status_code, 304)
+
+    async def test_calendar_rejects_a_bad_page_cursor(self):
+        request = self.factory.get("/calendar", {"page": "bad"}, headers={"x-requested-with": "XMLHttpRequest"})
+
+        response = await async_views.calendar(request)
+
+        self.assertEqual(response.status_code, 400)
+
+    async def test_missing_event_is_not_found(self):
+        with self.assertRaises(Http404):
+            await async_views.event_details(self.factory.get("/event/details/999/"), 999)
+
+
+class GunicornConfigTests(TestCase):
+    def load_config(self, **environ):
+        with mock.patch.dict(os.environ, environ):
+            return runpy.run_path(os.path.join(settings.BASE_DIR, "gunicorn.conf.py"))
+
+    def test_threaded_wsgi_workers_by_default(self):
+        config = self.load_config(GUNICORN_THREADS="8")
+
+        self.assertEqual(config['worker_class'], "gthread")
+        self.assertEqual(config['wsgi_app'], "barlery_project.wsgi:application")
+        self.assertEqual(config['threads'], 8)
+        self.assertTrue(config['preload_app'])
+
+    def test_uvicorn_workers_serve_the_async_views(self):
+        with mock.patch.dict(os.environ, {'GUNICORN_WORKER_CLASS': "uvicorn"}):
+            config = runpy.run_path(os.path.join(settings.BASE_DIR, "gunicorn.conf.py"))
+            self.assertEqual(os.environ['ASYNC_VIEWS'], "True")
+
+        self.assertEqual(config['worker_class'], "uvicorn_worker.UvicornWorker")
+        self.assertEqual(config['wsgi_app'], "barlery_project.asgi:application")
+
+    def test_unknown_worker_class_is_an_error(self):
+        with self.assertRaises(ValueError):
+            self.load_config(GUNICORN_WORKER_CLASS="eventlet")
+
+
+class BenchmarkPagesTests(LiveServerTestCase):
+    def test_percentile(self):
+        values = list(range(1, 101))
+
+        self.assertEqual(percentile(values, 0.5), 51)
+        self.assertEqual(percentile(values, 0.99), 100)
+        self.assertEqual(percentile([], 0.5), 0)
+
+    def test_reports_requests_against_a_running_server(self):
+        stdout = StringIO()
+
+        call_command(
+            'benchmark_pages', '--base-url', self.live_server_url, '--pages', '/about',
+            '--concurrency', '2', '--duration', '0.5', '--slow-clients', '1', '--slow-send', '0.01',
+            stdout=stdout,
+        )
+
+        self.assertRegex(stdout.getvalue(), r"[1-9]\d* requests in .* \(0 errors, [1-9]\d* slow requests completed\)")
+
+
+class HashedStaticFilesTests(TestCase):
+    """Static files as served by WhiteNoise when SERVE_STATIC_FROM_R2 is False."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        static_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, static_root, ignore_errors=True)
+        cls.enterClassContext(override_settings(
+            STATIC_ROOT=static_root,
+            STATIC_VERSION="",
+            STORAGES={
+                **settings.STORAGES,
+                "staticfiles": {"BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage"},
+            },
+        ))
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_pages_link_hashed_names_without_a_version_suffix(self):
+        url = staticfiles_storage.url("images/barlery_sign.png")
+
+        response = self.client.get("/")
+
+        self.assertRegex(url, r"^/static/images/barlery_sign\.[0-9a-f]{12}\.png$")
+        self.assertContains(response, url)
+        self.assertNotContains(response, "?v=")
+
+    def test_hashed_files_are_cached_for_a_year(self):
+        response = self.client.get(staticfiles_storage.url("images/barlery_sign.png"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("immutable", response['Cache-Control'])
+        self.assertIn("max-age=315360000", response['Cache-Control'])
+        response.close()
+
+    def test_page_etags_follow_the_manifest_hash(self):
+        self.assertEqual(conditional.static_files_version(), staticfiles_storage.manifest_hash)
+
+        with mock.patch.object(staticfiles_storage, 'manifest_hash', "changed"):
+            etag = self.client.get("/")['ETag']
+        self.assertNotEqual(self.client.get("/")['ETag'], etag)
+
+
+class R2StaticStorageTests(TestCase):
+    def test_only_hashed_names_are_immutable(self):
+        manifest_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, manifest_dir, ignore_errors=True)
+        storage = ManifestR2StaticStorage(bucket_name="static", manifest_storage=FileSystemStorage(manifest_dir))
+
+        for name, cache_control in [
+            ("css/site.3f2a9c1b7e4d.css", "public, max-age=31536000, immutable"),
+            ("css/site.3f2a9c1b7e4d.css.br", "public, max-age=31536000, immutable"),
+            ("css/site.css", "public, max-age=300, must-revalidate"),
+            ("staticfiles.json", "public, max-age=300, must-revalidate"),
+        ]:
+            with self.subTest(name):
+                self.assertEqual(storage.get_object_parameters(name)['CacheControl'], cache_control)
+
+    def test_urls_are_not_signed(self):
+        storage = ManifestR2StaticStorage(
+            bucket_name="static",
+            endpoint_url="https://account.r2.cloudflarestorage.com",
+            access_key="key",
+            secret_key="secret",
+            manifest_storage=FileSystemStorage(tempfile.gettempdir()),
+        )
+        storage.hashed_files = {"css/site.css": "css/site.3f2a9c1b7e4d.css"}
+
+        url = storage.url("css/site.css")
+
+        self.assertTrue(url.endswith("/css/site.3f2a9c1b7e4d.css"), url)
+        self.assertNotIn("?", url)
+
+
+class BundleTests(TestCase):
+    def build_bundles(self):
+        bundles_dir = Path(tempfile.mkdtemp()) / "bundles"
+        self.addCleanup(shutil.rmtree, bundles_dir.parent, ignore_errors=True)
+        for module in ('barlery.bundles', 'barlery.management.commands.build_bundles'):
+            self.enterContext(mock.patch(f'{module}.BUNDLES_DIR', bundles_dir))
+            self.enterContext(mock.patch(f'{module}.MANIFEST_PATH', bundles_dir / "bundles.json"))
+        bundles.load_manifest.cache_clear()
+        self.addCleanup(bundles.load_manifest.cache_clear)
+        call_command('build_bundles', stdout=StringIO())
+        return bundles_dir
+
+    def test_page_bundles_build_on_the_shared_ones(self):
+        self.assertEqual(bundles.bundle_chain("contact"), ["base", "public", "form", "contact"])
+        self.assertEqual(bundles.bundle_chain("login"), ["base", "login"])
+
+    def test_every_source_file_exists(self):
+        for name, files in bundles.BUNDLES.items():
+            self.assertIn(files.get("base", "base"), bundles.BUNDLES)
+            for path in files.get("css", []) + files.get("js", []):
+                with self.subTest(bundle=name, path=path):
+                    self.assertTrue(finders.find(path))
+
+    def test_critical_css_keeps_the_top_of_the_page(self):
+        css = "body{margin:0}.card{padding:1rem}@media (max-width:600px){nav a{display:block}.card{margin:0}}"
+
+        self.assertEqual(bundles.critical_css(css), "body{margin:0}@media (max-width:600px){nav a{display:block}}")
+
+    def test_unbuilt_bundles_link_the_source_files(self):
+        with mock.patch('barlery.templatetags.bundles.load_manifest', return_value={}):
+            css = bundle_css("menu")
+            js = bundle_js("contact")
+
+        self.assertEqual(css.count('rel="stylesheet"'), 3)
+        self.assertLess(css.index("css/site.css"), css.index("css/menu.css"))
+        self.assertLess(js.index("js/staff_ui.js"), js.index("js/csrf_on_demand.js"))
+
+    def test_shared_styles_are_built_once(self):
+        bundles_dir = self.build_bundles()
+
+        site_css = Path(finders.find("css/site.css")).read_text()
+        self.assertLess((bundles_dir / "menu.css").stat().st_size, len(site_css) / 2)
+        self.assertFalse((bundles_dir / "login.js").exists())
+
+    def test_built_bundles_inline_critical_css_and_preload_the_rest(self):
+        self.build_bundles()
+
+        css = bundle_css("menu")
+        js = bundle_js("contact")
+
+        self.assertTrue(css.startswith("<style>"))
+        self.assertIn('href="/static/bundles/base.css" as="style"', css)
+        self.assertIn('href="/static/bundles/menu.css" as="style"', css)
+        self.assertIn("<noscript>", css)
+        self.assertNotIn("css/site.css", css)
+        self.assertLess(js.index("bundles/base.js"), js.index("bundles/public.js"))
+        self.assertLess(js.index("bundles/public.js"), js.index("bundles/form.js"))
+        self.assertNotIn("bundles/contact.js", js)  # the contact page has no scripts of its own
+
+
+class IconTests(TestCase):
+    def icon_metadata(self, icons, alias=None):
+        """Minimal icons.json with a 640x512 SVG per (style, name); alias is listed under another name."""
+        metadata = {}
+        for style, name in icons:
+            raw = '<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 640 512"><path d="M0 0h640v512z"/></svg>'
+            entry = metadata.setdefault(f"{name}-renamed" if name == alias else name, {'svg': {}})
+            entry['svg'][style] = {'raw': raw}
+            if name == alias:
+                entry['aliases'] = {'names': [name]}
+        path = os.path.join(self.enterContext(tempfile.TemporaryDirectory()), "icons.json")
+        with open(path, "w") as f:
+            json.dump(metadata, f)
+        return path
+
+    def patch_output(self):
+        app_dir = Path(self.enterContext(tempfile.TemporaryDirectory())) / "barlery"
+        app_dir.mkdir()
+        self.enterContext(mock.patch.object(build_icons, 'APP_DIR', app_dir))
+        self.enterContext(mock.patch.object(build_icons, 'OUTPUT_PATH', app_dir / "icons.css"))
+        return app_dir / "icons.css"
+
+    def test_committed_icons_cover_every_icon_in_use(self):
+        icons_css = Path(finders.find("css/icons.css")).read_text()
+
+        for _, name in build_icons.Command().scan()[0]:
+            with self.subTest(icon=name):
+                self.assertIn(f").fa-{name}{{", icons_css)
+
+    def test_templates_no_longer_load_the_icon_font(self):
+        response = self.client.get("/about")
+
+        self.assertNotContains(response, "font-awesome")
+        self.assertNotContains(response, "cdnjs")
+
+    def test_writes_a_mask_rule_per_icon(self):
+        icons = build_icons.Command().scan()[0]
+        style, name = sorted(icons)[0]
+        output = self.patch_output()
+
+        call_command('build_icons', source=self.icon_metadata(icons, alias=name), stdout=StringIO())
+
+        css = output.read_text()
+        self.assertEqual(css.count("--fa-icon:url("), len(icons))
+        self.assertIn(f").fa-{name}{{width:1.25em;--fa-icon:url(\"data:image/svg+xml,", css)
+
+    def test_unknown_icon_is_an_error(self):
+        icons = build_icons.Command().scan()[0]
+        output = self.patch_output()
+
+        with self.assertRaises(CommandError):
+            call_command('build_icons', source=self.icon_metadata(sorted(icons)[1:]), stdout=StringIO())
+        self.assertFalse(output.exists())
+
+
+class FragmentCacheTests(CachedTestCase):
+    def test_menu_items_are_cached_per_item(self):
+        item = self.make_menu_item("Stout")
+
+        response = self.client.get("/menu")
+
+        self.assertContains(response, f'data-staff-ui="menu_item:{item.pk}"')
+        self.assertIsNotNone(cache.get(make_template_fragment_key('menu_item', [item.pk, item.last_updated])))
+
+    def test_edited_menu_item_is_rendered_again(self):
+        item = self.make_menu_item("Stout", price="6.00")
+        staff = User.objects.create_user("staff@example.com", "Staff", "User", "5550000000", is_staff=True)
+        self.client.get("/menu")
+        self.client.force_login(staff)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f"/menu_item/edit/{item.pk}/", {
+                'name': "Imperial Stout", 'category': MenuItem.CATEGORY_BEER, 'price': "7.00", 'description': "",
+            })
+        self.assertRedirects(response, "/menu", fetch_redirect_response=False)
+        self.client.logout()
+
+        response = self.client.get("/menu")
+        self.assertContains(response, "Imperial Stout")
+        self.assertContains(response, "$7.00")
+
+    def test_event_card_version_follows_image_changes_made_with_update(self):
+        event = self.make_event("Trivia")
+        version = event.card_fragment_version
+
+        Event.objects.filter(pk=event.pk).update(image_hash="0" * 64, image_exists=True)
+        event.refresh_from_db()
+
+        self.assertNotEqual(event.card_fragment_version, version)
+
+    def test_event_cards_are_the_same_for_staff_and_visitors(self):
+        event = self.make_event("Trivia")
+        staff = User.objects.create_user("staff@example.com", "Staff", "User", "5550000000", is_staff=True)
+        anonymous = self.client.get("/calendar").content
+
+        self.client.force_login(staff)
+        response = self.client.get("/calendar")
+
+        self.assertEqual(response.content, anonymous)
+        self.assertContains(response, f'data-staff-ui="event_card:{event.pk}"')
+
+
+class StaffUiTests(CachedTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user("staff@example.com", "Staff", "User", "5550000000", "password", is_staff=True)
+
+    def staff_ui(self, *slots):
+        return self.client.get("/staff-ui", {'slot': slots}).json()
+
+    def test_public_pages_neither_read_nor_set_cookies(self):
+        self.client.force_login(self.staff)
+
+        for url in ("/", "/menu", "/calendar", "/about", "/contact"):
+            with self.subTest(url):
+                response = self.client.get(url)
+                self.assertNotIn("Cookie", response.get('Vary', ''))
+                self.assertEqual(response.cookies, {})
+                self.assertIn("public", response['Cache-Control'])
+
+    def test_login_sets_the_hint_cookie_and_logout_removes_it(self):
+        response = self.client.post("/accounts/login/", {'username': "staff@example.com", 'password': "password"})
+        self.assertEqual(response.cookies[LOGIN_HINT_COOKIE].value, "1")
+
+        response = self.client.post("/accounts/logout/")
+        self.assertEqual(response.cookies[LOGIN_HINT_COOKIE].value, "")
+        self.assertEqual(response.cookies[LOGIN_HINT_COOKIE]['max-age'], 0)
+
+    def test_visitors_get_no_slots(self):
+        data = self.staff_ui("nav", "menu_actions")
+
+        self.assertFalse(data['authenticated'])
+        self.assertEqual(data['slots'], {})
+
+    def test_renders_the_requested_slots_for_staff(self):
+        event = self.make_event("Trivia")
+        self.client.force_login(self.staff)
+
+        data = self.staff_ui("nav", f"event_card:{event.pk}", "event_card:999", "unknown")
+
+        self.assertTrue(data['authenticated'])
+        self.assertEqual(set(data['slots']), {"nav", f"event_card:{event.pk}"})
+        self.assertIn(f"/event/edit/{event.pk}/", data['slots'][f"event_card:{event.pk}"])
+
+    def test_ignores_ids_that_are_not_plain_digits(self):
+        self.client.force_login(self.staff)
+
+        response = self.client.get("/staff-ui", {'slot': ["event_card:\u00b2", "menu_item:-1", "menu_item:"]})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['slots'], {})
+
+    def test_delivers_flash_messages_left_by_a_redirect(self):
+        item = self.make_menu_item("Stout")
+        self.client.force_login(self.staff)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f"/menu_item/delete/{item.pk}/")
+
+        self.assertIn("deleted successfully", self.staff_ui()['alerts'])
+        self.assertNotIn("deleted successfully", self.staff_ui()['alerts'])
+
+    def test_never_cached(self):
+        response = self.client.get("/staff-ui")
+
+        self.assertIn("no-cache", response['Cache-Control'])
+
+
+class CsrfOnDemandTests(CachedTestCase):
+    contact = {'name': "Ada", 'email': "ada@example.com", 'subject': "Booking", 'message': "Hello"}
+
+    def setUp(self):
+        super().setUp()
+        self.client = Client(enforce_csrf_checks=True)
+
+    def test_form_pages_carry_no_token(self):
+        for url in ("/contact", "/venue", "/accounts/create"):
+            with self.subTest(url):
+                response = self.client.get(url)
+                self.assertNotContains(response, "csrfmiddlewaretoken")
+                self.assertContains(response, 'data-csrf-url="/csrf-token"')
+                self.assertIn("public", response['Cache-Control'])
+
+    def test_hands_out_a_token_and_its_cookie(self):
+        response = self.client.get("/csrf-token")
+
+        self.assertTrue(response.json()['token'])
+        self.assertIn(settings.CSRF_COOKIE_NAME, response.cookies)
+        self.assertIn("no-cache", response['Cache-Control'])
+
+    def test_posts_need_the_fetched_token(self):
+        self.assertEqual(self.client.post("/contact", self.contact).status_code, 403)
+
+        token = self.client.get("/csrf-token").json()['token']
+        response = self.client.post("/contact", {**self.contact, 'csrfmiddlewaretoken': token})
+
+        self.assertRedirects(response, "/success?type=contact", fetch_redirect_response=False)
+
+    def test_only_get(self):
+        self.assertEqual(self.client.post("/csrf-token").status_code, 403)
+        self.assertEqual(Client().post("/csrf-token").status_code, 405)
+
+
+@override_settings(CACHES={
+    **settings.CACHES,
+    "tiered_l2": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "tiered-tests"},
+})
+class TieredCacheTests(TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        self.enterContext(mock.patch('barlery.cache_backends.time.monotonic', lambda: self.now))
+        self.cache = self.make_cache()
+        self.l2 = caches["tiered_l2"]
+        self.l2.clear()
+
+    def make_cache(self, **options):
+        for store in (cache_backends._stores, cache_backends._locks, cache_backends._counts, cache_backends._last_flush):
+            store.pop("tiered-tests", None)
+        return cache_backends.TieredCache("tiered-tests", {"OPTIONS": {
+            "L2": "tiered_l2", "L1_MAX_ENTRIES": 3, "L1_TIMEOUT": 30,
+            "L1_KEY_TIMEOUTS": {"*:version": 1, "*:uncached": 0}, **options,
+        }})
+
+    def test_writes_go_to_both_tiers(self):
+        self.cache.set("menu", ["stout"])
+
+        self.assertEqual(self.l2.get("menu"), ["stout"])
+        self.assertEqual(self.cache.get("menu"), ["stout"])
+        self.assertEqual(self.cache.stats()['l1_hits'], 1)
+
+    def test_reads_fill_l1_from_l2(self):
+        self.l2.set("menu", ["stout"])
+
+        self.assertEqual(self.cache.get("menu"), ["stout"])
+        self.assertEqual(self.cache.get("menu"), ["stout"])
+        self.assertIsNone(self.cache.get("missing"))
+
+        stats = self.cache.stats()
+        self.assertEqual((stats['l1_hits'], stats['l2_hits'], stats['misses']), (1, 1, 1))
+
+    def test_other_workers_writes_show_up_after_the_l1_timeout(self):
+        self.cache.set("menu", "old")
+        self.l2.set("menu", "new")
+
+        self.assertEqual(self.cache.get("menu"), "old")
+        self.now += 31
+        self.assertEqual(self.cache.get("menu"), "new")
+
+    def test_per_key_l1_timeouts(self):
+        self.cache.set("events:version", 1)
+        self.cache.set("events:uncached", 1)
+        self.l2.set("events:version", 2)
+        self.l2.set("events:uncached", 2)
+
+        self.assertEqual(self.cache.get("events:version"), 1)
+        self.assertEqual(self.cache.get("events:uncached"), 2)
+        self.now += 1
+        self.assertEqual(self.cache.get("events:version"), 2)
+
+    def test_l1_never_outlives_the_entry(self):
+        self.cache.set("menu", "stout", timeout=5)
+        self.l2.delete("menu")
+
+        self.now += 6
+        self.assertIsNone(self.cache.get("menu"))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        for key in ("a", "b", "c"):
+            self.cache.set(key, key)
+        self.cache.get("a")
+        self.cache.set("d", "d")
+        self.l2.clear()
+
+        self.assertEqual([self.cache.get(key) for key in ("a", "b", "c", "d")], ["a", None, "c", "d"])
+        self.assertEqual(self.cache.stats()['l1_entries'], 3)
+
+    def test_delete_and_incr_reach_both_tiers(self):
+        self.cache.set("count", 1)
+        self.assertEqual(self.cache.incr("count"), 2)
+        self.assertEqual((self.cache.get("count"), self.l2.get("count")), (2, 2))
+
+        self.cache.delete("count")
+        self.assertIsNone(self.cache.get("count"))
+
+    def test_callers_get_their_own_copies(self):
+        self.cache.set("menu", ["stout"])
+        self.cache.get("menu").append("lager")
+
+        self.assertEqual(self.cache.get("menu"), ["stout"])
+
+    def test_counts_are_flushed_to_l2_for_cache_stats(self):
+        self.cache.get("missing")
+        self.now += cache_backends.STATS_FLUSH_INTERVAL
+        self.cache.get("missing")
+
+        self.assertEqual(self.l2.get(cache_backends.stats_key("tiered-tests", "misses")), 2)
+
+
+class SingleFlightTests(CachedTestCase):
+    parts = ("tests",)
+
+    def setUp(self):
+        super().setUp()
+        self.builds = 0
+
+    def build(self):
+        self.builds += 1
+        return self.builds
+
+    def get(self, **kwargs):
+        return single_flight.get_or_build(caching.MENU, self.parts, self.build, **kwargs)
+
+    def bump(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            caching.bump_version(caching.MENU)
+
+    def hold_lock(self):
+        # Another worker is rebuilding
+        _, lock_key = single_flight._keys(caching.MENU, self.parts)
+        cache.add(lock_key, 1)
+
+    def test_fresh_entries_are_built_once(self):
+        self.assertEqual(self.get(), 1)
+        self.assertEqual(self.get(), 1)
+        self.assertEqual(self.builds, 1)
+        self.assertFalse(single_flight._claimed)
+
+    def test_version_bump_rebuilds(self):
+        self.get()
+        self.bump()
+
+        self.assertEqual(self.get(), 2)
+
+    def test_new_generation_rebuilds(self):
+        self.get(generation=date(2024, 5, 1))
+
+        self.assertEqual(self.get(generation=date(2024, 5, 2)), 2)
+
+    def test_stale_entry_is_served_while_another_worker_rebuilds(self):
+        self.get()
+        self.bump()
+        self.hold_lock()
+
+        with single_flight.tracking_stale_reads() as stale_reads:
+            self.assertEqual(self.get(), 1)
+        self.assertEqual(self.builds, 1)
+        self.assertEqual(len(stale_reads), 1)
+        self.assertFalse(single_flight._claimed)
+
+    async def test_stale_reads_in_sync_to_async_calls_are_tracked(self):
+        await sync_to_async(self.get)()
+        await sync_to_async(self.bump)()
+        await sync_to_async(self.hold_lock)()
+
+        with single_flight.tracking_stale_reads() as stale_reads:
+            self.assertEqual(await sync_to_async(self.get)(), 1)
+        self.assertEqual(len(stale_reads), 1)
+
+    def test_expired_entry_is_stale(self):
+        self.get(timeout=60)
+        self.hold_lock()
+
+        with mock.patch('barlery.single_flight.time.time', return_value=single_flight.time.time() + 61):
+            with single_flight.tracking_stale_reads() as stale_reads:
+                self.assertEqual(self.get(timeout=60), 1)
+        self.assertEqual(len(stale_reads), 1)
+
+    def test_missing_entry_waits_for_the_other_worker(self):
+        self.hold_lock()
+
+        with mock.patch.object(single_flight, 'WAIT_TIMEOUT', 0.05):
+            self.assertEqual(self.get(), 1)
+        self.assertEqual(self.builds, 1)
+
+    def test_page_rendered_from_a_stale_snapshot_is_not_cacheable(self):
+        self.make_menu_item("Stout")
+        self.client.get("/menu")
+        self.make_menu_item("Lager")
+        _, lock_key = single_flight._keys(caching.MENU, ("snapshot",))
+        cache.add(lock_key, 1)
+
+        response = self.client.get("/menu")
+
+        self.assertNotContains(response, "Lager")
+        self.assertFalse(response.has_header('ETag'))
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertNotIn('public', response['Cache-Control'])
+
+
+class RequestedMonthTests(TestCase):
+    def month(self, **params):
+        return requested_month(self.client.get("/calendar", params).wsgi_request)
+
+    def test_defaults_to_the_current_month(self):
+        today = timezone.localdate()
+
+        self.assertEqual(self.month(), (today.year, today.month))
+        self.assertEqual(self.month(year="x"), (today.year, today.month))
+
+    def test_months_out_of_range_are_clamped(self):
+        today = timezone.localdate()
+
+        def months_from_now(offset):
+            year, month = divmod(today.year * 12 + today.month - 1 + offset, 12)
+            return year, month + 1
+
+        self.assertEqual(self.month(year=1900, month=1), months_from_now(-CALENDAR_MONTHS_BACK))
+        self.assertEqual(self.month(year=9999, month=1), months_from_now(CALENDAR_MONTHS_AHEAD))
+        self.assertEqual(self.month(year=today.year, month=13), months_from_now(13 - today.month))
@@ -1,16 +1,20 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
 
 app_name = "barlery"
 
+# Public read-only pages, served by their async versions under ASGI
+public_views = async_views if settings.ASYNC_VIEWS else views
+
 urlpatterns = [
     # Home Page:
-    path("", views.index, name="index"),
+    path("", public_views.index, name="index"),
 
     # Other Static Pages:
     path("about", views.about, name="about"),
-    path("calendar", views.calendar, name="calendar"),
-    path("event/details/<int:event_id>/", views.event_details, name="event_details"),
+    path("calendar", public_views.calendar, name="calendar"),
+    path("event/details/<int:event_id>/", public_views.event_details, name="event_details"),
     path("event/create/", views.event_create, name="event_create"),
     path("event/edit/<int:event_id>/", views.event_edit, name="event_edit"),
     path("event/delete/<int:event_id>/", views.event_delete, name="event_delete"),
@@ -18,9 +22,10 @@ urlpatterns = [
     path("menu_item/edit/<int:item_id>/", views.menu_item_edit, name="menu_item_edit"),
     path("menu_item/delete/<int:item_id>/", views.menu_item_delete, name="menu_item_delete"),
     path("contact", views.contact, name="contact"),
-    path("menu", views.menu, name="menu"),
+    path("menu", public_views.menu, name="menu"),
     path("venue", views.venue, name="venue"),
     path("privacy", views.privacy, name="privacy"),
+    path("unsubscribe/<str:token>", views.unsubscribe, name="unsubscribe"),
     path("success", views.success, name="success"),
     path("hours/edit/", views.hours_edit, name="hours_edit"),
 
@@ -34,4 +39,9 @@ urlpatterns = [
     path("accounts/login/", views.custom_login, name="login"),
     path("accounts/logout/", views.custom_logout, name="logout"),
     path("accounts/management/", views.account_management, name="account_management"),
+
+    # Staff controls, flash messages and CSRF tokens for the public pages
+    # (see staff_ui.js and csrf_on_demand.js):
+    path("staff-ui", views.staff_ui, name="staff_ui"),
+    path("csrf-token", views.csrf_token, name="csrf_token"),
 ]
\ No newline at end of file
@@ -9,7 +9,58 @@ file sizes and improve page load times.
 from PIL import Image
 from io import BytesIO
 from django.core.files.uploadedfile import InMemoryUploadedFile
-import sys
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Largest image (width x height) that will be decoded. A 24MP phone photo is
+# 24 million pixels; anything far beyond that is rejected before decoding.
+MAX_IMAGE_PIXELS = 50_000_000
+
+# EXIF tag holding the camera orientation
+EXIF_ORIENTATION_TAG = 0x0112
+
+# Renditions made for every event image: (kind, max width, max height, crop to exact size)
+RENDITION_SPECS = [
+    ('card', 480, 960, False),     # event cards (index, calendar)
+    ('detail', 1200, 1200, False), # event details page
+    ('og', 1200, 630, True),       # social sharing previews (Open Graph)
+]
+
+# Formats each rendition is saved in: (format value, Pillow format, quality)
+RENDITION_FORMATS = [
+    ('webp', 'WEBP', 80),
+    ('jpeg', 'JPEG', 85),
+]
+
+
+class ImageTooLarge(ValueError):
+    """Raised when an image has more pixels than MAX_IMAGE_PIXELS."""
+
+
+def convert_to_rgb(img):
+    """
+    Convert an image to RGB, flattening any transparency onto white.
+    
+    Args:
+        img: PIL Image in any mode
+    
+    Returns:
+        PIL Image in RGB mode
+    """
+    if img.mode in ('RGBA', 'LA', 'P'):
+        # Create white background
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        # Paste image on white background
+        if img.mode == 'P':
+            img = img.convert('RGBA')
+        background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
+        return background
+    elif img.mode != 'RGB':
+        return img.convert('RGB')
+    return img
 
 
 def compress_image(uploaded_image, max_width=1200, max_height=1200, quality=85):
@@ -36,45 +87,9 @@ def compress_image(uploaded_image, max_width=1200, max_height=1200, quality=85):
                 instance.save()
             return instance
     """
-    # Open the uploaded image
-    img = Image.open(uploaded_image)
-    
-    # Convert RGBA to RGB (for PNG with transparency)
-    if img.mode in ('RGBA', 'LA', 'P'):
-        # Create white background
-        background = Image.new('RGB', img.size, (255, 255, 255))
-        # Paste image on white background
-        if img.mode == 'P':
-            img = img.convert('RGBA')
-        background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-        img = background
-    elif img.mode != 'RGB':
-        img = img.convert('RGB')
-    
-    # Get original dimensions
-    width, height = img.size
-    
-    # Calculate new dimensions while maintaining aspect ratio
-    if width > max_width or height > max_height:
-        # Calculate scaling factor
-        width_ratio = max_width / width
-        height_ratio = max_height / height
-        scale_factor = min(width_ratio, height_ratio)
-        
-        # Calculate new dimensions
-        new_width = int(width * scale_factor)
-        new_height = int(height * scale_factor)
-        
-        # Resize image using high-quality resampling
-        img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-    
-    # Save to BytesIO object
-    output = BytesIO()
-    
-    # Save as JPEG with specified quality
-    # JPEG is more efficient than PNG for photos
-    img.save(output, format='JPEG', quality=quality, optimize=True)
-    output.seek(0)
+    compressed = encode_compressed_jpeg(uploaded_image, max_width, max_height, quality)
+    content = compressed['content']
+    output = BytesIO(content)
     
     # Get the original filename and change extension to .jpg
     original_name = uploaded_image.name
@@ -87,13 +102,92 @@ def compress_image(uploaded_image, max_width=1200, max_height=1200, quality=85):
         'ImageField',
         new_name,
         'image/jpeg',
-        sys.getsizeof(output),
+        len(content),
         None
     )
     
     return compressed_image
 
 
+def encode_compressed_jpeg(image_file, max_width=1200, max_height=1200, quality=85):
+    """
+    Resize an image to fit within max_width x max_height and encode it as JPEG.
+    
+    This is the pure CPU part of compress_image. It takes and returns only
+    plain data, so it can also run in a worker process.
+    
+    Args:
+        image_file: File-like object with the source image
+        max_width: Maximum width in pixels (default: 1200)
+        max_height: Maximum height in pixels (default: 1200)
+        quality: JPEG quality 1-100 (default: 85)
+    
+    Returns:
+        dict: 'content' (JPEG bytes), 'width' and 'height' in pixels
+    """
+    from PIL import ImageOps
+
+    image_file.seek(0)
+    with Image.open(image_file) as img:
+        # Only the header has been read so far; refuse huge images before decoding them
+        check_image_pixels(img)
+
+        # Swap the target box for photos stored sideways (rotated via EXIF)
+        box = (max_width, max_height)
+        if img.getexif().get(EXIF_ORIENTATION_TAG) in (5, 6, 7, 8):
+            box = (max_height, max_width)
+
+        # thumbnail() lets the JPEG decoder scale down by 1/2, 1/4 or 1/8 while
+        # decoding (draft mode), then reduces by an integer factor, and only
+        # then does the final LANCZOS resample. With reducing_gap=2.0 the
+        # image is decoded at no less than twice the target size, so quality
+        # matches a full-resolution resize while a 24MP photo is never held
+        # in memory at full size.
+        img.thumbnail(box, Image.Resampling.LANCZOS, reducing_gap=2.0)
+
+        # Apply the EXIF orientation (the tag is dropped when saving)
+        img = ImageOps.exif_transpose(img)
+
+        # Convert RGBA to RGB (for PNG with transparency)
+        img = convert_to_rgb(img)
+
+        # Save as JPEG with specified quality
+        # JPEG is more efficient than PNG for photos
+        output = BytesIO()
+        img.save(output, format='JPEG', quality=quality, optimize=True)
+
+    image_file.seek(0)
+    
+    return {
+        'content': output.getvalue(),
+        'width': img.width,
+        'height': img.height,
+    }
+
+
+def check_image_pixels(img, max_pixels=None):
+    """
+    Guard against decompression bombs: small files that decode to huge images.
+    
+    Only the image header is needed, so call this right after Image.open
+    and before anything decodes the pixels.
+    
+    Args:
+        img: PIL Image, opened but not yet loaded
+        max_pixels: Largest allowed width x height (default: MAX_IMAGE_PIXELS)
+    
+    Raises:
+        ImageTooLarge: If the image has more pixels than allowed
+    """
+    max_pixels = max_pixels or MAX_IMAGE_PIXELS
+    width, height = img.size
+    if width * height > max_pixels:
+        raise ImageTooLarge(
+            f"Image is {width}x{height} ({width * height / 1_000_000:.0f} megapixels); "
+            f"the limit is {max_pixels / 1_000_000:.0f} megapixels."
+        )
+
+
 def compress_image_aggressive(uploaded_image, max_width=800, max_height=800, quality=75):
     """
     More aggressive compression for thumbnails or less critical images.
@@ -123,4 +217,120 @@ def get_image_size_kb(image_field):
     try:
         return image_field.size / 1024
     except (AttributeError, FileNotFoundError):
-        return 0
\ No newline at end of file
+        return 0
+
+
+def read_image_metadata(image_file):
+    """
+    Read dimensions, byte size and content hash of an image file.
+
+    Args:
+        image_file: File-like object with the image contents
+    
+    Returns:
+        dict: 'width' and 'height' in pixels, 'size' in bytes and
+            'hash' (hex SHA-256 of the contents)
+    """
+    image_file.seek(0)
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in iter(lambda: image_file.read(64 * 1024), b''):
+        digest.update(chunk)
+        size += len(chunk)
+
+    # Only the image header is parsed here; the pixels are never decoded
+    image_file.seek(0)
+    with Image.open(image_file) as img:
+        width, height = img.size
+    image_file.seek(0)
+
+    return {
+        'width': width,
+        'height': height,
+        'size': size,
+        'hash': digest.hexdigest(),
+    }
+
+
+def delete_storage_files(storage, names, batch_size=1000):
+    """
+    Delete many files from storage using as few requests as possible.
+
+    On S3-compatible storage (R2 in production) files are removed with
+    batched DeleteObjects calls of up to 1000 keys each. Other storage
+    backends delete the files one by one. Missing files are ignored.
+    
+    Args:
+        storage: Django storage backend the files live in
+        names: Iterable of file names relative to the storage
+        batch_size: Keys per DeleteObjects request (S3 allows at most 1000)
+    
+    Returns:
+        int: Number of files deleted (or already missing)
+    """
+    names = [name for name in names if name]
+
+    if not (hasattr(storage, 'bucket') and hasattr(storage, '_normalize_name')):
+        for name in names:
+            storage.delete(name)
+        return len(names)
+
+    from storages.utils import clean_name
+
+    deleted = 0
+    for start in range(0, len(names), batch_size):
+        batch = names[start:start + batch_size]
+        response = storage.bucket.delete_objects(Delete={
+            'Objects': [{'Key': storage._normalize_name(clean_name(name))} for name in batch],
+            'Quiet': True,
+        })
+        errors = response.get('Errors', [])
+        for error in errors:
+            logger.error(f"Failed to delete {error.get('Key')} from storage: {error.get('Message')}")
+        deleted += len(batch) - len(errors)
+    return deleted
+
+
+def make_renditions(image_file):
+    """
+    Make the resized WebP and JPEG renditions of an event image.
+
+    The image is decoded once and every size in RENDITION_SPECS is saved in
+    every format in RENDITION_FORMATS. Images are never upscaled, except that
+    the Open Graph rendition is center-cropped to its exact size.
+    
+    Args:
+        image_file: File-like object with the source image
+    
+    Returns:
+        list[dict]: One dict per rendition with 'kind', 'format', 'width',
+            'height' and 'content' (encoded bytes)
+    """
+    from PIL import ImageOps
+
+    image_file.seek(0)
+    with Image.open(image_file) as source:
+        check_image_pixels(source)
+        source = convert_to_rgb(ImageOps.exif_transpose(source))
+
+        renditions = []
+        for kind, max_width, max_height, crop in RENDITION_SPECS:
+            if crop:
+                resized = ImageOps.fit(source, (max_width, max_height), Image.Resampling.LANCZOS)
+            else:
+                resized = source.copy()
+                resized.thumbnail((max_width, max_height), Image.Resampling.LANCZOS)
+
+            for format_value, pil_format, quality in RENDITION_FORMATS:
+                output = BytesIO()
+                resized.save(output, format=pil_format, quality=quality, optimize=True)
+                renditions.append({
+                    'kind': kind,
+                    'format': format_value,
+                    'width': resized.width,
+                    'height': resized.height,
+                    'content': output.getvalue(),
+                })
+    image_file.seek(0)
+
+    return renditions
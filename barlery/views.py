@@ -1,14 +1,19 @@
 import datetime
 import calendar as cal_module  # Import with alias to avoid naming conflict
-from datetime import datetime, timedelta
+from collections import defaultdict
 from django.shortcuts import render, redirect
-from django.http import HttpResponse, JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse
+from django.template.loader import render_to_string
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import login as auth_login, logout as auth_logout
 from django.contrib.admin.views.decorators import staff_member_required
 from django.urls import reverse
-from django.views.decorators.http import require_POST
+from django.middleware.csrf import get_token
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import condition, require_GET, require_POST
+from django.views.decorators.vary import vary_on_headers
 from django.contrib.auth import get_user_model
 
 
@@ -18,62 +23,129 @@ from django.core.mail import send_mail
 from django.utils import timezone
 
 from .forms import ContactForm, EventRequestForm, BarleryUserCreationForm, WeeklyHoursForm
-from .models import Event, MenuItem, WeeklyHours, EventRequest
+from .models import Event, MenuItem, WeeklyHours, EventRequest, Subscriber
 from .mailers import send_contact_email, send_venue_request_email, send_new_user_email, send_user_activation_email
-
-def index(request):
+from .conditional import (
+    calendar_etag,
+    event_details_etag,
+    index_etag,
+    menu_etag,
+    public_cache_control,
+)
+from .accounts import ACTIVE, BUCKETS, DEACTIVATED, PENDING, account_counts, account_page, decode_account_cursor
+from .snapshots import (
+    decode_event_cursor,
+    hours_snapshot,
+    index_events,
+    menu_snapshot,
+    month_grid,
+    upcoming_events_page,
+)
+
+def index_context(upcoming_events, hours):
     from django.templatetags.static import static
-    
-    # Get upcoming events (ordered by date, then time)
-    upcoming_events = Event.objects.filter(date__gte=timezone.now()).order_by('date', 'start_time')[:3]
-    
-    hours = WeeklyHours.load()
-    
+
     # Generate static URL for hero background image
     hero_bg_url = static('images/barlery_sign.png')
 
-    return render(request, 'barlery/index.html', {
+    return {
         'upcoming_events': upcoming_events,
-        'hours': hours,
+        'hours': hours['hours'],
+        'hours_table': hours['hours_table'],
         'hero_bg_url': hero_bg_url,
-    })
+    }
+
+@public_cache_control
+@condition(etag_func=index_etag)
+def index(request):
+    return render(request, 'barlery/index.html', index_context(index_events(timezone.localdate()), hours_snapshot()))
 
+@public_cache_control
 def about(request):
     return render(request, "barlery/about.html")
 
+@public_cache_control
+@condition(etag_func=menu_etag)
 def menu(request):
-    from .models import MenuItem
-    # Get menu items grouped by category
-    beer_items = MenuItem.objects.filter(category=MenuItem.CATEGORY_BEER).order_by('name')
-    wine_items = MenuItem.objects.filter(category=MenuItem.CATEGORY_WINE).order_by('name')
-    spirit_items = MenuItem.objects.filter(category=MenuItem.CATEGORY_SPIRIT).order_by('name')
-    food_items = MenuItem.objects.filter(category=MenuItem.CATEGORY_FOOD).order_by('name')
-    non_alcoholic_items = MenuItem.objects.filter(category=MenuItem.CATEGORY_NON_ALCOHOLIC).order_by('name')
-    
-    # Also pass all items for the "no menu" check
-    menu_items = MenuItem.objects.all()
-    
-    return render(request, "barlery/menu.html", {
-        "menu_items": menu_items,
-        "beer_items": beer_items,
-        "wine_items": wine_items,
-        "spirit_items": spirit_items,
-        "food_items": food_items,
-        "non_alcoholic_items": non_alcoholic_items,
+    # Menu items grouped by category (cached until the menu changes)
+    return render(request, "barlery/menu.html", menu_context(menu_snapshot()))
+
+def menu_context(menu_by_category):
+    return {
+        # Used for the "no menu" check
+        "menu_items": any(menu_by_category.values()),
+        "beer_items": menu_by_category[MenuItem.CATEGORY_BEER],
+        "wine_items": menu_by_category[MenuItem.CATEGORY_WINE],
+        "spirit_items": menu_by_category[MenuItem.CATEGORY_SPIRIT],
+        "food_items": menu_by_category[MenuItem.CATEGORY_FOOD],
+        "non_alcoholic_items": menu_by_category[MenuItem.CATEGORY_NON_ALCOHOLIC],
+    }
+
+def _upcoming_events_json(request):
+    """
+    Return the next page of upcoming event cards for calendar_pagination.js.
+    """
+    try:
+        cursor = decode_event_cursor(request.GET['page'])
+    except ValueError:
+        return JsonResponse({'error': 'Invalid page'}, status=400)
+
+    events, next_cursor = upcoming_events_page(timezone.localdate(), cursor)
+    return upcoming_events_json_response(request, events, next_cursor)
+
+def upcoming_events_json_response(request, events, next_cursor):
+    html = render_to_string('barlery/_event_cards_list.html', {'events': events}, request=request)
+
+    return JsonResponse({
+        'html': html,
+        'has_more': next_cursor is not None,
+        'next_page': next_cursor,
     })
 
+
+@public_cache_control
+@vary_on_headers('X-Requested-With')
+@condition(etag_func=calendar_etag)
 def calendar(request):
     """
     Display events in a monthly calendar view with navigation.
     Allows users to navigate between months and see events on specific days.
+    AJAX requests with a 'page' cursor get the next page of upcoming events as JSON.
+    """
+    if request.headers.get('x-requested-with') == 'XMLHttpRequest' and request.GET.get('page'):
+        return _upcoming_events_json(request)
+
+    year, month = requested_month(request)
+    today = timezone.localdate()
+
+    # Calendar grid with this month's events (cached until events change)
+    grid = month_grid(year, month, today)
+
+    # Get the first page of upcoming events (more are loaded via AJAX)
+    upcoming_events, next_page = upcoming_events_page(today)
+
+    return render(request, 'barlery/calendar.html', calendar_context(year, month, today, grid, upcoming_events, next_page))
+
+# How far the calendar can be paged from the current month; further months
+# are clamped so crawlers can't fill the cache with endless empty months
+CALENDAR_MONTHS_BACK = 12
+CALENDAR_MONTHS_AHEAD = 24
+
+def requested_month(request):
+    """
+    Get the (year, month) asked for in the query string, default to the current month.
+
+    Months further than CALENDAR_MONTHS_BACK / CALENDAR_MONTHS_AHEAD away
+    are clamped to the nearest month in range.
     """
     # Get month and year from query parameters, default to current month
+    today = timezone.localdate()
     try:
-        year = int(request.GET.get('year', timezone.now().year))
-        month = int(request.GET.get('month', timezone.now().month))
+        year = int(request.GET.get('year', today.year))
+        month = int(request.GET.get('month', today.month))
     except (ValueError, TypeError):
-        year = timezone.now().year
-        month = timezone.now().month
+        year = today.year
+        month = today.month
     
     # Ensure month is valid (1-12)
     if month < 1:
@@ -82,76 +154,23 @@ def calendar(request):
     elif month > 12:
         month = 1
         year += 1
-    
+
+    current = today.year * 12 + today.month - 1
+    requested = min(max(year * 12 + month - 1, current - CALENDAR_MONTHS_BACK), current + CALENDAR_MONTHS_AHEAD)
+    year, month = divmod(requested, 12)
+    return year, month + 1
+
+def calendar_context(year, month, today, grid, upcoming_events, next_page):
     # Calculate previous and next month for navigation
     prev_month = month - 1 if month > 1 else 12
     prev_year = year if month > 1 else year - 1
     next_month = month + 1 if month < 12 else 1
     next_year = year if month < 12 else year + 1
     
-    # Get the calendar for this month using the imported module
-    calendar_grid = cal_module.monthcalendar(year, month)
     month_name = cal_module.month_name[month]
-    
-    # Get all events for this month (only today and future)
-    today = timezone.now().date()
-    first_day = datetime(year, month, 1).date()
-    if month == 12:
-        last_day = datetime(year + 1, 1, 1).date() - timedelta(days=1)
-    else:
-        last_day = datetime(year, month + 1, 1).date() - timedelta(days=1)
-    
-    # Only get events from today onwards
-    start_date = max(first_day, today)
-    
-    events_this_month = Event.objects.filter(
-        date__gte=start_date,
-        date__lte=last_day
-    ).order_by('date', 'start_time')
-    
-    # Organize events by day
-    events_by_day = {}
-    for event in events_this_month:
-        day = event.date.day
-        if day not in events_by_day:
-            events_by_day[day] = []
-        events_by_day[day].append(event)
-    
-    # Create calendar weeks with event data
-    calendar_weeks = []
-    
-    for week in calendar_grid:
-        week_data = []
-        for day in week:
-            if day == 0:
-                # Empty cell for days from previous/next month
-                week_data.append({
-                    'day': None,
-                    'events': [],
-                    'is_today': False,
-                    'is_past': False,
-                })
-            else:
-                current_date = datetime(year, month, day).date()
-                is_today = current_date == today
-                is_past = current_date < today
-                
-                week_data.append({
-                    'day': day,
-                    'date': current_date,
-                    'events': events_by_day.get(day, []),
-                    'is_today': is_today,
-                    'is_past': is_past,
-                })
-        calendar_weeks.append(week_data)
-    
-    # Get upcoming events (next 15 events from today for progressive loading)
-    upcoming_events = Event.objects.filter(
-        date__gte=today
-    ).order_by('date', 'start_time')[:15]
-    
-    context = {
-        'calendar_weeks': calendar_weeks,
+
+    return {
+        'calendar_weeks': grid['calendar_weeks'],
         'month_name': month_name,
         'year': year,
         'month': month,
@@ -161,11 +180,11 @@ def calendar(request):
         'next_year': next_year,
         'today': today,
         'upcoming_events': upcoming_events,
-        'total_events_this_month': events_this_month.count(),
+        'next_page': next_page,
+        'total_events_this_month': grid['total_events'],
     }
-    
-    return render(request, 'barlery/calendar.html', context)
 
+@public_cache_control
 def venue(request):
     if request.method == "POST":
         form = EventRequestForm(request.POST)
@@ -189,6 +208,7 @@ def venue(request):
         {"form": form}
     )
 
+@public_cache_control
 def contact(request):
     if request.method == "POST":
         form = ContactForm(request.POST)
@@ -205,19 +225,43 @@ def contact(request):
                 messages.success(request, "Thanks! We received your message. We'll be in touch soon.")
                 return redirect("/success?type=contact")
             else:
-                messages.error(
-                    request, 
+                # Shown with the form; the page doesn't render flash messages
+                form.add_error(
+                    None,
                     "Sorry, there was a problem sending your message. Please try again later or contact us directly."
                 )
     else:
         form = ContactForm()
 
-    hours = WeeklyHours.load()
-    return render(request, "barlery/contact.html", {"form": form, "hours": hours})
+    hours = hours_snapshot()
+    return render(request, "barlery/contact.html", {
+        "form": form,
+        "hours": hours['hours'],
+        "hours_table": hours['hours_table'],
+    })
 
+@public_cache_control
 def privacy(request):
     return render(request, "barlery/privacy.html")
 
+@csrf_exempt
+def unsubscribe(request, token):
+    """
+    Newsletter unsubscribe link.
+    GET asks for confirmation, so link scanners can't unsubscribe anyone.
+    POST unsubscribes; mail clients' one-click unsubscribe (RFC 8058) also
+    POSTs here, without a CSRF token. The signed token authorizes the request.
+    """
+    subscriber = Subscriber.from_unsubscribe_token(token)
+    if subscriber is None:
+        raise Http404("Invalid unsubscribe link")
+
+    if request.method == "POST":
+        subscriber.unsubscribe()
+        return redirect("/success?type=unsubscribe")
+
+    return render(request, "barlery/unsubscribe.html", {"subscriber": subscriber})
+
 
 def success(request):
     """
@@ -226,30 +270,65 @@ def success(request):
     """
     return render(request, "barlery/success.html")
 
+def _account_page_json(request, search):
+    """
+    Next page of one status bucket on the account management page, as JSON.
+    """
+    bucket = request.GET.get('bucket')
+    if bucket not in BUCKETS:
+        return JsonResponse({'error': 'Invalid bucket'}, status=400)
+    try:
+        cursor = decode_account_cursor(request.GET['cursor'])
+    except (KeyError, ValueError):
+        return JsonResponse({'error': 'Invalid page cursor'}, status=400)
+
+    users, next_cursor = account_page(bucket, cursor, search)
+    html = ''.join(
+        render_to_string('barlery/_user_card.html', {'user': user, 'variant': bucket}, request=request)
+        for user in users
+    )
+    return JsonResponse({
+        'html': html,
+        'has_more': next_cursor is not None,
+        'next_cursor': next_cursor,
+    })
+
+
 @staff_member_required(login_url='/accounts/login/')
 def account_management(request):
-    pending_users = User.objects.filter(
-        is_active=False,
-        last_login__isnull=True,
-        is_superuser=False,
-    ).order_by('-date_joined')
+    """
+    Account management page.
+    Shows the first page of each status bucket (pending, active, deactivated);
+    AJAX requests with a 'bucket' and 'cursor' get the next page as JSON.
+    The optional 'q' parameter searches names, emails and phone numbers.
+    """
+    search = request.GET.get('q', '').strip()
 
-    active_users = User.objects.filter(is_active=True, is_superuser=False).order_by('-date_joined')
+    if request.headers.get('x-requested-with') == 'XMLHttpRequest' and request.GET.get('bucket'):
+        return _account_page_json(request, search)
 
-    deactivated_users = User.objects.filter(
-        is_active=False,
-        last_login__isnull=False,
-        is_superuser=False,
-    ).order_by('-date_joined')
+    counts = account_counts(search)
+
+    # Skip the list query for empty buckets
+    pages = {
+        bucket: account_page(bucket, search=search) if counts[bucket] else ([], None)
+        for bucket in BUCKETS
+    }
 
     context = {
-        'pending_users': pending_users,
-        'users': active_users,
-        'deactivated_users': deactivated_users,
+        'search': search,
+        'counts': counts,
+        'pending_users': pages[PENDING][0],
+        'pending_next': pages[PENDING][1],
+        'users': pages[ACTIVE][0],
+        'users_next': pages[ACTIVE][1],
+        'deactivated_users': pages[DEACTIVATED][0],
+        'deactivated_next': pages[DEACTIVATED][1],
     }
     return render(request, 'barlery/account_management.html', context)
 
 
+@public_cache_control
 def user_create(request):
     """
     Public page for creating new user accounts.
@@ -429,17 +508,98 @@ def custom_logout(request):
     
     # If GET request, redirect to home
     return redirect('barlery:index')
+
+@never_cache
+@require_GET
+def csrf_token(request):
+    """
+    Hand out a CSRF token for the forms on the public pages.
+
+    Those pages are cached, so they can't carry a token of their own.
+    csrf_on_demand.js fetches one here just before a form is submitted;
+    get_token also sets the CSRF cookie the token is checked against.
+    """
+    return JsonResponse({'token': get_token(request)})
+
+# Staff-only parts of the public pages, by placeholder name (see
+# public_base.html): template, and for "name:<id>" placeholders the model
+# and context name of the object they belong to
+STAFF_UI_SLOTS = {
+    'nav': ('barlery/_header_staff_nav.html', None, None),
+    'hours_actions': ('barlery/_hours_staff_actions.html', None, None),
+    'menu_actions': ('barlery/_menu_staff_actions.html', None, None),
+    'calendar_actions': ('barlery/_calendar_staff_actions.html', None, None),
+    'event_actions': ('barlery/_event_details_staff_actions.html', Event, 'event'),
+    'event_card': ('barlery/_event_card_staff_controls.html', Event, 'event'),
+    'menu_item': ('barlery/_menu_item_staff_controls.html', MenuItem, 'item'),
+}
+
+MAX_STAFF_UI_SLOTS = 200
+
+@never_cache
+@require_GET
+def staff_ui(request):
+    """
+    Render the staff-only parts of a public page for static/js/staff_ui.js.
+
+    ?slot= lists the page's placeholders ("nav", "event_card:12", ...),
+    which are rendered for logged-in users. Everyone gets their waiting
+    flash messages, since public pages don't render them.
+    """
+    data = {
+        'authenticated': request.user.is_authenticated,
+        'alerts': render_to_string('barlery/_alerts.html', request=request),
+        'slots': {},
+    }
+    if not request.user.is_authenticated:
+        return JsonResponse(data)
+
+    requested = {}
+    for slot in request.GET.getlist('slot')[:MAX_STAFF_UI_SLOTS]:
+        name, _, object_id = slot.partition(':')
+        if name in STAFF_UI_SLOTS:
+            requested[slot] = (name, int(object_id) if object_id.isascii() and object_id.isdigit() else None)
+
+    # One query per model for the objects the placeholders belong to
+    object_ids = defaultdict(set)
+    for name, object_id in requested.values():
+        model = STAFF_UI_SLOTS[name][1]
+        if model is not None and object_id is not None:
+            object_ids[model].add(object_id)
+    objects = {model: model.objects.in_bulk(ids) for model, ids in object_ids.items()}
+
+    for slot, (name, object_id) in requested.items():
+        template, model, context_name = STAFF_UI_SLOTS[name]
+        context = {}
+        if model is not None:
+            obj = objects.get(model, {}).get(object_id)
+            if obj is None:
+                continue
+            context[context_name] = obj
+        data['slots'][slot] = render_to_string(template, context, request=request)
+
+    return JsonResponse(data)
+
+@public_cache_control
+@condition(etag_func=event_details_etag)
 def event_details(request, event_id):
     """
     Display detailed information about a specific event.
     """
     from django.shortcuts import get_object_or_404
     
-    event = get_object_or_404(Event, id=event_id)
-    
-    return render(request, 'barlery/event_details.html', {
-        'event': event
-    })
+    event = get_object_or_404(Event.objects.prefetch_related('renditions'), id=event_id)
+    return render(request, 'barlery/event_details.html', event_details_context(request, event))
+
+def event_details_context(request, event):
+    # Social sharing previews need an absolute image URL
+    og_rendition = event.og_rendition
+    og_image_url = request.build_absolute_uri(og_rendition.image.url) if og_rendition else None
+
+    return {
+        'event': event,
+        'og_image_url': og_image_url,
+    }
 
 from django.contrib.auth.decorators import login_required
 
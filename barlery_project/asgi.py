@@ -3,6 +3,23 @@ ASGI config for barlery_project project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+ASGI deployment profile
+-----------------------
+Under ASGI one worker process serves many concurrent clients from an event
+loop, so a slow client (a phone on a bad connection reading a long page)
+no longer ties up a thread. Run it with gunicorn managing uvicorn workers:
+
+    ASYNC_VIEWS=True gunicorn barlery_project.asgi:application \\
+        --worker-class uvicorn_worker.UvicornWorker --workers 2
+
+- ASYNC_VIEWS=True routes index, menu, calendar and event details to
+  barlery/async_views.py. The other pages stay sync; Django runs them in a
+  thread per request as it does under WSGI.
+- Keep CONN_MAX_AGE at 0 (the default): persistent database connections
+  are not reused safely across async requests.
+- barlery.middleware.WhiteNoiseMiddleware is async-capable, so the whole
+  middleware stack runs on the event loop without a thread hop.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -3,6 +3,7 @@ import os
 from django.core.management.utils import get_random_secret_key
 from dotenv import load_dotenv
 import sys
+import tempfile
 import dj_database_url
 from datetime import datetime
 from environs import Env
@@ -25,6 +26,18 @@ if DEVELOPMENT_MODE is True: DEBUG = "True"
 
 ALLOWED_HOSTS = os.getenv("DJANGO_ALLOWED_HOSTS", "127.0.0.1,localhost").split(",")
 
+# Serve the public pages (index, menu, calendar, event details) with their async
+# versions in barlery/async_views.py. Turn this on when running under ASGI
+# (see barlery_project/asgi.py); under WSGI the sync views are faster.
+ASYNC_VIEWS = os.getenv("ASYNC_VIEWS", "False") == "True"
+
+# The public pages are the same for every visitor (staff controls are loaded
+# by static/js/staff_ui.js), so shared caches such as a CDN may keep them for
+# this many seconds. Browsers always revalidate them with their ETag. Have
+# the CDN bypass its cache for requests with the barlery_logged_in cookie
+# (see barlery/middleware.py), so logged-in staff see their changes at once.
+PUBLIC_PAGE_S_MAXAGE = int(os.getenv("PUBLIC_PAGE_S_MAXAGE", 600))
+
 
 # Application definition
 
@@ -41,12 +54,13 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "barlery.middleware.WhiteNoiseMiddleware",
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'barlery.middleware.LoginHintMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -62,6 +76,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'barlery.context_processors.static_version',
             ],
         },
     },
@@ -140,6 +155,44 @@ STATICFILES_FINDERS = [
     'django.contrib.staticfiles.finders.AppDirectoriesFinder',
 ]
 
+# Cache
+# Cached snapshots are invalidated by bumping version keys (see barlery/caching.py),
+# so the cache must be shared by all worker processes. "shared" is that cache:
+# a file-based cache (shared by every worker on the machine) or, with
+# SHARED_CACHE=db, a table in the database (shared by every machine; create it
+# with `python manage.py createcachetable`). Neither needs an extra service.
+# Event cards and menu items are also cached as template fragments, one
+# entry each, so the entry limit is well above Django's 300.
+#
+# "default" keeps recently used entries in memory in front of "shared" (see
+# barlery/cache_backends.py). Version keys are re-read from "shared" every
+# second, so a bump in one worker reaches the others within a second.
+SHARED_CACHE = os.getenv("SHARED_CACHE", "file")
+if SHARED_CACHE == "db":
+    shared_cache = {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "barlery_cache",
+    }
+else:
+    shared_cache = {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.getenv("DJANGO_CACHE_DIR", os.path.join(tempfile.gettempdir(), "barlery_cache")),
+    }
+
+CACHES = {
+    "default": {
+        "BACKEND": "barlery.cache_backends.TieredCache",
+        "LOCATION": "barlery",
+        "OPTIONS": {
+            "L2": "shared",
+            "L1_MAX_ENTRIES": int(os.getenv("CACHE_L1_MAX_ENTRIES", 1000)),
+            "L1_TIMEOUT": int(os.getenv("CACHE_L1_TIMEOUT", 30)),
+            "L1_KEY_TIMEOUTS": {"barlery:*:version": 1, "barlery:*:latest:*": 1},
+        },
+    },
+    "shared": {**shared_cache, "OPTIONS": {"MAX_ENTRIES": 5000}},
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -164,6 +217,11 @@ elif len(sys.argv) > 0 and sys.argv[1] != 'collectstatic': # this prevents the s
         raise Exception("Email backend configuration not properly defined.")
 
 CONTACT_RECIPIENT_EMAIL = os.getenv("CONTACT_RECIPIENT_EMAIL", "info@barlery.com")
+# Staff digest: collect venue request and new user notifications for this many
+# minutes and send them as one email (0 sends each one right away)
+STAFF_EMAIL_DIGEST_MINUTES = int(os.getenv("STAFF_EMAIL_DIGEST_MINUTES", 0))
+# Venue requests for dates this close are urgent and skip the digest
+STAFF_EMAIL_URGENT_DAYS = int(os.getenv("STAFF_EMAIL_URGENT_DAYS", 3))
 # Site URL for email links
 SITE_URL = os.getenv('SITE_URL', 'https://www.barlery.com')
 
@@ -216,22 +274,36 @@ else:
         "default_acl": "public-read",
     }
     
+    # Static files are collected under content-hashed names (see barlery/storage.py)
+    # and cached by browsers for a year. They are served from R2 by default, or by
+    # WhiteNoise from STATIC_ROOT when SERVE_STATIC_FROM_R2 is False.
+    SERVE_STATIC_FROM_R2 = env.bool("SERVE_STATIC_FROM_R2", True)
+    
     # Tell Django 5.1+ about your storages
     STORAGES = {
         "default": {
             "BACKEND": "storages.backends.s3boto3.S3Boto3Storage",
-            "OPTIONS": R2_OPTIONS,
+            # Media objects are public-read, so their URLs are left unsigned. Signed
+            # URLs expire after an hour, while event cards that link to them are
+            # cached for a day (see _event_card.html).
+            "OPTIONS": {**R2_OPTIONS, "querystring_auth": False},
             "LOCATION": "media",     # objects under /media/
         },
-        "staticfiles": {
-            "BACKEND": "storages.backends.s3boto3.S3Boto3Storage",
-            "OPTIONS": R2_OPTIONS,
-            "LOCATION": "static",    # objects under /static/
-        },
     }
+    if SERVE_STATIC_FROM_R2:
+        STORAGES["staticfiles"] = {
+            "BACKEND": "barlery.storage.ManifestR2StaticStorage",
+            "OPTIONS": {**R2_OPTIONS, "location": "static"},    # objects under /static/
+        }
+    else:
+        # Also writes .gz and .br copies (Brotli needs the brotli package)
+        STORAGES["staticfiles"] = {
+            "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
+        }
     
     # URLs your templates will use
-    STATIC_URL = f"https://{R2_ENDPOINT.replace('https://','')}/{R2_BUCKET}/static/"
+    if SERVE_STATIC_FROM_R2:
+        STATIC_URL = f"https://{R2_ENDPOINT.replace('https://','')}/{R2_BUCKET}/static/"
     MEDIA_URL  = f"https://{R2_ENDPOINT.replace('https://','')}/{R2_BUCKET}/media/"
 
 # End of settings
\ No newline at end of file
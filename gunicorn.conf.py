@@ -0,0 +1,140 @@
+"""
+Gunicorn configuration for Barlery.
+
+Gunicorn loads this file automatically when started from the project root:
+
+    # Threaded WSGI workers (default)
+    gunicorn
+
+    # Async ASGI workers (see barlery_project/asgi.py)
+    GUNICORN_WORKER_CLASS=uvicorn gunicorn
+
+Environment variables:
+    PORT                       Port to listen on (default: 8000)
+    GUNICORN_WORKER_CLASS      "gthread" (default) or "uvicorn"
+    WEB_CONCURRENCY            Worker processes (default: CPU count + 1)
+    GUNICORN_THREADS           Threads per gthread worker (default: 4)
+    GUNICORN_MAX_REQUESTS      Requests before a worker is recycled (default: 1000, 0 disables)
+    GUNICORN_TIMEOUT           Seconds before a stuck worker is killed (default: 30)
+
+Choosing a worker class:
+    gthread  Each worker serves GUNICORN_THREADS requests at once, one per
+             thread. Every page works unchanged. A slow client holds a
+             thread until its request has arrived and its response is sent.
+    uvicorn  Each worker runs an event loop and serves the public pages
+             through barlery/async_views.py (ASYNC_VIEWS is switched on),
+             so slow clients only cost a waiting coroutine. Needs the
+             uvicorn and uvicorn-worker packages.
+
+The app is preloaded in the master process, so workers share Django's
+imported code copy-on-write and start quickly when recycled. Anything the
+master opened that holds a socket (database connections, boto3 clients
+for R2) is dropped again in each worker right after the fork.
+
+Benchmark:
+    Compare the worker classes on the real pages with the benchmark_pages
+    command, against a copy of production data (DEVELOPMENT_MODE=False):
+
+        gunicorn &                                # then, in another shell:
+        python manage.py benchmark_pages --concurrency 50 --duration 30
+        python manage.py benchmark_pages --concurrency 50 --duration 30 --slow-clients 200
+
+        GUNICORN_WORKER_CLASS=uvicorn gunicorn &  # and repeat both runs
+
+    The first run measures raw throughput and latency. The second adds
+    clients that send their requests slowly, as phones on a poor
+    connection do: gthread workers hold a thread for each of them, so
+    the normal clients queue behind them, while uvicorn workers just
+    keep them waiting on the event loop. Use the same WEB_CONCURRENCY
+    for both so the comparison is fair.
+
+    Results on a 1-CPU machine (server and benchmark on the same CPU),
+    WEB_CONCURRENCY=2, 4 threads per gthread worker, seeded SQLite data
+    with DEVELOPMENT_MODE=True, 20 clients for 20 seconds:
+
+                              gthread           uvicorn
+        no slow clients       116 requests/s    77 requests/s
+                              p50 ~140 ms       p50 ~260 ms
+                              p95 ~330 ms       p95 ~420 ms
+        + 50 slow clients     27 requests/s     61 requests/s
+                              p50 ~150 ms       p50 ~250 ms
+                              p95 ~2750 ms      p95 ~560 ms
+
+    The few errors in each run were requests cut off by a worker being
+    recycled (max_requests). So gthread is faster when clients are quick,
+    and stays the default. Under uvicorn, slow clients barely slow down
+    anyone else. Use it where many visitors are on poor connections and no
+    proxy buffers their requests.
+"""
+
+import multiprocessing
+import os
+
+WORKER_CLASSES = {
+    "gthread": "gthread",
+    "uvicorn": "uvicorn_worker.UvicornWorker",
+}
+
+worker_kind = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+if worker_kind not in WORKER_CLASSES:
+    raise ValueError(f"GUNICORN_WORKER_CLASS must be one of {', '.join(WORKER_CLASSES)}, not {worker_kind!r}")
+
+worker_class = WORKER_CLASSES[worker_kind]
+
+if worker_kind == "uvicorn":
+    wsgi_app = "barlery_project.asgi:application"
+    # Must be set before the app (and so the URLconf) is loaded
+    os.environ.setdefault("ASYNC_VIEWS", "True")
+else:
+    wsgi_app = "barlery_project.wsgi:application"
+    threads = int(os.getenv("GUNICORN_THREADS", 4))
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() + 1))
+
+# Load Django once in the master and fork workers from it
+preload_app = True
+
+# Recycle workers now and then to bound slow memory growth; the jitter keeps
+# them from all restarting at the same moment
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = max_requests // 10
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 30))
+graceful_timeout = 30
+keepalive = 5
+
+# Worker heartbeat files in memory rather than on a possibly slow container disk
+if os.path.isdir("/dev/shm"):
+    worker_tmp_dir = "/dev/shm"
+
+accesslog = "-"
+errorlog = "-"
+
+
+def post_fork(server, worker):
+    """
+    Drop connections inherited from the master process.
+
+    A forked worker shares the master's open sockets, so using them from
+    several processes would interleave their traffic. Each worker opens
+    its own connections on first use instead.
+    """
+    from django.core.cache import caches
+    from django.core.files.storage import default_storage, storages
+    from django.db import connections
+    from django.utils.functional import empty
+
+    connections.close_all()
+    caches.close_all()
+
+    # Storage backends (S3Storage for R2) cache boto3 sessions and clients
+    storages._storages = {}
+    default_storage._wrapped = empty
+
+    try:
+        import boto3
+    except ImportError:
+        pass
+    else:
+        boto3.DEFAULT_SESSION = None